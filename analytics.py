@@ -0,0 +1,169 @@
+# analytics.py
+"""
+Batched time-series analytics for every (metric, country) series.
+
+The values of all series are scattered once into a dense (series x year)
+float array, NaN wherever a year has no observation. Each measure is then
+a handful of whole-array operations (cumulative sums, running maxima,
+gathers) instead of a groupby over the series:
+
+- Rolling mean: mean of the observations in the trailing window of years
+- YoY change: change since the previous observation, per year elapsed, so
+  series observed every two or ten years stay comparable
+- CAGR (%): compound annual growth since the first observation
+- Trend slope: least-squares slope over the trailing window of years
+
+Measures are computed on first use and kept for the life of the object.
+`to_arrow` writes every measure to an Arrow file and `from_arrow` maps it
+back read-only, so a dataset version is analysed once and every process
+serving it shares the arrays (see dataset_refresh.publish_analytics).
+"""
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+from snapshot_cache import read_arrow, write_arrow
+
+# Trailing window, in years, of the rolling mean and the trend slope
+ROLLING_WINDOW = 5
+
+MEASURES = ['Value', 'Rolling mean', 'YoY change', 'CAGR (%)', 'Trend slope']
+
+
+def _trailing_sums(a, window):
+    """Sum over the trailing `window` columns (current one included) of every row"""
+    cumulative = np.zeros((a.shape[0], a.shape[1] + 1))
+    np.cumsum(a, axis=1, out=cumulative[:, 1:])
+    start = np.maximum(np.arange(1, a.shape[1] + 1) - window, 0)
+    return cumulative[:, 1:] - cumulative[:, start]
+
+
+def rolling_mean(values, window=ROLLING_WINDOW):
+    """Trailing-window mean of the observed values, at every observed year"""
+    observed = ~np.isnan(values)
+    sums = _trailing_sums(np.where(observed, values, 0.0), window)
+    counts = _trailing_sums(observed.astype(np.float64), window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(observed, sums / counts, np.nan)
+
+
+def yoy_change(values):
+    """Change since the previous observation divided by the years between them"""
+    n_series, n_years = values.shape
+    observed = ~np.isnan(values)
+    columns = np.arange(n_years)
+    last_seen = np.maximum.accumulate(np.where(observed, columns, -1), axis=1)
+    previous = np.full_like(last_seen, -1)
+    previous[:, 1:] = last_seen[:, :-1]
+
+    rows = np.arange(n_series)[:, None]
+    before = values[rows, np.maximum(previous, 0)]
+    with np.errstate(invalid='ignore'):
+        return np.where(observed & (previous >= 0), (values - before) / (columns - previous), np.nan)
+
+
+def cagr(values):
+    """Compound annual growth rate (%) since the first observation of each series"""
+    n_series, n_years = values.shape
+    observed = ~np.isnan(values)
+    first = np.argmax(observed, axis=1)
+    start = values[np.arange(n_series), first][:, None]
+    elapsed = np.arange(n_years)[None, :] - first[:, None]
+    valid = observed & (elapsed > 0) & (start > 0) & (values > 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth = np.power(values / start, 1.0 / np.where(valid, elapsed, 1)) - 1
+    return np.where(valid, growth * 100, np.nan)
+
+
+def trend_slope(values, window=ROLLING_WINDOW):
+    """Least-squares slope per year over the trailing window, at every observed year"""
+    observed = ~np.isnan(values)
+    x = np.broadcast_to(np.arange(values.shape[1], dtype=np.float64), values.shape)
+    y = np.where(observed, values, 0.0)
+    w = observed.astype(np.float64)
+    n = _trailing_sums(w, window)
+    sx = _trailing_sums(x * w, window)
+    sy = _trailing_sums(y, window)
+    sxy = _trailing_sums(x * y, window)
+    sxx = _trailing_sums(x * x * w, window)
+    denominator = n * sxx - sx * sx
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = (n * sxy - sx * sy) / denominator
+    return np.where(observed & (n >= 2) & (denominator > 0), slope, np.nan)
+
+
+class SeriesAnalytics:
+    """Dense (series x year) values of a DatasetIndex and the measures derived from them"""
+
+    def __init__(self, index, window=ROLLING_WINDOW, dense=None):
+        """
+        `dense` maps measures to flat (series x year) arrays computed before,
+        as written by `to_arrow`; ValueError if they do not fit `index`
+        """
+        self.window = window
+        self.years = np.arange(index.min_year, index.max_year + 1)
+        series, year_offsets = index.series_grid()
+        # Only the (metric, country) pairs that have rows get a row of the array;
+        # index rows are sorted by series, so each run of one id is one series
+        starts = np.r_[True, series[1:] != series[:-1]] if len(series) else np.empty(0, dtype=bool)
+        self.series = series[starts]
+        rows = np.cumsum(starts) - 1
+        self._cells = (rows, year_offsets)
+        shape = (len(self.series), len(self.years))
+        if dense is None:
+            self.values = np.full(shape, np.nan)
+            self.values[rows, year_offsets] = index.df['Value'].to_numpy(dtype=np.float64)
+            self._dense = {'Value': self.values}
+        else:
+            self._dense = {measure: np.asarray(values).reshape(shape) for measure, values in dense.items()}
+            self.values = self._dense['Value']
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_arrow(cls, index, path, window=ROLLING_WINDOW):
+        """Analytics of `index` with the measures memory-mapped from `path`"""
+        df = read_arrow(path)
+        return cls(index, window, {measure: df[measure].to_numpy() for measure in df.columns})
+
+    def to_arrow(self, path):
+        """Compute every measure and write them all to the Arrow file `path`"""
+        write_arrow(pd.DataFrame({measure: self.dense(measure).ravel() for measure in MEASURES}), path)
+
+    def dense(self, measure):
+        """(series x year) array of `measure`, computed on first use"""
+        with self._lock:
+            result = self._dense.get(measure)
+            if result is None:
+                if measure == 'Rolling mean':
+                    result = rolling_mean(self.values, self.window)
+                elif measure == 'YoY change':
+                    result = yoy_change(self.values)
+                elif measure == 'CAGR (%)':
+                    result = cagr(self.values)
+                elif measure == 'Trend slope':
+                    result = trend_slope(self.values, self.window)
+                else:
+                    raise ValueError(f"Unknown measure: {measure}")
+                self._dense[measure] = result
+            return result
+
+    def measure(self, measure, positions=None):
+        """`measure` for the index rows at `positions` (every row by default)"""
+        rows, year_offsets = self._cells
+        if positions is not None:
+            rows, year_offsets = rows[positions], year_offsets[positions]
+        return self.dense(measure)[rows, year_offsets]
+
+    def label(self, measure, unit):
+        """Axis label of `measure` for a metric measured in `unit`"""
+        if measure == 'Rolling mean':
+            return f"{self.window}-year rolling mean ({unit})"
+        if measure == 'YoY change':
+            return f"Change per year ({unit})"
+        if measure == 'Trend slope':
+            return f"{self.window}-year trend ({unit} per year)"
+        if measure == 'CAGR (%)':
+            return "Compound annual growth since first year (%)"
+        return unit
@@ -0,0 +1,329 @@
+# api.py
+"""
+Local HTTP API serving the dashboard queries as JSON.
+
+    GET /metrics                      metrics with unit and year span, countries, regions
+    GET /series?metric=...            rows of one metric
+    GET /kpis?metric=...              KPI tile values
+    GET /latest?metric=...&year=...   latest value per country at or before `year`
+
+/series, /kpis and /latest take the dashboard filter as query parameters:
+`country` (repeated, or `countries` comma-separated; every country by
+default), `start` and `end` years and `region`. /latest also takes `since`
+(oldest year accepted) and `mode=interpolated` for values interpolated
+between the nearest observations.
+
+The API shares the dataset code of app.py: a DatasetManager (re-checking
+data/raw at most every REFRESH_INTERVAL seconds), then the DatasetIndex and
+Rollups of the current version. `DashboardAPI.handle` is a pure function of
+(method, target, headers) returning (status, headers, body); the
+http.server handler only copies requests and responses in and out, so
+tests call it directly.
+
+Responses are cached per (dataset version, path, normalized query) in a
+ViewCache, with their gzip encoding. The ETag of a successful response is
+derived from the same key, so a client sending If-None-Match gets a 304
+until the dataset version changes; errors carry no ETag.
+
+Usage:
+    python api.py --port 8502
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import math
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from data_index import DatasetIndex
+from dataset_refresh import DatasetManager
+from kpis import compute_kpis
+from rollups import Rollups
+from view_cache import ViewCache
+
+DEFAULT_PORT = 8502
+
+# Memory budget of the response cache
+CACHE_BYTES = 32 * 1024 * 1024
+
+# Bodies smaller than this are sent uncompressed
+GZIP_MIN_BYTES = 1024
+
+logger = logging.getLogger("dashboard.api")
+
+
+class BadRequest(Exception):
+    """Invalid query parameters, answered with `status` and the message"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _json_value(value):
+    """Plain JSON value of a numpy scalar, NaN as null"""
+    if value is None:
+        return None
+    if hasattr(value, 'item'):
+        value = value.item()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+def _numbers(values, dtype):
+    """
+    JSON numbers of `values`, written with the shortest decimal of their
+    storage `dtype` (a float32 81.1 stays 81.1, not 81.0999984741211); NaN
+    as null
+    """
+    return [None if text == 'nan' else float(text) for text in np.asarray(values, dtype=dtype).astype(str)]
+
+
+def _int_param(params, name, default=None):
+    value = params.get(name, [None])[-1]
+    if value in (None, ''):
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise BadRequest(f"{name} must be an integer")
+
+
+def _accepts_gzip(headers):
+    return 'gzip' in (headers.get('Accept-Encoding') or '').lower()
+
+
+def _etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in tags or any(tag.removeprefix('W/') == etag for tag in tags)
+
+
+class DashboardAPI:
+    """Dashboard queries over the current dataset version, as cached JSON responses"""
+
+    def __init__(self, manager=None, cache_bytes=CACHE_BYTES):
+        self.manager = manager or DatasetManager()
+        self.cache = ViewCache(cache_bytes)
+        self.routes = {
+            '/metrics': self.metrics,
+            '/series': self.series,
+            '/kpis': self.kpis,
+            '/latest': self.latest,
+        }
+        self._lock = threading.Lock()
+        self._version = None
+
+    def current(self):
+        """(version, DatasetIndex, Rollups) of the current dataset, built once per version"""
+        self.manager.refresh()
+        dataset = self.manager.current
+        with self._lock:
+            if self._version is None or self._version[0] != dataset.version:
+                index = DatasetIndex(dataset.df)
+                self._version = (dataset.version, index, Rollups(index.df, index))
+            return self._version
+
+    # ------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------
+
+    def _filter(self, index, params):
+        """(metric, countries, year_range, region) of the query parameters"""
+        metric = params.get('metric', [None])[-1]
+        if not metric:
+            raise BadRequest("metric is required")
+        if metric not in index.metrics:
+            raise BadRequest(f"Unknown metric: {metric}", status=404)
+        countries = list(params.get('country', []))
+        for value in params.get('countries', []):
+            countries.extend(filter(None, (c.strip() for c in value.split(','))))
+        year_range = (_int_param(params, 'start', index.min_year), _int_param(params, 'end', index.max_year))
+        region = params.get('region', ['All'])[-1] or 'All'
+        return metric, countries or list(index.countries), year_range, region
+
+    def metrics(self, index, rollups, params):
+        metrics = []
+        for metric in index.metrics:
+            rows = index.metric_slice(metric)
+            years = index.metric_years(metric)
+            unit = index.df['Unit'].iloc[rows.start] if 'Unit' in index.df.columns and len(years) else None
+            metrics.append({
+                'name': metric,
+                'unit': None if unit is None else str(unit),
+                'years': [int(years[0]), int(years[-1])] if len(years) else None,
+                'rows': rows.stop - rows.start,
+            })
+        return {
+            'metrics': metrics,
+            'countries': list(index.countries),
+            'regions': index.regions,
+            'years': [index.min_year, index.max_year],
+        }
+
+    def series(self, index, rollups, params):
+        metric, countries, year_range, region = self._filter(index, params)
+        rows = index.select(metric, countries, year_range, region)
+        return {
+            'metric': metric,
+            'columns': ['Country', 'Year', 'Value'],
+            'unit': str(rows['Unit'].iloc[0]) if len(rows) else None,
+            'rows': [
+                [str(country), int(year), value]
+                for country, year, value in zip(rows['Country'], rows['Year'],
+                                                _numbers(rows['Value'], index.df['Value'].dtype))
+            ],
+        }
+
+    def kpis(self, index, rollups, params):
+        metric, countries, year_range, region = self._filter(index, params)
+        # Same path as the dashboard tiles: rollups first, the filtered rows otherwise
+        region_countries = set(index.countries_in_region(region))
+        kpi = rollups.kpis(metric, [c for c in countries if c in region_countries], year_range)
+        if kpi is None:
+            kpi = compute_kpis(index.select(metric, countries, year_range, region), year_range)
+        return {
+            'metric': metric,
+            'years': list(year_range),
+            'kpis': None if kpi is None else {name: _json_value(value) for name, value in kpi.items()},
+        }
+
+    def latest(self, index, rollups, params):
+        metric, countries, _, region = self._filter(index, params)
+        year = _int_param(params, 'year', index.max_year)
+        mode = params.get('mode', ['latest'])[-1]
+        if mode == 'interpolated':
+            names, values = index.interpolated_values(metric, countries, year, region)
+            years = [year] * len(names)
+        elif mode == 'latest':
+            names, values, years = index.latest_values(metric, countries, year, _int_param(params, 'since'), region)
+        else:
+            raise BadRequest("mode must be 'latest' or 'interpolated'")
+        return {
+            'metric': metric,
+            'year': year,
+            'values': [
+                {'country': country, 'value': value, 'year': int(observed)}
+                for country, value, observed in zip(names, _numbers(values, index.df['Value'].dtype), years)
+                if observed >= 0 and value is not None
+            ],
+        }
+
+    # ------------------------------------------------------------
+    # HTTP
+    # ------------------------------------------------------------
+
+    def _render(self, version, index, rollups, path, params):
+        body = self.routes[path](index, rollups, params)
+        raw = json.dumps({'version': version, **body}, separators=(',', ':')).encode('utf-8')
+        return {
+            'body': raw,
+            'gzip': gzip.compress(raw, compresslevel=5) if len(raw) >= GZIP_MIN_BYTES else None,
+        }
+
+    def handle(self, method, target, headers=None):
+        """Response (status, headers, body) to one request"""
+        headers = headers or {}
+        url = urlsplit(target)
+        path = url.path.rstrip('/') or '/'
+        if method not in ('GET', 'HEAD'):
+            return self._error(405, f"Method {method} not allowed", [('Allow', 'GET, HEAD')])
+        if path not in self.routes:
+            return self._error(404, f"Unknown endpoint: {path}")
+
+        params = parse_qs(url.query)
+        version, index, rollups = self.current()
+        key = (version, path, tuple(sorted((name, tuple(values)) for name, values in params.items())))
+        # Only cached responses are valid ones, so a 304 is never sent for a query that fails
+        try:
+            response = self.cache.get(key)
+            if response is None:
+                response = self._render(version, index, rollups, path, params)
+                self.cache.put(key, response)
+        except BadRequest as e:
+            return self._error(e.status, str(e))
+
+        etag = '"' + hashlib.sha1(repr(key).encode('utf-8')).hexdigest()[:20] + '"'
+        common = [('ETag', etag), ('Cache-Control', 'no-cache'), ('Vary', 'Accept-Encoding')]
+        if _etag_matches(headers.get('If-None-Match'), etag):
+            return 304, common, b''
+
+        response_headers = common + [('Content-Type', 'application/json')]
+        body = response['body']
+        if response['gzip'] is not None and _accepts_gzip(headers):
+            body = response['gzip']
+            response_headers.append(('Content-Encoding', 'gzip'))
+        response_headers.append(('Content-Length', str(len(body))))
+        return 200, response_headers, b'' if method == 'HEAD' else body
+
+    def _error(self, status, message, extra_headers=()):
+        body = json.dumps({'error': message}).encode('utf-8')
+        return status, [('Content-Type', 'application/json'), ('Content-Length', str(len(body))),
+                        *extra_headers], body
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # Keep-alive connections: clients polling the API skip the TCP handshake
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes; without this the second one waits for a delayed ACK
+    disable_nagle_algorithm = True
+    api = None
+
+    def _respond(self):
+        try:
+            status, headers, body = self.api.handle(self.command, self.path, self.headers)
+        except Exception:
+            logger.exception("%s %s failed", self.command, self.path)
+            status, headers, body = self.api._error(500, "Internal server error")
+        # Request bodies are never read: close the connection rather than parse
+        # the body as the next request
+        if self.headers.get('Content-Length', '0') != '0' or self.headers.get('Transfer-Encoding'):
+            self.close_connection = True
+            headers = [*headers, ('Connection', 'close')]
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        if status == 304:
+            self.send_header('Content-Length', '0')
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    do_GET = do_HEAD = do_POST = do_PUT = do_DELETE = _respond
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(api, host='127.0.0.1', port=DEFAULT_PORT):
+    """Threaded HTTP server answering with `api` (port 0 picks a free port)"""
+    handler = type('DashboardHandler', (_Handler,), {'api': api})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the dashboard queries as a JSON API")
+    parser.add_argument("--host", default='127.0.0.1', help="Interface to listen on (default: localhost only)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+
+    server = make_server(DashboardAPI(), args.host, args.port)
+    print(f"🌐 Serving the dashboard API on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -8,25 +8,29 @@ University of the People
 import streamlit as st
 import pandas as pd
 import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
 from datetime import datetime
+import json
 import os
+import uuid
+
+# The world map, correlations and exports are imported where they are used:
+# most reruns never open them
+from analytics import MEASURES, ROLLING_WINDOW, SeriesAnalytics
+from data_index import DatasetIndex
+from data_processor import memory_report
+from data_table import PAGE_SIZE, TABLE_COLUMNS, table_page
+from dataset_refresh import DatasetManager, publish_analytics
+from derived_metrics import add_derived_columns
+from instrumentation import RunTimer, StageHistograms, configure_json_log, log_run, write_prometheus
+from kpis import compute_kpis
+from rollups import Rollups
+from sqlite_store import DB_FILE, open_store
+from view_cache import ViewCache, view_key
+from visualizations import WEBGL_POINT_THRESHOLD, comparison_figure, trends_figure
 
 # ============================================
 # PAGE CONFIGURATION
 # ============================================
-st.image("https://www.who.int/images/default-source/maps/logo-who.png", 
-         width=150, caption="Data Source: World Health Organization")
-
-st.markdown("""
-<style>
-    .stPlotlyChart {
-        width: 100% !important;
-    }
-</style>
-""", unsafe_allow_html=True)
-
 st.set_page_config(
     page_title="WHO Global Health Dashboard",
     page_icon="🏥",
@@ -39,6 +43,18 @@ st.set_page_config(
     }
 )
 
+# Bundled with the app so a rerun never waits on a remote image
+LOGO_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "logo.svg")
+st.image(LOGO_FILE, width=150, caption="Data Source: World Health Organization")
+
+st.markdown("""
+<style>
+    .stPlotlyChart {
+        width: 100% !important;
+    }
+</style>
+""", unsafe_allow_html=True)
+
 # ============================================
 # CUSTOM CSS
 # ============================================
@@ -83,227 +99,107 @@ st.markdown("""
 # DATA LOADING FUNCTIONS
 # ============================================
 
-@st.cache_data
-def load_who_data():
+# "memory" filters the in-process index. "sqlite" reads everything from DATABASE_FILE
+# and only ever holds the rows of the current filter; fill it with bulk_load.py or
+# generate_dataset.py (an empty database is seeded once from data/raw)
+DATA_BACKEND = os.environ.get("DASHBOARD_BACKEND", "memory")
+DATABASE_FILE = os.environ.get("DASHBOARD_DB", DB_FILE)
+
+# Memory budget of the shared cache of computed views
+VIEW_CACHE_MB = int(os.environ.get("DASHBOARD_VIEW_CACHE_MB", 64))
+
+# Points above which the trends chart switches to downsampled WebGL rendering
+WEBGL_THRESHOLD = int(os.environ.get("DASHBOARD_WEBGL_POINTS", WEBGL_POINT_THRESHOLD))
+
+# Stage timings: JSON lines log (off unless set) and Prometheus text file ("" disables it)
+TIMINGS_LOG = os.environ.get("DASHBOARD_TIMINGS_LOG")
+METRICS_FILE = os.environ.get("DASHBOARD_METRICS_FILE", "data/processed/dashboard_metrics.prom")
+
+@st.cache_resource
+def get_process_timings():
+    """Stage histograms of every rerun served by this process"""
+    if TIMINGS_LOG:
+        configure_json_log(TIMINGS_LOG)
+    return StageHistograms()
+
+@st.cache_resource
+def get_dataset_manager():
     """
-    Load WHO data from CSV file - FIXED VERSION
+    Process-wide holder of the current dataset. Sources under data/raw are
+    re-checked on reruns and only the files that changed are re-ingested.
     """
-    who_file = "data/raw/who_life_expectancy.csv"
-    
-    if not os.path.exists(who_file):
-        st.sidebar.error("WHO data file not found!")
-        return create_fallback_data()
-    
-    try:
-        # Read WHO CSV
-        df_who = pd.read_csv(who_file)
-        
-        # Debug info
-        st.sidebar.info(f"📊 WHO File: {len(df_who)} records")
-        st.sidebar.info(f"🌍 Countries in file: {df_who['COUNTRY'].nunique()}")
-        
-        # Simple transformation
-        df_who = df_who.rename(columns={
-            'COUNTRY': 'Country',
-            'YEAR': 'Year',
-            'Numeric': 'Value',
-            'GHO (DISPLAY)': 'Metric'
-        })
-        
-        # Select only needed columns
-        df_who = df_who[['Country', 'Year', 'Metric', 'Value']]
-        
-        # Add required columns
-        df_who['Unit'] = 'years'
-        df_who['Data_Quality'] = 'High'
-        
-        # Add WHO Region mapping
-        df_who['WHO_Region'] = df_who['Country'].map({
-            'Afghanistan': 'EMRO',
-            'Japan': 'WPRO',
-            'United States of America': 'AMRO',
-            'Germany': 'EURO',
-            'Brazil': 'AMRO',
-            'India': 'SEARO'
-        }).fillna('Global')
-        
-        # Add Development Level
-        df_who['Development_Level'] = df_who['Country'].map({
-            'Afghanistan': 'Low',
-            'Japan': 'High',
-            'United States of America': 'High',
-            'Germany': 'High',
-            'Brazil': 'Upper-Middle',
-            'India': 'Lower-Middle'
-        }).fillna('Mixed')
-        
-        # Add other metrics
-        other_metrics = create_other_metrics(df_who['Country'].unique())
-        df_combined = pd.concat([df_who, other_metrics], ignore_index=True)
-        
-        # Calculate indexed values
-        df_combined['Value_Indexed'] = df_combined.groupby(['Country', 'Metric'])['Value'].transform(
-            lambda x: (x / x.iloc[0] * 100) if len(x) > 0 and x.iloc[0] != 0 else 100
-        )
-        
-        st.session_state.data_source = "WHO Life Expectancy + Synthetic"
-        return df_combined
-        
-    except Exception as e:
-        st.sidebar.error(f"Error: {str(e)[:100]}")
-        return create_fallback_data()
+    return DatasetManager()
 
-def create_other_metrics(countries):
-    """Create synthetic data for other health metrics - ENHANCED VERSION"""
-    np.random.seed(42)
-    
-    # جميع المؤشرات الأصلية مع قيم واقعية
-    metrics_config = {
-        'Life Expectancy': {'unit': 'years', 'range': (50, 85), 'trend': 0.15},
-        'Under-5 Mortality Rate': {'unit': 'per 1000', 'range': (2, 150), 'trend': -0.8},
-        'Maternal Mortality Ratio': {'unit': 'per 100000', 'range': (5, 500), 'trend': -2.5},
-        'Vaccination Coverage (DTP3)': {'unit': '%', 'range': (40, 99), 'trend': 0.3},
-        'Hospital Beds per 1000': {'unit': 'beds', 'range': (0.5, 15), 'trend': 0.05},
-        'Physicians per 10000': {'unit': 'doctors', 'range': (1, 40), 'trend': 0.2},
-        'Health Expenditure (% of GDP)': {'unit': '%', 'range': (2, 12), 'trend': 0.1},
-        'Adult Obesity Rate': {'unit': '%', 'range': (5, 40), 'trend': 0.1},
-        'Smoking Prevalence': {'unit': '%', 'range': (10, 50), 'trend': -0.2},
-        'Access to Clean Water': {'unit': '%', 'range': (50, 100), 'trend': 0.25}
-    }
-    
-    # سنوات متعددة لبيانات واقعية
-    years = list(range(2000, 2024, 2))  # كل سنتين: 2000, 2002, 2004, ..., 2022
-    
-    records = []
-    
-    for country in countries:
-        # تحديد مستوى تنمية الدولة
-        dev_level = get_development_level(country)
-        
-        for metric_name, config in metrics_config.items():
-            # تخطي Life Expectancy لأن لدينا بيانات WHO الأصلية لها
-            if metric_name == 'Life Expectancy':
-                continue
-                
-            # مضاعفات حسب مستوى التنمية
-            level_multiplier = {
-                'High': 0.9,
-                'Upper-Middle': 0.7, 
-                'Lower-Middle': 0.5,
-                'Low': 0.3
-            }.get(dev_level, 0.5)
-            
-            min_val, max_val = config['range']
-            base_value = min_val + (max_val - min_val) * level_multiplier
-            
-            for year in years:
-                # حساب عامل الزمن
-                year_progress = year - 2000
-                trend_value = config['trend'] * year_progress
-                
-                # عامل عشوائي واقعي
-                random_factor = np.random.normal(0, max_val * 0.02)
-                
-                # حساب القيمة النهائية
-                value = base_value + trend_value + random_factor
-                
-                # التأكد من حدود واقعية
-                value = max(min_val * 0.8, min(max_val * 1.1, value))
-                
-                # تحديد جودة البيانات
-                data_quality = 'High' if dev_level in ['High', 'Upper-Middle'] else 'Medium'
-                
-                records.append({
-                    'Country': country,
-                    'Year': year,
-                    'Metric': metric_name,
-                    'Value': round(value, 2),
-                    'Unit': config['unit'],
-                    'WHO_Region': get_who_region(country),
-                    'Development_Level': dev_level,
-                    'Data_Quality': data_quality
-                })
-    
-    return pd.DataFrame(records)
-    
-def get_development_level(country):
-    """تحديد مستوى تنمية الدولة"""
-    development_map = {
-        'Afghanistan': 'Low',
-        'Japan': 'High',
-        'United States of America': 'High',
-        'Germany': 'High',
-        'Brazil': 'Upper-Middle',
-        'India': 'Lower-Middle'
-    }
-    return development_map.get(country, 'Mixed')
-
-def get_who_region(country):
-    """تحديد منطقة WHO للدولة"""
-    region_map = {
-        'Afghanistan': 'EMRO',
-        'Japan': 'WPRO',
-        'United States of America': 'AMRO',
-        'Germany': 'EURO',
-        'Brazil': 'AMRO',
-        'India': 'SEARO'
+@st.cache_resource(max_entries=2)
+def get_dataset_index(_df, data_version):
+    """Sorted (Metric, Country, Year) index, built once per dataset version"""
+    return DatasetIndex(_df)
+
+@st.cache_resource(max_entries=2)
+def get_rollups(_index, data_version):
+    """KPI rollup tables, built once per dataset version"""
+    return Rollups(_index.df, _index)
+
+@st.cache_resource(max_entries=2)
+def get_analytics(_index, data_version):
+    """
+    Rolling means, growth rates and slopes of every series, computed once per
+    dataset version and mapped from data/processed by every later process
+    """
+    return publish_analytics(_index, data_version, get_dataset_manager().snapshot_dir)
+
+@st.cache_resource(max_entries=2)
+def get_map_frames(_index, data_version):
+    """Serialized world map frames of every (metric, year), built once per dataset version"""
+    from choropleth import MapFrames
+    return MapFrames(_index.df)
+
+@st.cache_resource(max_entries=2)
+def get_metric_matrix(_index, data_version):
+    """Wide (country-year x metric) values for the correlations, built once per dataset version"""
+    from correlations import MetricMatrix
+    return MetricMatrix(_index)
+
+@st.cache_resource
+def get_view_cache():
+    """Computed views shared by every session"""
+    return ViewCache(VIEW_CACHE_MB * 1024 * 1024)
+
+def sync_sqlite_store(store):
+    """Write the data/raw dataset into `store` unless another loader owns it; True if it changed"""
+    dataset = DatasetManager().current
+    return store.write_dataset(dataset.df, dataset.version)
+
+@st.cache_resource(max_entries=1)
+def get_sqlite_store(path):
+    """SQLite store at `path`, seeded from data/raw if it is empty"""
+    store = open_store(path)
+    if store.version() is None:
+        sync_sqlite_store(store)
+    return store
+
+@st.cache_resource(max_entries=2)
+def get_store_dimensions(_store, data_version):
+    """Metrics, countries, regions, year span and row count of the stored dataset version"""
+    min_year, max_year = _store.year_bounds()
+    return {
+        'metrics': _store.metrics(),
+        'countries': _store.countries(),
+        'regions': _store.regions(),
+        'years': (int(min_year), int(max_year)),
+        'rows': _store.observation_count(),
     }
-    return region_map.get(country, 'Global')
 
+@st.cache_resource(max_entries=64)
+def get_store_metric_years(_store, data_version, metric):
+    """Years in which `metric` is observed in the stored dataset version"""
+    return _store.metric_years(metric)
 
-def create_fallback_data():
-    """Fallback data if WHO loading fails"""
-    np.random.seed(42)
-    
-    countries = ['United States', 'Japan', 'Germany', 'Brazil', 'India', 'China']
-    years = list(range(2000, 2024))
-    
-    data = []
-    for country in countries:
-        base_life = np.random.uniform(70, 85)
-        base_mortality = np.random.uniform(5, 50)
-        
-        for year in years:
-            year_factor = (year - 2000) * 0.15
-            
-            # Life Expectancy
-            life_value = base_life + year_factor + np.random.normal(0, 0.5)
-            life_value = max(65, min(90, life_value))
-            
-            # Mortality Rate
-            mortality_value = base_mortality - year_factor * 0.3 + np.random.normal(0, 1)
-            mortality_value = max(2, min(100, mortality_value))
-            
-            data.extend([
-                {
-                    'Country': country,
-                    'Year': year,
-                    'Metric': 'Life Expectancy',
-                    'Value': round(life_value, 1),
-                    'Unit': 'years',
-                    'WHO_Region': 'Global',
-                    'Development_Level': 'Mixed',
-                    'Data_Quality': 'Synthetic'
-                },
-                {
-                    'Country': country,
-                    'Year': year,
-                    'Metric': 'Under-5 Mortality Rate',
-                    'Value': round(mortality_value, 1),
-                    'Unit': 'per 1000',
-                    'WHO_Region': 'Global',
-                    'Development_Level': 'Mixed',
-                    'Data_Quality': 'Synthetic'
-                }
-            ])
-    
-    df = pd.DataFrame(data)
-    df['Value_Indexed'] = df.groupby(['Country', 'Metric'])['Value'].transform(
-        lambda x: (x / x.iloc[0] * 100) if len(x) > 0 and x.iloc[0] != 0 else 100
-    )
-    
-    st.session_state.data_source = "Synthetic Data (Fallback)"
-    return df
+@st.cache_resource(max_entries=4)
+def get_store_map_frames(_store, data_version, metric):
+    """World map frames of one metric of the stored dataset version"""
+    from choropleth import MapFrames
+    return MapFrames(_store.select(metric, None, None))
 
 # ============================================
 # INITIALIZE DATA
@@ -313,9 +209,37 @@ if 'data_loaded' not in st.session_state:
     st.session_state.df = None
     st.session_state.data_source = "Loading..."
 
-# Load data
-df = load_who_data()
-st.session_state.df = df
+if 'timings' not in st.session_state:
+    st.session_state.timings = StageHistograms()
+    st.session_state.session_id = uuid.uuid4().hex[:8]
+run_timer = RunTimer(get_process_timings(), st.session_state.timings, session=st.session_state.session_id)
+
+# Load data: pick up changed source files, then pin this run to one dataset version
+with run_timer.stage("data_load"):
+    view_cache = get_view_cache()
+    if DATA_BACKEND == "sqlite":
+        sqlite_store = get_sqlite_store(DATABASE_FILE)
+        data_version = sqlite_store.version() or "empty"
+        st.session_state.data_source = f"SQLite database {DATABASE_FILE}"
+        dimensions = get_store_dimensions(sqlite_store, data_version)
+    else:
+        dataset_manager = get_dataset_manager()
+        dataset_manager.refresh()
+        dataset = dataset_manager.current
+        df, data_version = dataset.df, dataset.version
+        st.session_state.data_source = dataset.source_label
+        dataset_index = get_dataset_index(df, data_version)
+        df = dataset_index.df
+        st.session_state.df = df
+        rollups = get_rollups(dataset_index, data_version)
+        analytics = get_analytics(dataset_index, data_version)
+        dimensions = {
+            'metrics': dataset_index.metrics,
+            'countries': dataset_index.countries,
+            'regions': dataset_index.regions,
+            'years': (dataset_index.min_year, dataset_index.max_year),
+            'rows': len(df),
+        }
 st.session_state.data_loaded = True
 
 # ============================================
@@ -326,19 +250,33 @@ with st.sidebar:
     
     # Data source info
     st.info(f"Data: {st.session_state.data_source}")
+    if DATA_BACKEND == "sqlite":
+        st.caption(f"📊 {dimensions['rows']:,} records")
+    else:
+        for source, rows in dataset.partition_rows.items():
+            st.caption(f"📊 {source}: {rows:,} records" + (" ⚡ from snapshot" if dataset.loaded_from_snapshot.get(source) else ""))
+        for source, error in dataset.errors.items():
+            st.error(f"{source}: {error[:100]}")
     
     st.markdown("---")
     
     # Metric selection
-    available_metrics = df['Metric'].unique()
+    available_metrics = dimensions['metrics']
     selected_metric = st.selectbox(
         "Select Health Indicator:",
         available_metrics,
         index=0
     )
     
+    # Measure derived from the series of the selected indicator
+    selected_measure = st.selectbox(
+        "Measure:",
+        MEASURES,
+        help=f"Rolling mean and trend slope use a {ROLLING_WINDOW}-year trailing window"
+    )
+    
     # Country selection
-    available_countries = sorted(df['Country'].unique())
+    available_countries = dimensions['countries']
     st.sidebar.info(f"Total countries: {len(available_countries)}")
     
     selected_countries = st.multiselect(
@@ -348,8 +286,7 @@ with st.sidebar:
     )
     
     # Year range
-    min_year = int(df['Year'].min())
-    max_year = int(df['Year'].max())
+    min_year, max_year = dimensions['years']
     
     year_range = st.slider(
         "Select Year Range:",
@@ -357,14 +294,41 @@ with st.sidebar:
         (max_year - 10, max_year)
     )
     
+    # Index base year
+    if DATA_BACKEND == "sqlite":
+        metric_years = get_store_metric_years(sqlite_store, data_version, selected_metric)
+    else:
+        metric_years = dataset_index.metric_years(selected_metric)
+    base_year_options = [int(y) for y in metric_years if year_range[0] <= y <= year_range[1]]
+    show_indexed = selected_measure == 'Value' and st.checkbox("Show as index (base year = 100)", value=False)
+    base_year = None
+    if show_indexed and base_year_options:
+        base_year = st.selectbox("Index Base Year:", base_year_options)
+    
+    # Countries without an observation in the end year
+    comparison_mode = st.radio(
+        "Comparison at end year:",
+        ["Observed", "Latest available", "Interpolated"],
+        help="Latest available: each country's last value in the range. "
+             "Interpolated: linear between the nearest observations on both sides."
+    )
+    
     # Region filter
-    available_regions = ['All'] + sorted(df['WHO_Region'].unique().tolist())
+    available_regions = ['All'] + dimensions['regions']
     selected_region = st.selectbox("Filter by Region:", available_regions)
     
     st.markdown("---")
     
     if st.button("🔄 Refresh Dashboard", use_container_width=True):
+        if DATA_BACKEND == "sqlite":
+            # A database filled by bulk_load.py is only ever changed by it
+            changed = ["data/raw"] if sync_sqlite_store(sqlite_store) else []
+        else:
+            changed = dataset_manager.refresh(force=True)
+        st.session_state.refresh_message = f"Reloaded: {', '.join(changed)}" if changed else "Data is up to date"
         st.rerun()
+    if 'refresh_message' in st.session_state:
+        st.success(st.session_state.pop('refresh_message'))
 
 # ============================================
 # MAIN DASHBOARD
@@ -378,30 +342,133 @@ Interactive analysis of global health indicators | {len(selected_countries) if s
 </div>
 """, unsafe_allow_html=True)
 
+# VIEW MODEL
+def build_view(filtered_df):
+    """KPI values, serialized figures and side panel values for the current filter"""
+    if DATA_BACKEND == "sqlite":
+        # Index of the selected series over every year: measures and as-of lookups
+        # need the observations before the range
+        with run_timer.stage("filter"):
+            series_index = DatasetIndex(sqlite_store.select(selected_metric, selected_countries, None, selected_region))
+        series_analytics = SeriesAnalytics(series_index) if selected_measure != 'Value' else None
+    else:
+        series_index, series_analytics = dataset_index, analytics
+    
+    with run_timer.stage("kpis"):
+        if DATA_BACKEND == "sqlite":
+            kpi = sqlite_store.kpis(selected_metric, selected_countries, year_range, selected_region)
+        else:
+            region_countries = set(dataset_index.countries_in_region(selected_region))
+            kpi_countries = [c for c in selected_countries if c in region_countries]
+            kpi = rollups.kpis(selected_metric, kpi_countries, year_range) or compute_kpis(filtered_df, year_range)
+    
+    with run_timer.stage("figures"):
+        # CHART 1: TIME SERIES
+        if selected_measure != 'Value':
+            # Measures come from the analytics arrays, gathered at the index rows of the filter
+            positions = series_index.row_positions(selected_metric, selected_countries, year_range, selected_region)
+            trend_df = series_index.df.take(positions)
+            trend_df = trend_df.assign(Measure=series_analytics.measure(selected_measure, positions))
+            trend_df = trend_df[trend_df['Measure'].notna()]
+            trend_y = 'Measure'
+            trend_label = f'{selected_metric}: {series_analytics.label(selected_measure, filtered_df["Unit"].iloc[0])}'
+        elif base_year is not None:
+            trend_df = add_derived_columns(filtered_df, base_year=base_year, columns=['Value_Indexed'])
+            trend_y = 'Value_Indexed'
+            trend_label = f'{selected_metric} (index, {base_year} = 100)'
+        else:
+            trend_df = filtered_df
+            trend_y = 'Value'
+            trend_label = f'{selected_metric} ({filtered_df["Unit"].iloc[0]})'
+    
+        fig1, trend_info = trends_figure(
+            trend_df,
+            x='Year',
+            y=trend_y,
+            color='Country',
+            title=f'{selected_metric} ({year_range[0]}-{year_range[1]})',
+            labels={trend_y: trend_label},
+            threshold=WEBGL_THRESHOLD
+        )
+        fig1.update_layout(height=500)
+    
+        # CHART 2: COUNTRY COMPARISON
+        if comparison_mode == "Observed":
+            latest_data = series_index.select(
+                selected_metric, selected_countries, (year_range[1], year_range[1]), selected_region
+            )
+            comparison_title = f'{selected_metric} in {year_range[1]}'
+        elif comparison_mode == "Latest available":
+            _, positions = series_index.asof_positions(
+                selected_metric, selected_countries, year_range[1], 'backward', year_range[0], selected_region
+            )
+            latest_data = series_index.df.take(positions[positions >= 0])
+            comparison_title = f'{selected_metric}, latest value {year_range[0]}-{year_range[1]}'
+        else:
+            _, positions = series_index.asof_positions(
+                selected_metric, selected_countries, year_range[1], 'backward', region=selected_region
+            )
+            _, values = series_index.interpolated_values(
+                selected_metric, selected_countries, year_range[1], selected_region
+            )
+            latest_data = series_index.df.take(positions[positions >= 0]).assign(Value=values[positions >= 0])
+            latest_data = latest_data[latest_data['Value'].notna()]
+            comparison_title = f'{selected_metric} in {year_range[1]} (gaps interpolated)'
+        fig2 = None
+        if not latest_data.empty:
+            fig2 = comparison_figure(latest_data, title=comparison_title)
+    
+        trends_json = fig1.to_json() if trend_info['points'] else None
+        comparison_json = fig2.to_json() if fig2 is not None else None
+    
+    with run_timer.stage("side_panel"):
+        # Latest value per country in the range: (value, year), year is None when it is the end of the range
+        countries, values, years = series_index.latest_values(
+            selected_metric, selected_countries, year_range[1], since=year_range[0], region=selected_region
+        )
+        latest = {
+            country: (float(value), None if year == year_range[1] else int(year))
+            for country, value, year in zip(countries, values, years) if year >= 0
+        }
+    
+    return {
+        'kpi': kpi,
+        'trends': trends_json,
+        'trend_info': trend_info,
+        'comparison': comparison_json,
+        'latest': latest,
+    }
+
 # FILTER DATA
 if selected_countries:
-    filtered_df = df[
-        (df['Country'].isin(selected_countries)) &
-        (df['Year'].between(year_range[0], year_range[1])) &
-        (df['Metric'] == selected_metric)
-    ]
+    with run_timer.stage("filter"):
+        if DATA_BACKEND == "sqlite":
+            filtered_df = sqlite_store.select(selected_metric, selected_countries, year_range, selected_region)
+        else:
+            filtered_df = dataset_index.select(selected_metric, selected_countries, year_range, selected_region)
     
     if not filtered_df.empty:
+        view = view_cache.get_or_build(
+            view_key(data_version, selected_metric, selected_countries, year_range, selected_region,
+                     DATA_BACKEND, base_year, selected_measure, comparison_mode, WEBGL_THRESHOLD),
+            lambda: build_view(filtered_df)
+        )
+        kpi = view['kpi']
+        
         # KPI METRICS
         col1, col2, col3, col4 = st.columns(4)
         
+        # None when every selected observation is missing its value
         with col1:
-            avg_value = filtered_df['Value'].mean()
-            st.metric("Average Value", f"{avg_value:.1f} {filtered_df['Unit'].iloc[0]}")
+            st.metric("Average Value", "n/a" if kpi is None else f"{kpi['average']:.1f} {kpi['unit']}")
         
         with col2:
-            top_country = filtered_df.loc[filtered_df['Value'].idxmax(), 'Country']
-            st.metric("Highest Value", top_country)
+            st.metric("Highest Value", "n/a" if kpi is None else kpi['top_country'])
         
         with col3:
-            improvement = filtered_df[filtered_df['Year'] == year_range[1]]['Value'].mean() - \
-                         filtered_df[filtered_df['Year'] == year_range[0]]['Value'].mean()
-            st.metric("Improvement", f"{improvement:+.1f}")
+            # NaN when no selected series has two observations in the range
+            st.metric("Improvement", "n/a" if kpi is None or np.isnan(kpi['improvement'])
+                      else f"{kpi['improvement']:+.1f}")
         
         with col4:
             st.metric("Countries", len(selected_countries))
@@ -409,20 +476,24 @@ if selected_countries:
         st.markdown("---")
         
         # CHART 1: TIME SERIES
-        st.subheader(f"📈 {selected_metric} Trends")
-        
-        fig1 = px.line(
-            filtered_df,
-            x='Year',
-            y='Value',
-            color='Country',
-            title=f'{selected_metric} ({year_range[0]}-{year_range[1]})',
-            labels={'Value': f'{selected_metric} ({filtered_df["Unit"].iloc[0]})'},
-            markers=True
-        )
-        
-        fig1.update_layout(height=500)
-        st.plotly_chart(fig1, width='stretch')
+        measure_suffix = f" – {selected_measure}" if selected_measure != 'Value' else ""
+        st.subheader(f"📈 {selected_metric} Trends{measure_suffix}")
+        trend_info = view['trend_info']
+        if view['trends'] is None:
+            st.info(
+                f"Not enough observations in {year_range[0]}-{year_range[1]} "
+                f"to compute the {selected_measure.lower()}."
+            )
+        else:
+            with run_timer.stage("render_charts"):
+                st.plotly_chart(json.loads(view['trends']), width='stretch')
+            if trend_info['webgl']:
+                st.caption(
+                    f"⚡ WebGL mode: {trend_info['points']:,} of {trend_info['total']:,} points sent "
+                    f"(downsampled per country, minimum and maximum kept)"
+                )
+            else:
+                st.caption(f"{trend_info['points']:,} points")
 
         
         # CHART 2: COUNTRY COMPARISON
@@ -431,45 +502,161 @@ if selected_countries:
         col_chart, col_info = st.columns([3, 1])
         
         with col_chart:
-            latest_data = filtered_df[filtered_df['Year'] == year_range[1]]
-            if not latest_data.empty:
-                fig2 = px.bar(
-                    latest_data.sort_values('Value', ascending=False),
-                    x='Country',
-                    y='Value',
-                    color='WHO_Region',
-                    title=f'{selected_metric} in {year_range[1]}',
-                    text='Value'
-                )
-                fig2.update_traces(texttemplate='%{text:.1f}', textposition='outside')
-                st.plotly_chart(fig2, width='stretch')
+            if view['comparison'] is not None:
+                with run_timer.stage("render_charts"):
+                    st.plotly_chart(json.loads(view['comparison']), width='stretch')
 
         
         with col_info:
             st.markdown("**Selected Countries**")
             for country in selected_countries:
-                country_data = filtered_df[filtered_df['Country'] == country]
-                if not country_data.empty:
-                    # البحث عن بيانات السنة المطلوبة بأمان
-                    year_data = country_data[country_data['Year'] == year_range[1]]
-                    if not year_data.empty:
-                        latest = year_data['Value'].iloc[0]
+                if country in view['latest']:
+                    latest, latest_year = view['latest'][country]
+                    if latest_year is None:
                         st.write(f"✅ **{country}**: {latest:.1f}")
                     else:
-                        # إذا لم توجد بيانات لهذه السنة، نأخذ آخر سنة متاحة
-                        latest_year = country_data['Year'].max()
-                        latest_value = country_data[country_data['Year'] == latest_year]['Value'].iloc[0]
-                        st.write(f"⚠️ **{country}**: {latest_value:.1f} ({latest_year})")
+                        st.write(f"⚠️ **{country}**: {latest:.1f} ({latest_year})")
                 else:
                     st.write(f"❌ **{country}**: No data")
         
+        # CHART 3: WORLD MAP
+        st.subheader("🗺️ World Map")
+        if st.checkbox("Show world map", value=False, key="show_map"):
+            with run_timer.stage("map"):
+                if DATA_BACKEND == "sqlite":
+                    map_frames = get_store_map_frames(sqlite_store, data_version, selected_metric)
+                else:
+                    map_frames = get_map_frames(dataset_index, data_version)
+                map_json = map_frames.figure_json(
+                    selected_metric, year_range[1], title=f"{selected_metric} by country"
+                )
+            if map_json is None:
+                st.info(f"No country data to map for {selected_metric}.")
+            else:
+                with run_timer.stage("render_charts"):
+                    st.plotly_chart(json.loads(map_json), width='stretch')
+                st.caption("▶ plays the years; drag the slider to scrub between them")
+        
+        # CHART 4: CROSS-INDICATOR CORRELATIONS
+        st.subheader("🔗 Indicator Correlations")
+        if st.checkbox("Show correlations across indicators", value=False, key="show_correlations"):
+            from correlations import MetricMatrix, strongest_pairs
+            from visualizations import correlation_heatmap, scatter_figure
+            with run_timer.stage("correlations"):
+                if DATA_BACKEND == "sqlite":
+                    # Every metric of the selected countries; small enough to lay out per rerun
+                    metric_matrix = MetricMatrix(DatasetIndex(
+                        sqlite_store.select(None, selected_countries, year_range, selected_region)
+                    ))
+                    matrix_rows = metric_matrix.rows(metric_matrix.countries)
+                else:
+                    metric_matrix = get_metric_matrix(dataset_index, data_version)
+                    region_countries = set(dataset_index.countries_in_region(selected_region))
+                    matrix_rows = metric_matrix.rows([c for c in selected_countries if c in region_countries],
+                                                     year_range)
+                corr, corr_counts = metric_matrix.correlations(matrix_rows)
+            st.plotly_chart(
+                correlation_heatmap(corr, corr_counts, f"Pearson correlation, {len(matrix_rows):,} country-years "
+                                                       f"({year_range[0]}-{year_range[1]})"),
+                width='stretch'
+            )
+            strongest = strongest_pairs(corr, selected_metric)
+            if strongest.empty:
+                st.info(f"Not enough common observations to correlate {selected_metric} with other indicators.")
+            else:
+                st.caption("Most correlated with " + selected_metric + ": " + ", ".join(
+                    f"{metric} (r = {r:+.2f})" for metric, r in strongest.items()))
+            
+            col_x, col_y = st.columns(2)
+            with col_x:
+                metric_x = st.selectbox("X indicator:", metric_matrix.metrics,
+                                        index=metric_matrix.metrics.index(selected_metric), key="corr_x")
+            with col_y:
+                default_y = strongest.index[0] if not strongest.empty else metric_x
+                metric_y = st.selectbox("Y indicator:", metric_matrix.metrics,
+                                        index=metric_matrix.metrics.index(default_y), key="corr_y")
+            pairs = metric_matrix.pairs(matrix_rows, metric_x, metric_y)
+            r, n = corr.loc[metric_x, metric_y], corr_counts.loc[metric_x, metric_y]
+            st.plotly_chart(
+                scatter_figure(pairs, metric_x, metric_y,
+                               f"{metric_y} vs {metric_x}: r = {r:.2f} (n = {n})" if r == r
+                               else f"{metric_y} vs {metric_x} (n = {n})"),
+                width='stretch'
+            )
+        
         # DATA TABLE
         st.subheader("📋 Data Table")
-        st.dataframe(
-            filtered_df[['Country', 'Year', 'Metric', 'Value', 'Unit', 'WHO_Region']]
-            .sort_values(['Country', 'Year']),
-            width='stretch'
-        )
+        col_search, col_sort, col_order = st.columns([2, 1, 1])
+        with col_search:
+            table_search = st.text_input("Search table:", key="table_search")
+        with col_sort:
+            table_sort = st.selectbox("Sort by:", ['Country, Year'] + TABLE_COLUMNS[1:], key="table_sort")
+        with col_order:
+            table_ascending = st.radio("Order:", ["Ascending", "Descending"], horizontal=True,
+                                       key="table_order") == "Ascending"
+        
+        # Rows come sorted by country and year from the index, so that order needs no sort
+        with run_timer.stage("table"):
+            table_rows, total_rows = table_page(
+                filtered_df,
+                page=st.session_state.get("table_page", 1),
+                sort_by=None if table_sort == 'Country, Year' else table_sort,
+                ascending=table_ascending,
+                search=table_search
+            )
+        page_count = max(1, -(-total_rows // PAGE_SIZE))
+        if st.session_state.get("table_page", 1) > page_count:
+            st.session_state.table_page = page_count
+        with run_timer.stage("table"):
+            st.dataframe(table_rows, width='stretch', hide_index=True)
+        
+        col_page, col_count = st.columns([1, 3])
+        with col_page:
+            st.number_input(f"Page (of {page_count}):", min_value=1, max_value=page_count, key="table_page")
+        with col_count:
+            first_row = (st.session_state.table_page - 1) * PAGE_SIZE
+            st.caption(f"Rows {min(first_row + 1, total_rows):,}–{first_row + len(table_rows):,} of {total_rows:,}")
+        
+        # EXPORT
+        # Written to a file chunk by chunk; the file is read once for the download and removed.
+        # Clicking the download reruns the script without the button, which lets Streamlit free the bytes.
+        st.subheader("⬇️ Export")
+        from exporter import (FORMATS, MAX_DOWNLOAD_BYTES, available_formats, export_file, file_name,
+                              index_chunks, sql_chunks)
+        col_scope, col_format, col_prepare = st.columns([2, 1, 1])
+        with col_scope:
+            export_scope = st.radio("Rows:", ["Current selection", f"All of {selected_metric}"],
+                                    horizontal=True, key="export_scope")
+        with col_format:
+            export_format = st.selectbox("Format:", available_formats(), key="export_format")
+        with col_prepare:
+            prepare_export = st.button("Prepare export", use_container_width=True)
+        st.caption(f"Downloads are limited to {MAX_DOWNLOAD_BYTES / 1024 ** 2:,.0f} MB; "
+                   "Parquet files are the smallest.")
+        if prepare_export:
+            whole_metric = export_scope != "Current selection"
+            export_filter = (None, None, None) if whole_metric else (selected_countries, year_range, selected_region)
+            if DATA_BACKEND == "sqlite":
+                chunks = sql_chunks(sqlite_store, selected_metric, *export_filter)
+            else:
+                chunks = index_chunks(dataset_index, selected_metric, *export_filter)
+            with run_timer.stage("export"):
+                path, result = export_file(chunks, export_format, "dashboard-export")
+            try:
+                if result['bytes'] > MAX_DOWNLOAD_BYTES:
+                    st.warning(f"The export is {result['bytes'] / 1024 ** 2:,.0f} MB, more than the "
+                               f"{MAX_DOWNLOAD_BYTES / 1024 ** 2:,.0f} MB download limit. "
+                               "Narrow the selection or choose Parquet.")
+                else:
+                    with open(path, 'rb') as f:
+                        data = f.read()
+                    download_name = file_name(selected_metric, export_format, None if whole_metric else year_range)
+                    st.download_button(f"Download {download_name}", data, file_name=download_name,
+                                       mime=FORMATS[export_format][1])
+                    st.caption(f"{result['rows']:,} rows, {result['bytes'] / 1024:,.1f} KB, "
+                               f"generated in {result['seconds']:.2f} s")
+            finally:
+                os.remove(path)
         
     else:
         st.warning("No data available for selected filters.")
@@ -512,12 +699,51 @@ with footer_col3:
 
 st.markdown("</div>", unsafe_allow_html=True)
 
+# ============================================
+# TIMINGS
+# ============================================
+run_record = run_timer.finish()
+log_run(run_record)
+if METRICS_FILE:
+    try:
+        write_prometheus(get_process_timings(), METRICS_FILE)
+    except OSError:
+        pass
+
 # ============================================
 # DEBUG INFO
 # ============================================
 if st.sidebar.checkbox("Show Debug Info", value=False):
     with st.expander("Debug Information"):
-        st.write(f"Total records: {len(df)}")
-        st.write(f"Countries in data: {df['Country'].nunique()}")
+        st.write(f"Total records: {dimensions['rows']}")
+        st.write(f"Countries in data: {len(available_countries)}")
         st.write(f"Available countries: {available_countries}")
-        st.write(f"Data source: {st.session_state.data_source}")
\ No newline at end of file
+        st.write(f"Data source: {st.session_state.data_source}")
+        st.write(f"Dataset version: {data_version[:16]}")
+        if DATA_BACKEND != "sqlite" and dataset.shared_path:
+            st.write(f"Memory-mapped (shared by all workers): {dataset.shared_path}")
+        cache_stats = view_cache.stats()
+        st.write(
+            f"View cache: {cache_stats['entries']} views, "
+            f"{cache_stats['bytes'] / 2**20:.1f} of {cache_stats['max_bytes'] / 2**20:.0f} MB, "
+            f"{cache_stats['hits']} hits / {cache_stats['misses']} misses "
+            f"({cache_stats['hit_rate']:.0%}), {cache_stats['evictions']} evictions"
+        )
+        if DATA_BACKEND != "sqlite":
+            st.write("Memory by column (compact layout vs. object/64-bit layout):")
+            st.dataframe(
+                memory_report(df).style.format({'Saved': '{:.0%}'}),
+                width='stretch',
+                hide_index=True
+            )
+        
+        st.write("Stage timings of this rerun (ms):")
+        st.json(run_record['stages'])
+        timing_format = {column: '{:.1f}' for column in ['Mean (ms)', 'p50 (ms)', 'p95 (ms)', 'p99 (ms)']}
+        for title, timings in [("this session", st.session_state.timings), ("all sessions", get_process_timings())]:
+            st.write(f"Stage timings, {title}:")
+            st.dataframe(
+                pd.DataFrame(timings.summary()).style.format(timing_format),
+                width='stretch',
+                hide_index=True
+            )
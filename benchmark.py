@@ -0,0 +1,303 @@
+# benchmark.py
+"""
+Benchmarks for the loading, filtering and rendering pipeline.
+
+Every benchmark runs headlessly on a synthetic long-format dataset at a
+given scale (countries x metrics x years) and reports its best wall time
+over a few repeats and its peak traced memory. Results can be saved as a
+JSON baseline; a later run compared against that baseline fails when a
+benchmark got slower or hungrier than the allowed threshold.
+
+Usage:
+    python benchmark.py                               # small and medium scales
+    python benchmark.py --scales large --repeat 5
+    python benchmark.py --countries 500 --metrics 20 --years 30 --only filter kpis_rollups
+    python benchmark.py --save-baseline               # write benchmark_baseline.json
+    python benchmark.py --baseline benchmark_baseline.json --threshold 0.25
+"""
+
+import argparse
+import functools
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from analytics import SeriesAnalytics
+from choropleth import MapFrames
+from correlations import MetricMatrix
+from data_index import DatasetIndex, sort_for_index
+from data_processor import build_who_dataset, compact_dtypes, create_other_metrics
+from dataset_refresh import RAW_DIR, WHO_FILE_NAME
+from derived_metrics import add_derived_columns
+from dimensions import country_dimension
+from kpis import compute_kpis
+from rollups import Rollups
+from snapshot_cache import read_arrow, write_arrow
+from visualizations import trends_figure
+
+# name: (countries, metrics, years); run_benchmarks also takes such tuples directly
+SCALES = {
+    'small': (6, 10, 12),
+    'medium': (50, 50, 30),
+    'large': (250, 200, 60),
+}
+
+DEFAULT_SCALES = ['small', 'medium']
+BASELINE_FILE = "benchmark_baseline.json"
+
+# Allowed slowdown (or memory growth) relative to the baseline
+DEFAULT_THRESHOLD = 0.25
+
+# Differences below these are noise, whatever the ratio
+MIN_SECONDS = 0.005
+MIN_PEAK_MB = 1.0
+
+# Countries selected in the filter, KPI and figure benchmarks
+SELECTED_COUNTRIES = 50
+
+WHO_FILE = os.path.join(RAW_DIR, WHO_FILE_NAME)
+
+
+def synthetic_dataset(n_countries, n_metrics, n_years, seed=0):
+    """Long-format dataset in the dashboard schema with a random walk per series"""
+    rng = np.random.RandomState(seed)
+    countries = [f"Country {i:03d}" for i in range(n_countries)]
+    metrics = [f"Metric {i:03d}" for i in range(n_metrics)]
+    years = np.arange(2024 - n_years, 2024)
+    regions = np.array(['AFRO', 'AMRO', 'EMRO', 'EURO', 'SEARO', 'WPRO'])
+
+    base = rng.uniform(10, 90, (n_countries, n_metrics, 1))
+    values = base + rng.normal(0, 1, (n_countries, n_metrics, n_years)).cumsum(axis=2)
+    n_rows = values.size
+    return pd.DataFrame({
+        'Country': np.repeat(countries, n_metrics * n_years),
+        'Year': np.tile(years, n_countries * n_metrics),
+        'Metric': np.tile(np.repeat(metrics, n_years), n_countries),
+        'Value': values.reshape(n_rows).round(2),
+        'Unit': '%',
+        'Data_Quality': 'Medium',
+        'WHO_Region': np.repeat(regions[np.arange(n_countries) % len(regions)], n_metrics * n_years),
+        'Development_Level': 'Mixed',
+        'Source': 'Synthetic',
+    })
+
+
+def prepare_dataset(raw):
+    """The steps build_who_dataset applies after reading its sources"""
+    return compact_dtypes(sort_for_index(add_derived_columns(raw)))
+
+
+def measure(func, repeat=3):
+    """
+    Best wall time over `repeat` calls and peak traced memory of one more
+    call, after an untimed warm-up call (imports, lazy initialisation, the
+    fixtures the benchmark reads)
+    """
+    func()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {'seconds': min(times), 'peak_mb': peak / 2**20}
+
+
+class ScaleFixtures:
+    """Inputs of the benchmarks at one scale, each built on first use"""
+
+    def __init__(self, n_countries, n_metrics, n_years, work_dir):
+        self.size = (n_countries, n_metrics, n_years)
+        self.work_dir = work_dir
+        # Synthetic years end in 2023, so the ranges need no index
+        self.year_range = (2023 - min(10, n_years - 1), 2023)
+
+    @functools.cached_property
+    def raw(self):
+        return synthetic_dataset(*self.size)
+
+    @functools.cached_property
+    def prepared(self):
+        return prepare_dataset(self.raw)
+
+    @functools.cached_property
+    def snapshot(self):
+        path = os.path.join(self.work_dir, "benchmark_{}_{}_{}.arrow".format(*self.size))
+        write_arrow(self.prepared, path)
+        return path
+
+    @functools.cached_property
+    def index(self):
+        return DatasetIndex(self.prepared)
+
+    @functools.cached_property
+    def rollups(self):
+        return Rollups(self.prepared)
+
+    @functools.cached_property
+    def metric(self):
+        return self.index.metrics[0]
+
+    @functools.cached_property
+    def countries(self):
+        return self.index.countries[:SELECTED_COUNTRIES]
+
+    @functools.cached_property
+    def filtered(self):
+        return self.index.select(self.metric, self.countries, self.year_range)
+
+    @functools.cached_property
+    def country_names(self):
+        return self.raw['Country'].unique()
+
+    @functools.cached_property
+    def matrix(self):
+        return MetricMatrix(self.index)
+
+    @functools.cached_property
+    def matrix_rows(self):
+        return self.matrix.rows(self.countries, self.year_range)
+
+    @functools.cached_property
+    def mapped(self):
+        # Synthetic countries take the ISO3 codes of member states in turn, so every row is mapped
+        iso3 = country_dimension().iso3
+        return self.prepared.assign(ISO3=iso3[pd.factorize(self.prepared['Country'])[0] % len(iso3)])
+
+
+# name: benchmark taking the fixtures of its scale; only the fixtures it reads are built
+BENCHMARKS = {
+    'load_snapshot': lambda f: read_arrow(f.snapshot),
+    'prepare_dataset': lambda f: prepare_dataset(f.raw),
+    'create_other_metrics': lambda f: create_other_metrics(f.country_names),
+    'value_indexed': lambda f: add_derived_columns(f.prepared, base_year=f.year_range[0], columns=['Value_Indexed']),
+    'build_index': lambda f: DatasetIndex(f.prepared),
+    'filter': lambda f: f.index.select(f.metric, f.countries, f.year_range),
+    'kpis_rollups': lambda f: f.rollups.kpis(f.metric, f.countries, f.year_range),
+    'kpis_filtered': lambda f: compute_kpis(f.filtered, f.year_range),
+    'latest_values': lambda f: f.index.latest_values(f.metric, f.countries, f.year_range[1], since=f.year_range[0]),
+    'series_analytics': lambda f: SeriesAnalytics(f.index).measure('Trend slope'),
+    'map_frames': lambda f: MapFrames(f.mapped),
+    'metric_matrix': lambda f: MetricMatrix(f.index),
+    'correlations': lambda f: f.matrix.correlations(f.matrix_rows),
+    'trends_figure': lambda f: trends_figure(
+        f.filtered, 'Year', 'Value', 'Country', f.metric, {})[0].to_json(),
+}
+
+# Benchmarks of the bundled WHO file, independent of the scale
+FILE_BENCHMARKS = {
+    'load_who_file': lambda f: build_who_dataset(WHO_FILE),
+}
+
+
+def scale_benchmarks(n_countries, n_metrics, n_years, work_dir, only=None):
+    """{benchmark name: zero-argument callable} for one scale, limited to `only` if given"""
+    fixtures = ScaleFixtures(n_countries, n_metrics, n_years, work_dir)
+    benchmarks = dict(BENCHMARKS)
+    if os.path.exists(WHO_FILE):
+        benchmarks.update(FILE_BENCHMARKS)
+    return {
+        name: functools.partial(benchmark, fixtures)
+        for name, benchmark in benchmarks.items() if not only or name in only
+    }
+
+
+def scale_size(scale):
+    """(name, (countries, metrics, years)) of a scale name or size tuple"""
+    if isinstance(scale, str):
+        return scale, SCALES[scale]
+    return "{}x{}x{}".format(*scale), tuple(scale)
+
+
+def run_benchmarks(scales=DEFAULT_SCALES, repeat=3, only=None, log=print):
+    """
+    {scale: {benchmark: {'seconds', 'peak_mb'}}} for the given scale names
+    or (countries, metrics, years) tuples
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        for scale in scales:
+            name, (n_countries, n_metrics, n_years) = scale_size(scale)
+            log(f"📏 {name}: {n_countries} countries x {n_metrics} metrics x {n_years} years "
+                f"= {n_countries * n_metrics * n_years:,} rows")
+            results[name] = {}
+            for benchmark, func in scale_benchmarks(n_countries, n_metrics, n_years, work_dir, only).items():
+                results[name][benchmark] = measure(func, repeat)
+                log(f"   {benchmark:<22} {results[name][benchmark]['seconds'] * 1000:10.2f} ms "
+                    f"{results[name][benchmark]['peak_mb']:10.1f} MB")
+    return results
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Descriptions of every benchmark that regressed beyond `threshold` against `baseline`"""
+    regressions = []
+    for scale, benchmarks in results.items():
+        for name, result in benchmarks.items():
+            base = baseline.get(scale, {}).get(name)
+            if base is None:
+                continue
+            for field, floor in (('seconds', MIN_SECONDS), ('peak_mb', MIN_PEAK_MB)):
+                now, before = result[field], base[field]
+                if now > before * (1 + threshold) and now - before > floor:
+                    regressions.append(
+                        f"{scale}/{name}: {field} {before:.4g} -> {now:.4g} (+{now / before - 1:.0%})"
+                    )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard data pipeline")
+    parser.add_argument("--scales", nargs="+", choices=list(SCALES), default=DEFAULT_SCALES)
+    parser.add_argument("--countries", type=int, help="Run one custom scale with this many countries")
+    parser.add_argument("--metrics", type=int, help="Run one custom scale with this many metrics")
+    parser.add_argument("--years", type=int, help="Run one custom scale with this many years")
+    parser.add_argument("--only", nargs="+", help="Run only these benchmarks")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per benchmark (best is kept)")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against this JSON baseline")
+    parser.add_argument("--save-baseline", action="store_true", help=f"Write the results to {BASELINE_FILE}")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"Allowed regression as a fraction (default: {DEFAULT_THRESHOLD})")
+    args = parser.parse_args()
+
+    scales = args.scales
+    if args.countries or args.metrics or args.years:
+        # Dimensions not given keep their medium-scale size
+        default = SCALES['medium']
+        scales = [(args.countries or default[0], args.metrics or default[1], args.years or default[2])]
+    if args.only:
+        unknown = set(args.only) - set(BENCHMARKS) - set(FILE_BENCHMARKS)
+        if unknown:
+            parser.error(f"unknown benchmark(s): {', '.join(sorted(unknown))}")
+
+    results = run_benchmarks(scales, args.repeat, args.only)
+    for path in filter(None, [args.output, BASELINE_FILE if args.save_baseline else None]):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Results written to {path}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print(f"❌ {len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"   {line}")
+            sys.exit(1)
+        print(f"✅ No regression beyond {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# bulk_load.py
+"""
+Idempotent bulk loader for health_data.db.
+
+Loads CSV, Parquet or WHO GHO exports into the long-format observations
+table of sqlite_store. Rows are upserted on the natural key
+(country, year, metric), so running the same load twice leaves the
+database unchanged.
+
+Usage:
+    python bulk_load.py vaccination.csv
+    python bulk_load.py data/processed/vaccination.parquet --db health_data.db
+    python bulk_load.py data/raw/who_life_expectancy.csv --replace
+"""
+
+import argparse
+import os
+import time
+
+import pandas as pd
+
+from data_loader import DEFAULT_CHUNK_ROWS, iter_dashboard_chunks
+from sqlite_store import DB_FILE, LOAD_BATCH_ROWS, load_frames, open_store
+
+# WHO GHO CSV downloads of a single indicator (data/raw/who_life_expectancy.csv)
+WHO_INDICATOR_COLUMNS = {
+    'COUNTRY': 'Country',
+    'YEAR': 'Year',
+    'Numeric': 'Value',
+    'GHO (DISPLAY)': 'Metric',
+}
+
+REQUIRED_COLUMNS = ['Country', 'Year', 'Metric', 'Value']
+OPTIONAL_COLUMNS = ['Unit', 'WHO_Region', 'Development_Level']
+
+
+def detect_format(path):
+    """'parquet', 'gho' (long GHO export), 'who' (single-indicator download) or 'csv'"""
+    if path.lower().endswith('.parquet'):
+        return 'parquet'
+    header = pd.read_csv(path, nrows=0, encoding='utf-8-sig').columns
+    if 'IndicatorCode' in header and 'FactValueNumeric' in header:
+        return 'gho'
+    if set(WHO_INDICATOR_COLUMNS) <= set(header):
+        return 'who'
+    if set(REQUIRED_COLUMNS) <= set(header):
+        return 'csv'
+    raise ValueError(f"Unrecognised input format: {path}")
+
+
+def _csv_chunks(path, rename, chunksize):
+    header = pd.read_csv(path, nrows=0, encoding='utf-8-sig').columns
+    wanted = [c for c in header if rename.get(c, c) in REQUIRED_COLUMNS + OPTIONAL_COLUMNS]
+    for chunk in pd.read_csv(path, usecols=wanted, chunksize=chunksize, encoding='utf-8-sig'):
+        yield chunk.rename(columns=rename)
+
+
+def _parquet_chunks(path, chunksize):
+    import pyarrow.parquet as pq
+
+    parquet = pq.ParquetFile(path)
+    columns = [c for c in parquet.schema_arrow.names if c in REQUIRED_COLUMNS + OPTIONAL_COLUMNS]
+    for batch in parquet.iter_batches(batch_size=chunksize, columns=columns):
+        yield batch.to_pandas()
+
+
+def iter_source_chunks(path, chunksize=DEFAULT_CHUNK_ROWS):
+    """Dashboard-schema chunks for any supported input file"""
+    fmt = detect_format(path)
+    if fmt == 'parquet':
+        return _parquet_chunks(path, chunksize)
+    if fmt == 'gho':
+        return iter_dashboard_chunks(path, chunksize)
+    if fmt == 'who':
+        return _csv_chunks(path, WHO_INDICATOR_COLUMNS, chunksize)
+    return _csv_chunks(path, {}, chunksize)
+
+
+def bulk_load(paths, db_path=DB_FILE, replace=False, chunksize=LOAD_BATCH_ROWS):
+    """Load every file in `paths` into `db_path`; returns the rows written"""
+    store = open_store(db_path)
+    frames = (chunk for path in paths for chunk in iter_source_chunks(path, chunksize))
+    version = f"bulk:{int(time.time())}"
+    return load_frames(store.connect(), frames, replace=replace, version=version, batch_rows=chunksize)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-load health data into the dashboard database")
+    parser.add_argument("sources", nargs="+", help="CSV, Parquet or WHO GHO export files")
+    parser.add_argument("--db", default=DB_FILE, help=f"SQLite database (default: {DB_FILE})")
+    parser.add_argument("--replace", action="store_true",
+                        help="Replace the current contents instead of upserting into them")
+    parser.add_argument("--chunksize", type=int, default=LOAD_BATCH_ROWS,
+                        help=f"Rows per transaction (default: {LOAD_BATCH_ROWS})")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    rows = bulk_load(args.sources, args.db, replace=args.replace, chunksize=args.chunksize)
+    elapsed = time.perf_counter() - start
+
+    conn = open_store(args.db).connect()
+    total = conn.execute("SELECT COUNT(*) FROM observations").fetchone()[0]
+    print(f"✅ Loaded {rows:,} rows in {elapsed:.2f}s ({rows / max(elapsed, 1e-9):,.0f} rows/s)")
+    print(f"📊 Observations in {args.db}: {total:,}")
+    print(f"💾 File size: {os.path.getsize(args.db):,} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+# choropleth.py
+"""
+World map of one indicator for every country, with a year slider.
+
+All (metric, year) frames of a dataset version are computed once, in one
+pass over the rows sorted by (metric, year, country): countries resolve to
+ISO3 codes through their Country_Key (frames without one look up their
+names and the ISO3 column of GHO exports), and every frame is serialized
+to its Plotly JSON right away. The frames of a metric are kept as one
+spliced string, stored once whatever the start year or title of the map.
+
+The animated figure of a metric is a small skeleton (first frame, colour
+scale fixed over all years, slider and play buttons) with the spliced
+frames appended as text. Skeletons are kept in a bounded LRU, so opening
+the map or switching back to a metric costs one string concatenation, and
+scrubbing years happens in the browser without a rerun.
+"""
+
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from dimensions import country_dimension
+
+COLOR_SCALE = 'Viridis'
+
+# Figure skeletons kept per (metric, start year, title)
+SKELETON_CACHE_SIZE = 128
+
+FRAME_SEPARATOR = ', '
+
+
+class MapFrames:
+    """Serialized choropleth frames of every (metric, year) of a dataset"""
+
+    def __init__(self, df, dimension=None):
+        df = df[df['Value'].notna()]
+        if dimension is None and 'Country_Key' in df.columns:
+            dimension = country_dimension()
+            keys = df['Country_Key'].to_numpy(dtype=np.int64)
+        else:
+            dimension = dimension or country_dimension()
+            keys = dimension.lookup(df['Country'], df['ISO3'] if 'ISO3' in df.columns else None)
+        iso3 = dimension.iso3_of(keys)
+        if 'ISO3' in df.columns:
+            # Territories outside the member states keep the code of their source
+            iso3 = np.where(keys >= 0, iso3, df['ISO3'].astype(object).to_numpy())
+        located = pd.notna(iso3)
+
+        metric_codes, self.metrics = pd.factorize(df['Metric'].to_numpy()[located])
+        countries = df['Country'].astype(str).to_numpy()[located]
+        years = df['Year'].to_numpy(dtype=np.int64)[located]
+        values = df['Value'].to_numpy(dtype=np.float64)[located]
+        iso3 = iso3[located]
+        units = df['Unit'].astype(str).to_numpy()[located] if 'Unit' in df.columns else np.full(len(years), '')
+
+        order = np.lexsort((countries, years, metric_codes))
+        metric_codes, years, values = metric_codes[order], years[order], values[order]
+        countries, iso3, units = countries[order], iso3[order], units[order]
+
+        starts = np.flatnonzero(np.r_[True, (metric_codes[1:] != metric_codes[:-1]) | (years[1:] != years[:-1])]) \
+            if len(years) else np.empty(0, dtype=np.int64)
+        ends = np.r_[starts[1:], len(years)]
+
+        frames = {}        # metric -> [(year, frame JSON)] until spliced
+        self.ranges = {}   # metric -> (min, max, unit)
+        for start, end in zip(starts, ends):
+            metric, year = self.metrics[metric_codes[start]], int(years[start])
+            frame = {
+                'name': str(year),
+                'data': [{
+                    'type': 'choropleth',
+                    'locations': iso3[start:end].tolist(),
+                    'z': np.round(values[start:end], 4).tolist(),
+                    'text': countries[start:end].tolist(),
+                }],
+            }
+            frames.setdefault(metric, []).append((year, json.dumps(frame)))
+        self._years = {}   # metric -> [year]
+        self._frames = {}  # metric -> (spliced frames JSON, start of each frame, length of each frame)
+        for metric in list(frames):
+            texts = [text for _, text in frames[metric]]
+            self._years[metric] = [year for year, _ in frames.pop(metric)]
+            lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+            starts = np.r_[0, np.cumsum(lengths + len(FRAME_SEPARATOR))[:-1]]
+            self._frames[metric] = (FRAME_SEPARATOR.join(texts), starts, lengths)
+        # One colour scale per metric across all years, so frames stay comparable
+        metric_starts = np.flatnonzero(np.r_[True, metric_codes[1:] != metric_codes[:-1]]) if len(years) \
+            else np.empty(0, dtype=np.int64)
+        if len(metric_starts):
+            lows, highs = np.minimum.reduceat(values, metric_starts), np.maximum.reduceat(values, metric_starts)
+            for start, low, high in zip(metric_starts, lows, highs):
+                self.ranges[self.metrics[metric_codes[start]]] = (float(low), float(high), units[start])
+        self._skeletons = OrderedDict()
+        self._lock = threading.Lock()
+
+    def years(self, metric):
+        return list(self._years.get(metric, []))
+
+    def frame_json(self, metric, year):
+        """Plotly JSON of the frame of `metric` in `year`"""
+        spliced, starts, lengths = self._frames[metric]
+        i = self._years[metric].index(year)
+        return spliced[starts[i]:starts[i] + lengths[i]]
+
+    def initial_year(self, metric, year):
+        """Latest year with a frame at or before `year` (the first year if none)"""
+        years = self.years(metric)
+        if not years:
+            return None
+        earlier = [y for y in years if y <= year]
+        return earlier[-1] if earlier else years[0]
+
+    def figure_json(self, metric, year, title=None):
+        """
+        Plotly JSON of the animated map of `metric`, starting at the latest
+        frame at or before `year`; None without data
+        """
+        if metric not in self._frames:
+            return None
+        start_year = self.initial_year(metric, year)
+        key = (metric, start_year, title)
+        with self._lock:
+            skeleton = self._skeletons.get(key)
+            if skeleton is not None:
+                self._skeletons.move_to_end(key)
+        if skeleton is None:
+            skeleton = self._skeleton(metric, start_year, title or metric)
+            with self._lock:
+                self._skeletons[key] = skeleton
+                while len(self._skeletons) > SKELETON_CACHE_SIZE:
+                    self._skeletons.popitem(last=False)
+        return skeleton[:-1] + ', "frames": [' + self._frames[metric][0] + ']}'
+
+    def _skeleton(self, metric, start_year, title):
+        import plotly.graph_objects as go
+
+        years = self._years[metric]
+        first = json.loads(self.frame_json(metric, start_year))['data'][0]
+        zmin, zmax, unit = self.ranges[metric]
+        animate = {'frame': {'duration': 0, 'redraw': True}, 'mode': 'immediate', 'transition': {'duration': 0}}
+        fig = go.Figure(
+            go.Choropleth(
+                locations=first['locations'], z=first['z'], text=first['text'],
+                zmin=zmin, zmax=zmax, colorscale=COLOR_SCALE, colorbar_title_text=unit,
+                hovertemplate='%{text}<br>%{z:.1f}<extra></extra>',
+            ),
+            layout=dict(
+                title=title,
+                geo=dict(showframe=False, showcoastlines=False, projection_type='natural earth'),
+                margin=dict(l=0, r=0, t=50, b=0),
+                sliders=[dict(
+                    active=years.index(start_year),
+                    currentvalue=dict(prefix='Year: '),
+                    steps=[dict(method='animate', label=str(year), args=[[str(year)], animate])
+                           for year in years],
+                )],
+                updatemenus=[dict(
+                    type='buttons', direction='left', x=0, y=0, xanchor='right', yanchor='top',
+                    buttons=[
+                        dict(label='▶', method='animate',
+                             args=[None, {**animate, 'frame': {'duration': 700, 'redraw': True},
+                                          'fromcurrent': True}]),
+                        dict(label='❚❚', method='animate', args=[[None], animate]),
+                    ],
+                )],
+            ),
+        )
+        # The frames are appended as serialized text by figure_json: nothing is rebuilt per frame
+        return fig.to_json()
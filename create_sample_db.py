@@ -25,6 +25,18 @@ def create_sample_database():
     )
     ''')
     
+    # قواعد البيانات التي أُنشئت قبل الفهرس الفريد قد تحتوي على صفوف مكررة: نحتفظ بآخر صف لكل (دولة، سنة)
+    cursor.execute('''
+    DELETE FROM health_metrics
+    WHERE id NOT IN (SELECT MAX(id) FROM health_metrics GROUP BY country, year)
+    ''')
+    
+    # مفتاح طبيعي (الدولة، السنة) حتى لا تتكرر البيانات عند إعادة التشغيل
+    cursor.execute('''
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_health_metrics_country_year
+    ON health_metrics (country, year)
+    ''')
+    
     # بيانات واقعية للدول المختارة
     countries = ['Japan', 'Germany', 'Brazil', 'United States', 'United Kingdom']
     
@@ -62,6 +74,12 @@ def create_sample_database():
     (country, year, life_expectancy, child_mortality, health_expenditure, 
      physicians_per_10k, hospital_beds_per_10k)
     VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (country, year) DO UPDATE SET
+        life_expectancy = excluded.life_expectancy,
+        child_mortality = excluded.child_mortality,
+        health_expenditure = excluded.health_expenditure,
+        physicians_per_10k = excluded.physicians_per_10k,
+        hospital_beds_per_10k = excluded.hospital_beds_per_10k
     ''', data)
     
     conn.commit()
@@ -0,0 +1,262 @@
+# data_index.py
+"""
+Sorted (Metric, Country, Year) index over the dashboard dataset.
+
+The dataset is stored sorted by metric, then country, then year. Every
+row gets a monotonically increasing integer key
+
+    (metric_code * n_countries + country_code) * n_years + (year - min_year)
+
+so selecting one metric, a set of countries and a year range is one
+vectorized `searchsorted` for the slice bounds of every country plus a
+gather of the rows inside them. The cost scales with the rows returned,
+not with the size of the dataset.
+
+The same keys answer as-of questions ("latest value at or before 2015",
+like `pandas.merge_asof`) for many series at once: one `searchsorted` per
+selected country over the keys of the rows that hold a value. Series
+observed on different year grids (every 2 years, every 10 years) need no
+alignment first.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def _codes(df):
+    """Metric codes in order of first appearance, country codes alphabetical"""
+    metric_codes, metrics = pd.factorize(df['Metric'], sort=False)
+    country_codes, countries = pd.factorize(df['Country'], sort=True)
+    return metric_codes, list(metrics), country_codes, list(countries)
+
+
+def sort_for_index(df):
+    """Return `df` sorted by (Metric, Country, Year) with a fresh RangeIndex"""
+    metric_codes, _, country_codes, _ = _codes(df)
+    order = np.lexsort((df['Year'].to_numpy(), country_codes, metric_codes))
+    if np.array_equal(order, np.arange(len(df))):
+        # Already sorted: keep the frame (and any memory-mapped columns) as is
+        if df.index.equals(pd.RangeIndex(len(df))):
+            return df
+        return df.reset_index(drop=True)
+    return df.take(order).reset_index(drop=True)
+
+
+def _region_codes(regions):
+    """Integer code of every row and the region of each code (categorical codes as they are)"""
+    if isinstance(regions.dtype, pd.CategoricalDtype):
+        return regions.cat.codes.to_numpy(), list(regions.cat.categories)
+    codes, uniques = pd.factorize(regions)
+    return codes, list(uniques)
+
+
+class DatasetIndex:
+    """Read-only sorted dataset with per-metric partitions and per-country offsets"""
+
+    def __init__(self, df):
+        self.df = sort_for_index(df)
+        metric_codes, self.metrics, country_codes, self.countries = _codes(self.df)
+        self._metric_lookup = {metric: i for i, metric in enumerate(self.metrics)}
+        self._country_lookup = {country: i for i, country in enumerate(self.countries)}
+
+        # Region key of every country code, taken from its first row; region
+        # filters compare these integers, never the region names
+        first_rows = np.unique(country_codes, return_index=True)[1]
+        if 'WHO_Region' in self.df.columns:
+            region_codes, regions = _region_codes(self.df['WHO_Region'])
+            self._country_regions = region_codes[first_rows]
+        else:
+            self._country_regions, regions = np.zeros(len(self.countries), dtype=np.int64), ['Global']
+        self._region_lookup = {str(region): i for i, region in enumerate(regions)}
+        self.regions = sorted(str(regions[i]) for i in np.unique(self._country_regions) if i >= 0)
+
+        years = self.df['Year'].to_numpy()
+        self.min_year = int(years.min()) if len(years) else 0
+        self.max_year = int(years.max()) if len(years) else 0
+        self._n_countries = len(self.countries)
+        self._n_years = self.max_year - self.min_year + 1
+
+        series = metric_codes.astype(np.int64) * self._n_countries + country_codes
+        self._keys = series * self._n_years + (years - self.min_year)
+
+        # offsets[m * n_countries + c] .. offsets[m * n_countries + c + 1] is one series
+        n_series = len(self.metrics) * self._n_countries
+        self.offsets = np.searchsorted(series, np.arange(n_series + 1), side='left')
+
+        # Keys of the rows holding a value, for the as-of lookups
+        self._values = self.df['Value'].to_numpy(dtype=np.float64) if 'Value' in self.df.columns \
+            else np.full(len(self.df), np.nan)
+        observed = ~np.isnan(self._values)
+        if observed.all():
+            self._observed, self._observed_keys = None, self._keys
+        else:
+            self._observed = np.flatnonzero(observed)
+            self._observed_keys = self._keys[self._observed]
+
+    def __len__(self):
+        return len(self.df)
+
+    def series_grid(self):
+        """
+        (series, year offset) of every row, where series is
+        metric_code * n_countries + country_code and year offset is
+        year - min_year
+        """
+        return np.divmod(self._keys, self._n_years)
+
+    def metric_slice(self, metric):
+        """Row slice holding every row of `metric`"""
+        m = self._metric_lookup.get(metric)
+        if m is None:
+            return slice(0, 0)
+        return slice(int(self.offsets[m * self._n_countries]),
+                     int(self.offsets[(m + 1) * self._n_countries]))
+
+    def series_slice(self, metric, country):
+        """Row slice holding the (metric, country) series, ordered by year"""
+        m = self._metric_lookup.get(metric)
+        c = self._country_lookup.get(country)
+        if m is None or c is None:
+            return slice(0, 0)
+        k = m * self._n_countries + c
+        return slice(int(self.offsets[k]), int(self.offsets[k + 1]))
+
+    def metric_years(self, metric):
+        """Sorted distinct years with data for `metric`"""
+        return np.unique(self.df['Year'].to_numpy()[self.metric_slice(metric)])
+
+    def countries_in_region(self, region):
+        """Countries whose WHO region is `region` ('All' for every country)"""
+        if region is None or region == 'All':
+            return list(self.countries)
+        key = self._region_lookup.get(region, -2)
+        return [self.countries[i] for i in np.flatnonzero(self._country_regions == key)]
+
+    def _country_codes(self, countries, region=None):
+        """Sorted codes of the known `countries` inside `region`"""
+        codes = np.array(sorted(self._country_lookup[c] for c in set(countries) if c in self._country_lookup),
+                         dtype=np.int64)
+        if region is not None and region != 'All':
+            codes = codes[self._country_regions[codes] == self._region_lookup.get(region, -2)]
+        return codes
+
+    def row_positions(self, metric, countries, year_range=None, region=None):
+        """
+        Positions of the rows matching the filter, grouped by country
+        (alphabetically) and ordered by year inside each country.
+        """
+        m = self._metric_lookup.get(metric)
+        codes = self._country_codes(countries, region)
+        if m is None or not len(codes):
+            return np.empty(0, dtype=np.int64)
+
+        y0, y1 = (self.min_year, self.max_year) if year_range is None else year_range
+        y0 = min(max(int(y0), self.min_year), self.max_year + 1)
+        y1 = max(min(int(y1), self.max_year), self.min_year - 1)
+        if y0 > y1:
+            return np.empty(0, dtype=np.int64)
+
+        base = (m * self._n_countries + codes) * self._n_years
+        starts = np.searchsorted(self._keys, base + (y0 - self.min_year), side='left')
+        ends = np.searchsorted(self._keys, base + (y1 - self.min_year), side='right')
+        lengths = ends - starts
+        total = int(lengths.sum())
+        if total == 0:
+            return np.empty(0, dtype=np.int64)
+
+        # Concatenate the ranges [start, end) without a Python loop
+        shifts = np.repeat(starts - np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths)
+        return np.arange(total, dtype=np.int64) + shifts
+
+    def select(self, metric, countries, year_range=None, region=None):
+        """Rows for one metric, a set of countries, an inclusive year range and a region"""
+        return self.df.take(self.row_positions(metric, countries, year_range, region))
+
+    def asof_positions(self, metric, countries, year, direction='backward', limit=None, region=None):
+        """
+        As-of lookup for every selected series in one call.
+
+        Returns (countries, positions): the selected countries (alphabetical,
+        region applied) and the row position of the latest observation at or
+        before `year` ('backward') or the earliest at or after it
+        ('forward'). Rows without a value are skipped. Matches past `limit`
+        (a year: earlier than it going backward, later going forward) and
+        series without a match get position -1.
+        """
+        m = self._metric_lookup.get(metric)
+        codes = self._country_codes(countries, region)
+        names = [self.countries[c] for c in codes]
+        if m is None or not len(codes):
+            return names, np.full(len(codes), -1, dtype=np.int64)
+
+        keys = self._observed_keys
+        base = (m * self._n_countries + codes) * self._n_years
+        if direction == 'backward':
+            offset = min(int(year), self.max_year) - self.min_year
+            found = np.searchsorted(keys, base + offset, side='right') - 1
+            matched = found >= 0
+            bound = base + (max(int(limit) - self.min_year, 0) if limit is not None else 0)
+            matched[matched] &= keys[found[matched]] >= bound[matched]
+        elif direction == 'forward':
+            offset = max(int(year), self.min_year) - self.min_year
+            found = np.searchsorted(keys, base + offset, side='left')
+            matched = found < len(keys)
+            end = min(int(limit) - self.min_year, self._n_years - 1) if limit is not None else self._n_years - 1
+            matched[matched] &= keys[found[matched]] <= (base + end)[matched]
+        else:
+            raise ValueError(f"Unknown direction: {direction}")
+        # A year outside the dataset on the far side leaves no match
+        if offset < 0 or offset >= self._n_years or not matched.any():
+            return names, np.full(len(codes), -1, dtype=np.int64)
+
+        if self._observed is not None:
+            found = np.where(matched, self._observed[np.where(matched, found, 0)], -1)
+        return names, np.where(matched, found, -1)
+
+    def values_at(self, positions):
+        """(values, years) at row positions from `asof_positions`, NaN and -1 where there is no row"""
+        matched = positions >= 0
+        if not matched.any():
+            return np.full(len(positions), np.nan), np.full(len(positions), -1, dtype=np.int64)
+        rows = np.where(matched, positions, 0)
+        years = np.where(matched, self._keys[rows] % self._n_years + self.min_year, -1)
+        return np.where(matched, self._values[rows], np.nan), years
+
+    def latest_values(self, metric, countries, year, since=None, region=None):
+        """
+        (countries, values, years) of the latest observation of each series
+        at or before `year`, and not before `since` when given
+        """
+        names, positions = self.asof_positions(metric, countries, year, 'backward', since, region)
+        values, years = self.values_at(positions)
+        return names, values, years
+
+    def interpolated_values(self, metric, countries, year, region=None):
+        """
+        (countries, values) of each series at `year`: the observation itself,
+        or linear interpolation between the nearest observations on both
+        sides; NaN when the year is outside the observed span
+        """
+        names, before = self.asof_positions(metric, countries, year, 'backward', region=region)
+        _, after = self.asof_positions(metric, countries, year, 'forward', region=region)
+        v0, y0 = self.values_at(before)
+        v1, y1 = self.values_at(after)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            weight = np.where(y1 > y0, (int(year) - y0) / (y1 - y0), 0.0)
+        return names, v0 + (v1 - v0) * weight
+
+    def mean_change(self, metric, countries, year_range, region=None):
+        """
+        Mean over the selected series of the change from their first to
+        their last observation inside `year_range`. Series with fewer than
+        two observations in the range are left out; NaN if none is left.
+        """
+        y0, y1 = int(year_range[0]), int(year_range[1])
+        _, first = self.asof_positions(metric, countries, y0, 'forward', y1, region)
+        _, last = self.asof_positions(metric, countries, y1, 'backward', y0, region)
+        first_values, first_years = self.values_at(first)
+        last_values, last_years = self.values_at(last)
+        changed = (first >= 0) & (last_years > first_years)
+        if not changed.any():
+            return float('nan')
+        return float(np.mean(last_values[changed] - first_values[changed]))
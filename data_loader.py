@@ -0,0 +1,254 @@
+# data_loader.py
+"""
+Streaming ingest of WHO Global Health Observatory (GHO) long-format exports.
+
+GHO exports (see vaccination.csv) have 34 columns and full downloads run to
+hundreds of MB. The loader reads only the columns the dashboard needs, with
+explicit dtypes and in fixed-size chunks, maps every chunk to the
+dashboard schema (Country, Year, Metric, Value, ...) and writes it out
+before reading the next one, so peak memory follows the chunk size rather
+than the file size.
+
+Usage:
+    python data_loader.py vaccination.csv data/processed/vaccination.parquet
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_processor import compact_dtypes
+from dimensions import REGIONS, UNKNOWN_REGION, country_dimension, key_column, level_column, region_column
+
+DEFAULT_CHUNK_ROWS = 100_000
+
+# Columns read from the export; everything else is skipped by the parser
+GHO_COLUMNS = [
+    'IndicatorCode', 'Indicator', 'ParentLocationCode', 'Location type',
+    'SpatialDimValueCode', 'Location', 'Period', 'Dim1', 'Dim2', 'Dim3',
+    'FactValueNumeric', 'FactValueUoM',
+]
+
+GHO_DTYPES = {
+    'IndicatorCode': 'category',
+    'Indicator': 'category',
+    'ParentLocationCode': 'category',
+    'Location type': 'category',
+    'SpatialDimValueCode': 'category',
+    'Location': 'category',
+    'Period': 'category',
+    'Dim1': 'category',
+    'Dim2': 'category',
+    'Dim3': 'category',
+    'FactValueNumeric': 'float64',
+    'FactValueUoM': 'category',
+}
+
+# GHO parent location codes -> dashboard WHO region codes
+GHO_REGIONS = {
+    'AFR': 'AFRO',
+    'AMR': 'AMRO',
+    'EMR': 'EMRO',
+    'EUR': 'EURO',
+    'SEAR': 'SEARO',
+    'WPR': 'WPRO',
+}
+
+OUTPUT_COLUMNS = [
+    'Country', 'ISO3', 'Country_Key', 'Year', 'Metric', 'Value', 'Unit',
+    'WHO_Region', 'Development_Level', 'Data_Quality', 'Source',
+]
+
+
+def read_gho_chunks(path, chunksize=DEFAULT_CHUNK_ROWS):
+    """Iterate over raw GHO export chunks with column pruning and fixed dtypes"""
+    header = pd.read_csv(path, nrows=0, encoding='utf-8-sig').columns
+    usecols = [c for c in GHO_COLUMNS if c in header]
+    return pd.read_csv(
+        path,
+        usecols=usecols,
+        dtype={c: GHO_DTYPES[c] for c in usecols},
+        chunksize=chunksize,
+        encoding='utf-8-sig',
+    )
+
+
+def _category_values(series, func):
+    """Apply `func` to the categories of a categorical and broadcast by code"""
+    mapped = np.asarray(func(series.cat.categories))
+    codes = series.cat.codes.to_numpy()
+    if len(mapped) == 0:
+        return np.full(len(codes), np.nan)
+    return np.where(codes >= 0, mapped[codes], np.nan)
+
+
+def _metric_names(chunk):
+    """Indicator name, with any disaggregation dimensions appended"""
+    metric = chunk['Indicator'].astype(str)
+    for dim in ('Dim1', 'Dim2', 'Dim3'):
+        if dim in chunk.columns and chunk[dim].notna().any():
+            has_dim = chunk[dim].notna()
+            metric = metric.where(~has_dim, metric + ' - ' + chunk[dim].astype(str))
+    return metric
+
+
+def _units(chunk):
+    """FactValueUoM when given, otherwise the trailing '(unit)' of the indicator name"""
+    unit = pd.Series(
+        _category_values(chunk['Indicator'], lambda names: names.str.extract(r'\(([^()]*)\)\s*$')[0].to_numpy()),
+        index=chunk.index, dtype=object
+    )
+    if 'FactValueUoM' in chunk.columns:
+        unit = chunk['FactValueUoM'].astype(object).where(chunk['FactValueUoM'].notna(), unit)
+    return unit.fillna('')
+
+
+def gho_to_dashboard(chunk):
+    """Map one raw GHO chunk to the dashboard's long schema"""
+    if 'Location type' in chunk.columns:
+        chunk = chunk[chunk['Location type'] == 'Country']
+    # Period is a year for annual data; anything else (e.g. "2019-2020") is skipped
+    years = _category_values(chunk['Period'], lambda periods: pd.to_numeric(periods, errors='coerce'))
+    keep = ~np.isnan(years) & chunk['FactValueNumeric'].notna().to_numpy()
+    chunk = chunk[keep]
+    years = years[keep]
+
+    # Member states take region and income level from the country dimension;
+    # other locations (territories, areas) keep the GHO parent region
+    dimension = country_dimension()
+    keys = dimension.lookup(chunk['Location'], chunk.get('SpatialDimValueCode'))
+    parent_regions = _category_values(
+        chunk['ParentLocationCode'],
+        lambda codes: np.array([REGIONS.index(GHO_REGIONS.get(code, 'Global')) for code in codes])
+    )
+    parent_regions = np.nan_to_num(parent_regions, nan=UNKNOWN_REGION).astype(np.int8)
+
+    out = pd.DataFrame({
+        'Country': chunk['Location'],
+        'ISO3': chunk['SpatialDimValueCode'],
+        'Country_Key': pd.Series(key_column(keys), index=chunk.index),
+        'Year': years.astype(np.int64),
+        'Metric': _metric_names(chunk),
+        'Value': chunk['FactValueNumeric'],
+        'Unit': _units(chunk),
+        'WHO_Region': pd.Series(region_column(dimension.region_codes(keys, parent_regions)), index=chunk.index),
+        'Development_Level': pd.Series(level_column(dimension.level_codes(keys)), index=chunk.index),
+        'Data_Quality': 'High',
+        'Source': 'WHO',
+    }, columns=OUTPUT_COLUMNS)
+    return compact_dtypes(out.reset_index(drop=True))
+
+
+def iter_dashboard_chunks(path, chunksize=DEFAULT_CHUNK_ROWS):
+    """Iterate over GHO export chunks already mapped to the dashboard schema"""
+    for chunk in read_gho_chunks(path, chunksize):
+        mapped = gho_to_dashboard(chunk)
+        if not mapped.empty:
+            yield mapped
+
+
+def _arrow_schema():
+    import pyarrow as pa
+
+    text = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ('Country', text),
+        ('ISO3', text),
+        ('Country_Key', pa.int16()),
+        ('Year', pa.int16()),
+        ('Metric', text),
+        ('Value', pa.float64()),
+        ('Unit', text),
+        ('WHO_Region', text),
+        ('Development_Level', text),
+        ('Data_Quality', text),
+        ('Source', text),
+    ])
+
+
+def write_chunks(chunks, out_path):
+    """
+    Write dashboard-schema chunks to one file, one chunk at a time.
+
+    The output format follows the extension of `out_path` (.parquet or
+    .csv). The file is written under a temporary name and moved into place
+    once complete. Returns the number of rows written.
+    """
+    fmt = os.path.splitext(out_path)[1].lower()
+    if fmt not in ('.parquet', '.csv'):
+        raise ValueError(f"Unsupported output format: {fmt or out_path}")
+
+    out_dir = os.path.dirname(out_path)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    tmp_path = f"{out_path}.tmp-{os.getpid()}"
+
+    rows = 0
+    writer = None
+    try:
+        if fmt == '.parquet':
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            schema = _arrow_schema()
+            writer = pq.ParquetWriter(tmp_path, schema)
+            for chunk in chunks:
+                chunk = chunk.astype({'Value': np.float64})
+                writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+                rows += len(chunk)
+            writer.close()
+            writer = None
+        else:
+            with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+                for chunk in chunks:
+                    chunk.to_csv(f, header=(rows == 0), index=False)
+                    rows += len(chunk)
+                if rows == 0:
+                    pd.DataFrame(columns=OUTPUT_COLUMNS).to_csv(f, index=False)
+        os.replace(tmp_path, out_path)
+    finally:
+        if writer is not None:
+            writer.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return rows
+
+
+def stream_gho_export(path, out_path, chunksize=DEFAULT_CHUNK_ROWS):
+    """
+    Convert a GHO export to the dashboard schema chunk by chunk and write it
+    to `out_path` (.parquet or .csv). Returns the number of rows written.
+    """
+    return write_chunks(iter_dashboard_chunks(path, chunksize), out_path)
+
+
+def load_gho_export(path, chunksize=DEFAULT_CHUNK_ROWS):
+    """Read a GHO export into one compact dashboard frame, chunk by chunk"""
+    chunks = list(iter_dashboard_chunks(path, chunksize))
+    if not chunks:
+        return compact_dtypes(pd.DataFrame(columns=OUTPUT_COLUMNS))
+    # Chunk vocabularies differ, so re-derive the categories once at the end
+    return compact_dtypes(pd.concat(chunks, ignore_index=True))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream a WHO GHO export into the dashboard schema")
+    parser.add_argument("source", help="GHO long-format CSV export")
+    parser.add_argument("output", help="Output file (.parquet or .csv)")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNK_ROWS,
+                        help=f"Rows per chunk (default: {DEFAULT_CHUNK_ROWS})")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    rows = stream_gho_export(args.source, args.output, args.chunksize)
+    elapsed = time.perf_counter() - start
+
+    print(f"✅ Wrote {rows:,} rows to {args.output}")
+    print(f"⏱️ {elapsed:.2f}s ({os.path.getsize(args.output):,} bytes)")
+
+
+if __name__ == "__main__":
+    main()
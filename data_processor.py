@@ -0,0 +1,297 @@
+# data_processor.py
+"""
+Data preparation for the WHO Global Health Dashboard.
+
+Everything in this module is free of Streamlit calls so the prepared
+dataset can be built, snapshotted and tested outside of the app.
+"""
+
+import numpy as np
+import pandas as pd
+
+from data_index import sort_for_index
+from derived_metrics import add_derived_columns
+from dimensions import LEVELS, REGIONS, country_dimension, key_column, level_column, region_column
+
+
+def build_who_dataset(who_file):
+    """Build the combined WHO + synthetic dataset from the WHO CSV export"""
+    # Read WHO CSV
+    df_who = pd.read_csv(who_file)
+
+    # Simple transformation
+    df_who = df_who.rename(columns={
+        'COUNTRY': 'Country',
+        'YEAR': 'Year',
+        'Numeric': 'Value',
+        'GHO (DISPLAY)': 'Metric'
+    })
+
+    # Select only needed columns
+    iso3_codes = df_who['ISO3'] if 'ISO3' in df_who.columns else None
+    df_who = df_who[['Country', 'Year', 'Metric', 'Value']]
+
+    # Add required columns
+    df_who['Unit'] = 'years'
+    df_who['Data_Quality'] = 'High'
+
+    # WHO Region and Development Level from the country dimension, by ISO3 code where given
+    dimension = country_dimension()
+    keys = dimension.lookup(df_who['Country'], iso3_codes)
+    df_who['Country_Key'] = key_column(keys)
+    df_who['WHO_Region'] = region_column(dimension.region_codes(keys))
+    df_who['Development_Level'] = level_column(dimension.level_codes(keys))
+
+    df_who['Source'] = 'WHO'
+
+    # Add other metrics
+    other_metrics = create_other_metrics(df_who['Country'].unique())
+    other_metrics['Source'] = 'Synthetic'
+    df_combined = pd.concat([df_who, other_metrics], ignore_index=True)
+
+    # Calculate indexed values and the other per-series transforms
+    df_combined = add_derived_columns(df_combined)
+
+    # Store sorted by (Metric, Country, Year) so the index needs no re-sort
+    return compact_dtypes(sort_for_index(df_combined))
+
+
+# جميع المؤشرات الأصلية مع قيم واقعية
+METRICS_CONFIG = {
+    'Life Expectancy': {'unit': 'years', 'range': (50, 85), 'trend': 0.15},
+    'Under-5 Mortality Rate': {'unit': 'per 1000', 'range': (2, 150), 'trend': -0.8},
+    'Maternal Mortality Ratio': {'unit': 'per 100000', 'range': (5, 500), 'trend': -2.5},
+    'Vaccination Coverage (DTP3)': {'unit': '%', 'range': (40, 99), 'trend': 0.3},
+    'Hospital Beds per 1000': {'unit': 'beds', 'range': (0.5, 15), 'trend': 0.05},
+    'Physicians per 10000': {'unit': 'doctors', 'range': (1, 40), 'trend': 0.2},
+    'Health Expenditure (% of GDP)': {'unit': '%', 'range': (2, 12), 'trend': 0.1},
+    'Adult Obesity Rate': {'unit': '%', 'range': (5, 40), 'trend': 0.1},
+    'Smoking Prevalence': {'unit': '%', 'range': (10, 50), 'trend': -0.2},
+    'Access to Clean Water': {'unit': '%', 'range': (50, 100), 'trend': 0.25}
+}
+
+# مضاعفات حسب مستوى التنمية
+LEVEL_MULTIPLIERS = {
+    'High': 0.9,
+    'Upper-Middle': 0.7,
+    'Lower-Middle': 0.5,
+    'Low': 0.3
+}
+
+
+def create_other_metrics(countries, seed=42):
+    """
+    Create synthetic data for other health metrics - ENHANCED VERSION
+
+    All countries x metrics x years are generated as one array. The noise
+    is drawn in a single call in country, metric, year order, which is the
+    order the original per-row loop used, so the output is unchanged.
+    """
+    rng = np.random.RandomState(seed)
+
+    # تخطي Life Expectancy لأن لدينا بيانات WHO الأصلية لها
+    metrics = [name for name in METRICS_CONFIG if name != 'Life Expectancy']
+
+    # سنوات متعددة لبيانات واقعية
+    years = np.arange(2000, 2024, 2)  # كل سنتين: 2000, 2002, 2004, ..., 2022
+
+    countries = np.asarray(countries, dtype=object)
+    n_countries, n_metrics, n_years = len(countries), len(metrics), len(years)
+
+    # تحديد مستوى تنمية الدولة
+    dimension = country_dimension()
+    keys = dimension.lookup(countries)
+    level_codes = dimension.level_codes(keys)
+    dev_levels = np.array(LEVELS, dtype=object)[level_codes]
+    regions = np.array(REGIONS, dtype=object)[dimension.region_codes(keys)]
+    multipliers = np.array([LEVEL_MULTIPLIERS.get(level, 0.5) for level in LEVELS])[level_codes]
+
+    min_vals = np.array([METRICS_CONFIG[m]['range'][0] for m in metrics], dtype=float)
+    max_vals = np.array([METRICS_CONFIG[m]['range'][1] for m in metrics], dtype=float)
+    trends = np.array([METRICS_CONFIG[m]['trend'] for m in metrics], dtype=float)
+
+    # (country, metric) base values and (metric, year) trend grid
+    base_values = min_vals[None, :] + (max_vals - min_vals)[None, :] * multipliers[:, None]
+    trend_values = trends[:, None] * (years - 2000)[None, :]
+
+    # عامل عشوائي واقعي
+    shape = (n_countries, n_metrics, n_years)
+    random_factors = rng.normal(0, np.broadcast_to((max_vals * 0.02)[None, :, None], shape))
+
+    values = base_values[:, :, None] + trend_values[None, :, :] + random_factors
+
+    # التأكد من حدود واقعية
+    values = np.clip(values, (min_vals * 0.8)[None, :, None], (max_vals * 1.1)[None, :, None])
+
+    # تحديد جودة البيانات
+    data_quality = np.where(np.isin(dev_levels, ['High', 'Upper-Middle']), 'High', 'Medium').astype(object)
+
+    per_row = n_metrics * n_years
+    units = np.array([METRICS_CONFIG[m]['unit'] for m in metrics], dtype=object)
+
+    return pd.DataFrame({
+        'Country': np.repeat(countries, per_row),
+        'Year': np.tile(years, n_countries * n_metrics),
+        'Metric': np.tile(np.repeat(np.array(metrics, dtype=object), n_years), n_countries),
+        'Value': np.round(values.ravel(), 2),
+        'Unit': np.tile(np.repeat(units, n_years), n_countries),
+        'Country_Key': np.repeat(key_column(keys), per_row),
+        'WHO_Region': np.repeat(regions, per_row),
+        'Development_Level': np.repeat(dev_levels, per_row),
+        'Data_Quality': np.repeat(data_quality, per_row)
+    })
+
+def get_development_level(country):
+    """تحديد مستوى تنمية الدولة"""
+    dimension = country_dimension()
+    return LEVELS[dimension.level_codes(dimension.keys([country]))[0]]
+
+def get_who_region(country):
+    """تحديد منطقة WHO للدولة"""
+    dimension = country_dimension()
+    return REGIONS[dimension.region_codes(dimension.keys([country]))[0]]
+
+
+FALLBACK_COUNTRIES = ['United States', 'Japan', 'Germany', 'Brazil', 'India', 'China']
+
+
+def create_fallback_data(seed=42):
+    """
+    Fallback data if WHO loading fails
+
+    Each country takes its two base values and then one (years x 2) noise
+    block from the generator, matching the draw order of the original loop.
+    """
+    rng = np.random.RandomState(seed)
+
+    countries = np.array(FALLBACK_COUNTRIES, dtype=object)
+    years = np.arange(2000, 2024)
+    n_countries, n_years = len(countries), len(years)
+
+    bases = np.empty((n_countries, 2))
+    noise = np.empty((n_countries, n_years, 2))
+    for i in range(n_countries):
+        bases[i] = rng.uniform([70, 5], [85, 50])
+        noise[i] = rng.normal(0, np.broadcast_to([0.5, 1], (n_years, 2)))
+
+    year_factor = (years - 2000) * 0.15
+
+    # Life Expectancy
+    life_values = bases[:, 0, None] + year_factor[None, :] + noise[:, :, 0]
+    life_values = np.clip(life_values, 65, 90)
+
+    # Mortality Rate
+    mortality_values = bases[:, 1, None] - year_factor[None, :] * 0.3 + noise[:, :, 1]
+    mortality_values = np.clip(mortality_values, 2, 100)
+
+    # One Life Expectancy row followed by one mortality row per country-year
+    n_rows = n_countries * n_years * 2
+    data = {
+        'Country': np.repeat(countries, n_years * 2),
+        'Year': np.tile(np.repeat(years, 2), n_countries),
+        'Metric': np.tile(np.array(['Life Expectancy', 'Under-5 Mortality Rate'], dtype=object), n_countries * n_years),
+        'Value': np.round(np.stack([life_values, mortality_values], axis=-1).ravel(), 1),
+        'Unit': np.tile(np.array(['years', 'per 1000'], dtype=object), n_countries * n_years),
+        'Country_Key': np.repeat(key_column(country_dimension().keys(countries)), n_years * 2),
+        'WHO_Region': np.full(n_rows, 'Global', dtype=object),
+        'Development_Level': np.full(n_rows, 'Mixed', dtype=object),
+        'Data_Quality': np.full(n_rows, 'Synthetic', dtype=object)
+    }
+
+    return add_derived_columns(pd.DataFrame(data))
+
+
+# ============================================
+# MEMORY LAYOUT
+# ============================================
+
+# Fixed vocabularies shared by every frame the loaders emit, so frames built
+# from different sources concatenate without falling back to object dtype
+CATEGORY_VOCABULARIES = {
+    'Unit': sorted({config['unit'] for config in METRICS_CONFIG.values()}),
+    'WHO_Region': REGIONS,
+    'Development_Level': LEVELS,
+    'Data_Quality': ['High', 'Medium', 'Synthetic'],
+    'Source': ['WHO', 'Synthetic'],
+}
+
+# Columns whose vocabulary comes from the data itself
+DATA_CATEGORY_COLUMNS = ['Country', 'Metric']
+
+VALUE_COLUMNS = ['Value', 'Value_Indexed', 'Value_Change', 'Value_ZScore', 'Value_MinMax']
+
+
+def _category_dtype(column, series):
+    """Fixed vocabulary for `column`, extended with any unseen values"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        seen = series.cat.categories
+    else:
+        seen = pd.unique(series.dropna())
+    seen = [str(v) for v in seen]
+    vocabulary = list(CATEGORY_VOCABULARIES.get(column, []))
+    known = set(vocabulary)
+    vocabulary += sorted(v for v in seen if v not in known)
+    return pd.CategoricalDtype(vocabulary)
+
+
+def _float32_keeps_values(values):
+    """True if float32 still reproduces `values` at their decimal precision"""
+    finite = values[np.isfinite(values)]
+    if len(finite) == 0:
+        return True
+    for decimals in range(5):
+        if np.array_equal(np.round(finite, decimals), finite):
+            return np.array_equal(np.round(finite.astype(np.float32).astype(np.float64), decimals), finite)
+    # Not a rounded measurement - float32 keeps about 7 significant digits
+    return True
+
+
+def compact_dtypes(df):
+    """
+    Return `df` with categorical dimensions, int16 years and float32 values.
+
+    Value is only downcast if float32 preserves it at the precision it was
+    recorded with; derived columns are always float32.
+    """
+    out = df.copy()
+    for column in list(CATEGORY_VOCABULARIES) + DATA_CATEGORY_COLUMNS:
+        if column in out.columns:
+            out[column] = out[column].astype(_category_dtype(column, out[column]))
+    if 'Year' in out.columns and len(out) and out['Year'].between(-32768, 32767).all():
+        out['Year'] = out['Year'].astype(np.int16)
+    if 'Country_Key' in out.columns:
+        out['Country_Key'] = out['Country_Key'].astype(np.int16)
+    for column in VALUE_COLUMNS:
+        if column not in out.columns:
+            continue
+        values = out[column].to_numpy(dtype=np.float64)
+        if column != 'Value' or _float32_keeps_values(values):
+            out[column] = values.astype(np.float32)
+    return out
+
+
+def _expanded_dtype(series):
+    """The dtype a column had before compaction: object, int64 or float64"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return object
+    if pd.api.types.is_integer_dtype(series.dtype):
+        return np.int64
+    if pd.api.types.is_float_dtype(series.dtype):
+        return np.float64
+    return series.dtype
+
+
+def memory_report(df):
+    """Bytes per column in the compact layout versus the object/64-bit layout"""
+    rows = []
+    for column in df.columns:
+        after = int(df[column].memory_usage(index=False, deep=True))
+        before = int(df[column].astype(_expanded_dtype(df[column])).memory_usage(index=False, deep=True))
+        rows.append({'Column': column, 'Dtype': str(df[column].dtype),
+                     'Before (bytes)': before, 'After (bytes)': after})
+    report = pd.DataFrame(rows)
+    total = {'Column': 'Total', 'Dtype': '',
+             'Before (bytes)': report['Before (bytes)'].sum(), 'After (bytes)': report['After (bytes)'].sum()}
+    report = pd.concat([report, pd.DataFrame([total])], ignore_index=True)
+    report['Saved'] = 1 - report['After (bytes)'] / report['Before (bytes)']
+    return report
@@ -0,0 +1,94 @@
+# data_table.py
+"""
+Server-side paging for the dashboard data table.
+
+Only one page of rows is sent to the browser. Search and sorting run on
+the server: search matches against the distinct values of each column
+(small for the categorical columns) and sorting partially orders the
+rows up to the end of the requested page instead of sorting and copying
+the whole selection.
+"""
+
+import numpy as np
+import pandas as pd
+
+TABLE_COLUMNS = ['Country', 'Year', 'Metric', 'Value', 'Unit', 'WHO_Region']
+SEARCH_COLUMNS = ['Country', 'Year', 'Metric', 'Unit', 'WHO_Region']
+PAGE_SIZE = 20
+
+
+def search_mask(df, text, columns=SEARCH_COLUMNS):
+    """Rows where any of `columns` contains `text`, case-insensitive"""
+    text = text.strip().lower()
+    mask = np.zeros(len(df), dtype=bool)
+    for column in columns:
+        if column not in df.columns:
+            continue
+        values = df[column]
+        distinct = pd.Series(values.dropna().unique())
+        hits = distinct[distinct.astype(str).str.lower().str.contains(text, regex=False)]
+        if len(hits):
+            mask |= values.isin(hits).to_numpy()
+    return mask
+
+
+def _sort_key(values):
+    """Float key ordering `values` ascending, NaN where the value is missing"""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        categories = values.cat.categories.astype(str)
+        rank = np.empty(len(categories) + 1, dtype=np.float64)
+        rank[np.argsort(categories, kind='stable')] = np.arange(len(categories))
+        # Code -1 (missing) indexes the last slot
+        rank[-1] = np.nan
+        return rank[values.cat.codes.to_numpy()]
+    if values.dtype.kind in 'biuf':
+        return values.to_numpy(dtype=np.float64)
+    codes = pd.factorize(values, sort=True)[0].astype(np.float64)
+    codes[codes < 0] = np.nan
+    return codes
+
+
+def page_order(key, start, stop, ascending=True):
+    """
+    Positions of rows start..stop of the stable ordering of `key`, with
+    missing values last in both directions. Only the rows up to `stop` are
+    sorted; the rest are partitioned away.
+    """
+    key = np.asarray(key, dtype=np.float64)
+    n = len(key)
+    stop = min(stop, n)
+    if start >= stop:
+        return np.arange(0)
+    key = np.where(np.isnan(key), np.inf, key if ascending else -key)
+    if stop < n:
+        boundary = np.partition(key, stop - 1)[stop - 1]
+        # Keep every row tied with the boundary so ties still break on position
+        candidates = np.flatnonzero(key <= boundary)
+    else:
+        candidates = np.arange(n)
+    ordered = candidates[np.lexsort((candidates, key[candidates]))]
+    return ordered[start:stop]
+
+
+def table_page(df, page=1, page_size=PAGE_SIZE, sort_by=None, ascending=True, search='', columns=TABLE_COLUMNS):
+    """
+    Return (rows, total) for one page of the table: `rows` holds at most
+    `page_size` rows of `columns`, `total` counts every row matching `search`.
+    Without `sort_by` the rows keep their order in `df` (reversed when not
+    `ascending`); ties in `sort_by` keep it too.
+    """
+    if search and search.strip():
+        positions = np.flatnonzero(search_mask(df, search))
+    else:
+        positions = np.arange(len(df))
+    total = len(positions)
+
+    # Past the last page, show the last page
+    page = min(max(int(page), 1), max(1, -(-total // page_size)))
+    start = (page - 1) * page_size
+    stop = start + page_size
+    if sort_by is None:
+        order = np.arange(total)[::1 if ascending else -1][start:stop]
+    else:
+        order = page_order(_sort_key(df[sort_by].iloc[positions]), start, stop, ascending)
+    return df.iloc[positions[order]][columns], total
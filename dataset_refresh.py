@@ -0,0 +1,295 @@
+# dataset_refresh.py
+"""
+Incremental refresh of the dashboard dataset.
+
+The dataset is assembled from partitions, one per source file in
+data/raw/: the WHO life expectancy download (together with the synthetic
+indicators derived from its country list) and any WHO GHO long-format
+export dropped next to it. Each partition is built through its own
+snapshot, so a refresh only re-ingests the files whose content changed.
+
+The combined dataset is published as an Arrow IPC file named after its
+version and memory-mapped read-only, so replicas serving the same version
+share one copy of it in the page cache.
+
+`DatasetManager.current` always points at a complete, immutable `Dataset`.
+A refresh builds the new one on the side and swaps the reference in one
+assignment, so script runs that already hold the old dataset keep using it
+until they finish.
+"""
+
+import glob
+import hashlib
+import logging
+import os
+import threading
+import time
+
+import pandas as pd
+
+import analytics
+import data_index
+import data_loader
+import data_processor
+import derived_metrics
+import dimensions
+from analytics import ROLLING_WINDOW, SeriesAnalytics
+from data_index import sort_for_index
+from data_loader import load_gho_export
+from data_processor import build_who_dataset, compact_dtypes, create_fallback_data
+from derived_metrics import add_derived_columns
+from snapshot_cache import SNAPSHOT_DIR, code_version, load_or_build, read_arrow, write_arrow
+
+RAW_DIR = "data/raw"
+WHO_FILE_NAME = "who_life_expectancy.csv"
+
+# Minimum seconds between two file checks triggered by reruns
+REFRESH_INTERVAL = 30
+
+# Published dataset versions kept on disk for replicas still mapping them
+KEEP_PUBLISHED = 3
+
+CODE_MODULES = [data_processor, derived_metrics, data_index, data_loader, dimensions]
+
+logger = logging.getLogger("dashboard.refresh")
+
+
+class Dataset:
+    """One immutable version of the dashboard dataset"""
+
+    def __init__(self, df, version, source_label, partition_rows, loaded_from_snapshot, errors, shared_path=None):
+        self.df = df
+        self.version = version
+        self.shared_path = shared_path
+        self.source_label = source_label
+        self.partition_rows = partition_rows
+        self.loaded_from_snapshot = loaded_from_snapshot
+        self.errors = errors
+        self.created_at = time.time()
+
+
+class _Partition:
+    def __init__(self, path, stat, fingerprint, frame, from_snapshot, snapshot_path):
+        self.path = path
+        self.snapshot_path = snapshot_path
+        self.stat = stat
+        self.fingerprint = fingerprint
+        self.frame = frame
+        self.from_snapshot = from_snapshot
+
+
+def _stat_key(path):
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _is_gho_export(path):
+    try:
+        header = pd.read_csv(path, nrows=0, encoding='utf-8-sig').columns
+    except (OSError, ValueError):
+        return False
+    return 'IndicatorCode' in header and 'FactValueNumeric' in header
+
+
+def discover_sources(raw_dir=RAW_DIR):
+    """{partition name: path} for every source file the dashboard understands"""
+    sources = {}
+    who_file = os.path.join(raw_dir, WHO_FILE_NAME)
+    if os.path.exists(who_file):
+        sources['who'] = who_file
+    for path in sorted(glob.glob(os.path.join(raw_dir, '*.csv'))):
+        if path != who_file and _is_gho_export(path):
+            sources['gho:' + os.path.basename(path)] = path
+    return sources
+
+
+def _build_gho_partition(path):
+    return compact_dtypes(sort_for_index(add_derived_columns(load_gho_export(path))))
+
+
+def _partition_builder(name, path):
+    if name == 'who':
+        return 'who_dataset', lambda: build_who_dataset(path)
+    snapshot = 'gho_' + os.path.splitext(os.path.basename(path))[0]
+    return snapshot, lambda: _build_gho_partition(path)
+
+
+def combine_partitions(frames):
+    """Concatenate partition frames into one sorted, compact dataset"""
+    if len(frames) == 1:
+        return frames[0]
+    return compact_dtypes(sort_for_index(pd.concat(frames, ignore_index=True)))
+
+
+def _prune_published(directory, keep, pattern='dataset-*.arrow'):
+    published = sorted(glob.glob(os.path.join(directory, pattern)), key=os.path.getmtime)
+    for path in published[:-keep]:
+        try:
+            os.remove(path)
+        except OSError:
+            # Still mapped by a process on a platform that forbids removal
+            pass
+
+
+def publish_dataset(build, version, directory=SNAPSHOT_DIR, keep=KEEP_PUBLISHED):
+    """
+    Return (df, path) for the dataset `version`, memory-mapped from
+    dataset-<version>.arrow. The first process to assemble a version writes
+    the file with `build()`; every other one maps the published file.
+    """
+    path = os.path.join(directory, f"dataset-{version[:16]}.arrow")
+    if os.path.exists(path):
+        try:
+            return read_arrow(path), path
+        except OSError:
+            # Pruned by another process since the check: publish it again
+            pass
+    df = build()
+    try:
+        os.makedirs(directory, exist_ok=True)
+        write_arrow(df, path)
+        _prune_published(directory, keep)
+        return read_arrow(path), path
+    except OSError:
+        return df, None
+
+
+def publish_analytics(index, version, directory=SNAPSHOT_DIR, keep=KEEP_PUBLISHED, window=ROLLING_WINDOW):
+    """
+    SeriesAnalytics of the DatasetIndex of dataset `version` with every
+    measure computed, memory-mapped from analytics-<key>.arrow. The key
+    covers the version, the window and the analytics code; like
+    publish_dataset, the first process to need it computes and writes the
+    file and every other one maps it.
+    """
+    key = hashlib.sha256(f"{version};{window};{code_version([analytics])}".encode()).hexdigest()
+    path = os.path.join(directory, f"analytics-{key[:16]}.arrow")
+    if os.path.exists(path):
+        try:
+            return SeriesAnalytics.from_arrow(index, path, window)
+        except (OSError, ValueError, KeyError):
+            # Pruned since the check, or written for other rows: compute it again
+            pass
+    result = SeriesAnalytics(index, window)
+    try:
+        os.makedirs(directory, exist_ok=True)
+        result.to_arrow(path)
+        _prune_published(directory, keep, 'analytics-*.arrow')
+        return SeriesAnalytics.from_arrow(index, path, window)
+    except OSError:
+        return result
+
+
+class DatasetManager:
+    """Holds the current dataset and refreshes it from the changed sources only"""
+
+    def __init__(self, raw_dir=RAW_DIR, snapshot_dir=SNAPSHOT_DIR, refresh_interval=REFRESH_INTERVAL):
+        self.raw_dir = raw_dir
+        self.snapshot_dir = snapshot_dir
+        self.refresh_interval = refresh_interval
+        self.current = None
+        self.last_changed = []
+        self._partitions = {}
+        self._lock = threading.Lock()
+        self._last_check = 0.0
+        self.refresh(force=True)
+
+    def _load_partition(self, name, path):
+        snapshot, builder = _partition_builder(name, path)
+        stat = _stat_key(path)
+        # The reference table feeds every partition, so it is a source of each snapshot
+        frame, fingerprint, hit = load_or_build(
+            snapshot, [path, dimensions.REFERENCE_FILE], builder, CODE_MODULES, self.snapshot_dir
+        )
+        return _Partition(path, stat, fingerprint, frame, hit, os.path.join(self.snapshot_dir, snapshot + '.arrow'))
+
+    def refresh(self, force=False):
+        """
+        Re-ingest the sources that changed since the last check and swap in a
+        new dataset. Checks are throttled to one per `refresh_interval`
+        unless `force` is set. Returns the list of partitions that changed.
+        Sources that fail to load are logged and reported in
+        `current.errors`, whether or not anything else changed.
+        """
+        now = time.monotonic()
+        if not force and now - self._last_check < self.refresh_interval:
+            return []
+        if not self._lock.acquire(blocking=force):
+            # Another session is already refreshing
+            return []
+        try:
+            self._last_check = time.monotonic()
+            sources = discover_sources(self.raw_dir)
+            partitions = {}
+            changed = []
+            errors = {}
+            for name, path in sources.items():
+                old = self._partitions.get(name)
+                try:
+                    if old is not None and old.path == path and old.stat == _stat_key(path):
+                        partitions[name] = old
+                        continue
+                    partition = self._load_partition(name, path)
+                except Exception as e:
+                    logger.warning("Could not load %s (%s): %s", name, path, e)
+                    errors[name] = str(e)
+                    if old is not None:
+                        partitions[name] = old
+                    continue
+                if old is not None and partition.fingerprint == old.fingerprint:
+                    # Touched but not changed: keep the frame already in use
+                    old.stat = partition.stat
+                    partitions[name] = old
+                else:
+                    partitions[name] = partition
+                    changed.append(name)
+
+            removed = [name for name in self._partitions if name not in partitions]
+            if self.current is not None and not changed and not removed:
+                self._partitions = partitions
+                if errors != self.current.errors:
+                    current = self.current
+                    self.current = Dataset(current.df, current.version, current.source_label, current.partition_rows,
+                                           current.loaded_from_snapshot, errors, current.shared_path)
+                return []
+
+            self._partitions = partitions
+            self.current = self._assemble(partitions, errors)
+            self.last_changed = changed + removed
+            return self.last_changed
+        finally:
+            self._lock.release()
+
+    def _assemble(self, partitions, errors):
+        if 'who' in partitions:
+            label = "WHO Life Expectancy + Synthetic"
+        elif partitions:
+            label = "WHO GHO Exports"
+        else:
+            fallback = compact_dtypes(create_fallback_data())
+            return Dataset(fallback, 'fallback', "Synthetic Data (Fallback)", {'fallback': len(fallback)}, {}, errors)
+
+        names = sorted(partitions)
+        extra = len(names) - 1
+        if 'who' in partitions and extra:
+            label += f" + {extra} GHO export{'s' if extra > 1 else ''}"
+        digest = hashlib.sha256(code_version(CODE_MODULES).encode())
+        for name in names:
+            digest.update(f"{name}={partitions[name].fingerprint};".encode())
+        version = digest.hexdigest()
+        if len(names) == 1:
+            # A single partition is already served from its mapped snapshot
+            df, shared_path = partitions[names[0]].frame, partitions[names[0]].snapshot_path
+        else:
+            df, shared_path = publish_dataset(
+                lambda: combine_partitions([partitions[name].frame for name in names]), version, self.snapshot_dir
+            )
+        return Dataset(
+            df,
+            version,
+            label,
+            {name: len(partitions[name].frame) for name in names},
+            {name: partitions[name].from_snapshot for name in names},
+            errors,
+            shared_path,
+        )
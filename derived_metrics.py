@@ -0,0 +1,105 @@
+# derived_metrics.py
+"""
+Per-series derived columns for the dashboard dataset.
+
+All transforms share one lexicographic sort by (Metric, Country, Year):
+each (Metric, Country) series and each Metric block is then a contiguous
+segment, so series-first values are a single gather and per-metric
+statistics are `reduceat` calls. Results are scattered back to the
+original row order.
+"""
+
+import numpy as np
+import pandas as pd
+
+DERIVED_COLUMNS = ['Value_Indexed', 'Value_Change', 'Value_ZScore', 'Value_MinMax']
+
+
+def _segment_starts(*keys):
+    """Boolean mask of the rows where any of the (sorted) keys changes"""
+    starts = np.zeros(len(keys[0]), dtype=bool)
+    starts[:1] = True
+    for key in keys:
+        starts[1:] |= key[1:] != key[:-1]
+    return starts
+
+
+def derived_values(df, base_year=None):
+    """
+    Compute the derived columns for `df` and return them as a dict of arrays
+    aligned with the rows of `df`.
+
+    - Value_Indexed: value relative to the series' base year (= 100). The base
+      is the first year of each series unless `base_year` is given; series
+      without an observation in `base_year` get NaN.
+    - Value_Change: change from the previous observation of the same series.
+    - Value_ZScore: standard score within the metric.
+    - Value_MinMax: min-max normalisation to [0, 1] within the metric.
+    """
+    n = len(df)
+    if n == 0:
+        return {column: np.empty(0) for column in DERIVED_COLUMNS}
+
+    metric_codes = pd.factorize(df['Metric'])[0]
+    country_codes = pd.factorize(df['Country'])[0]
+    years = df['Year'].to_numpy()
+    values = df['Value'].to_numpy(dtype=float)
+
+    order = np.lexsort((years, country_codes, metric_codes))
+    metric_sorted = metric_codes[order]
+    years_sorted = years[order]
+    v = values[order]
+
+    series_start = _segment_starts(metric_sorted, country_codes[order])
+    series_id = np.cumsum(series_start) - 1
+    metric_start = _segment_starts(metric_sorted)
+    metric_id = np.cumsum(metric_start) - 1
+    metric_offsets = np.flatnonzero(metric_start)
+
+    # Index to base year
+    if base_year is None:
+        base = v[series_start]
+    else:
+        base = np.full(series_id[-1] + 1, np.nan)
+        at_base = years_sorted == base_year
+        base[series_id[at_base]] = v[at_base]
+    base = base[series_id]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        indexed = np.where(base == 0, 100.0, v / base * 100)
+
+    # Change from the previous observation in the series
+    change = np.empty(n)
+    change[1:] = v[1:] - v[:-1]
+    change[series_start] = np.nan
+
+    # Per-metric statistics, ignoring missing values
+    valid = ~np.isnan(v)
+    counts = np.add.reduceat(valid.astype(np.int64), metric_offsets)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        means = np.add.reduceat(np.where(valid, v, 0.0), metric_offsets) / counts
+        centered = v - means[metric_id]
+        stds = np.sqrt(np.add.reduceat(np.where(valid, centered ** 2, 0.0), metric_offsets) / counts)
+        mins = np.fmin.reduceat(v, metric_offsets)
+        spans = np.fmax.reduceat(v, metric_offsets) - mins
+
+        std = stds[metric_id]
+        zscore = np.where(std > 0, centered / std, 0.0)
+        span = spans[metric_id]
+        minmax = np.where(span > 0, (v - mins[metric_id]) / span, 0.0)
+
+    result = {}
+    for column, sorted_values in zip(DERIVED_COLUMNS, (indexed, change, zscore, minmax)):
+        out = np.empty(n)
+        out[order] = sorted_values
+        out[np.isnan(values)] = np.nan
+        result[column] = out
+    return result
+
+
+def add_derived_columns(df, base_year=None, columns=None):
+    """Return a copy of `df` with the derived columns added (all by default)"""
+    derived = derived_values(df, base_year=base_year)
+    out = df.copy()
+    for column in columns or DERIVED_COLUMNS:
+        out[column] = derived[column]
+    return out
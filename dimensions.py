@@ -0,0 +1,152 @@
+# dimensions.py
+"""
+Country dimension of the dashboard.
+
+data/reference/who_member_states.csv lists the 194 WHO member states with
+their ISO3 code, WHO name, common aliases (';'-separated), WHO region,
+World Bank income group and 2022 population (UN estimates, rounded to the
+thousand). Every state gets a small integer surrogate key, its row in the
+table ordered by ISO3.
+
+The facts store the country key of every row in the int16 Country_Key
+column (-1 for locations that are not member states). Regions and
+development levels are keyed by their position in REGIONS and LEVELS, the
+fixed vocabularies of the WHO_Region and Development_Level categorical
+columns, so the codes stored in the facts are the dimension keys and a
+join is an array gather. Names, aliases and ISO3 codes resolve
+to country keys through one hash index probed once per distinct value.
+"""
+
+import functools
+import os
+
+import numpy as np
+import pandas as pd
+
+REFERENCE_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "data", "reference", "who_member_states.csv"
+)
+
+# Position in these lists is the key; the last entry is the "unknown" member
+REGIONS = ['AFRO', 'AMRO', 'EMRO', 'EURO', 'SEARO', 'WPRO', 'Global']
+LEVELS = ['Low', 'Lower-Middle', 'Upper-Middle', 'High', 'Mixed']
+
+UNKNOWN_REGION = REGIONS.index('Global')
+UNKNOWN_LEVEL = LEVELS.index('Mixed')
+
+# Country_Key of locations outside the member states
+NO_COUNTRY = -1
+
+
+def _normalize(labels):
+    return pd.Index(labels, dtype=object).str.strip().str.casefold()
+
+
+def _vocabulary_codes(values, vocabulary, unknown):
+    codes = pd.Categorical(values, categories=vocabulary).codes
+    return np.where(codes >= 0, codes, unknown).astype(np.int8)
+
+
+def _distinct(values):
+    """(codes, distinct values), reusing the codes of a categorical as they are"""
+    if isinstance(getattr(values, 'dtype', None), pd.CategoricalDtype):
+        values = pd.Categorical(values)
+        return values.codes, np.asarray(values.categories, dtype=object)
+    return pd.factorize(np.asarray(values, dtype=object))
+
+
+class CountryDimension:
+    """Member states by integer key, with vectorized name and ISO3 lookups"""
+
+    def __init__(self, table):
+        table = table.sort_values('ISO3').reset_index(drop=True)
+        self.iso3 = table['ISO3'].to_numpy(dtype=object)
+        self.names = table['Country'].to_numpy(dtype=object)
+        self.region_keys = _vocabulary_codes(table['WHO_Region'], REGIONS, UNKNOWN_REGION)
+        self.level_keys = _vocabulary_codes(table['Income_Group'], LEVELS, UNKNOWN_LEVEL)
+        self.population = table['Population'].fillna(0).to_numpy(dtype=np.int64)
+
+        labels, keys = list(self.iso3) + list(self.names), list(range(len(table))) * 2
+        for key, aliases in enumerate(table['Aliases'].fillna('')):
+            for alias in filter(None, aliases.split(';')):
+                labels.append(alias)
+                keys.append(key)
+        index = pd.Series(keys, index=_normalize(labels))
+        index = index[~index.index.duplicated()]
+        self._labels = index.index
+        self._label_keys = index.to_numpy(dtype=np.int64)
+
+    @classmethod
+    def from_csv(cls, path=REFERENCE_FILE):
+        return cls(pd.read_csv(path, dtype={'Aliases': str, 'Income_Group': str}, keep_default_na=False,
+                               na_values={'Population': ['']}))
+
+    def __len__(self):
+        return len(self.iso3)
+
+    def keys(self, values):
+        """Country key of every name, alias or ISO3 code; -1 where unknown"""
+        codes, distinct = _distinct(values)
+        found = self._labels.get_indexer(_normalize(distinct))
+        # The trailing -1 is picked by the -1 codes of missing values
+        distinct_keys = np.append(np.where(found >= 0, self._label_keys[found], -1), -1)
+        return distinct_keys[codes]
+
+    def lookup(self, names, iso3=None):
+        """Country keys of `names`, preferring the ISO3 code where one is given and known"""
+        keys = self.keys(names)
+        if iso3 is not None:
+            by_code = self.keys(iso3)
+            keys = np.where(by_code >= 0, by_code, keys)
+        return keys
+
+    def region_codes(self, keys, default=UNKNOWN_REGION):
+        """REGIONS positions of country keys, `default` (scalar or array) for unknown keys"""
+        keys = np.asarray(keys)
+        return np.where(keys >= 0, self.region_keys[keys], default).astype(np.int8)
+
+    def level_codes(self, keys, default=UNKNOWN_LEVEL):
+        """LEVELS positions of country keys, `default` (scalar or array) for unknown keys"""
+        keys = np.asarray(keys)
+        return np.where(keys >= 0, self.level_keys[keys], default).astype(np.int8)
+
+    def iso3_of(self, keys):
+        """ISO3 code of every country key, None for unknown keys"""
+        keys = np.asarray(keys)
+        return np.where(keys >= 0, self.iso3[keys], None)
+
+
+@functools.lru_cache(maxsize=None)
+def country_dimension(path=REFERENCE_FILE):
+    """The country dimension, read once per process"""
+    return CountryDimension.from_csv(path)
+
+
+def key_column(keys):
+    """Country_Key values (int16) from country keys"""
+    return np.asarray(keys).astype(np.int16)
+
+
+def region_column(codes):
+    """WHO_Region categorical from REGIONS positions"""
+    return pd.Categorical.from_codes(codes, REGIONS)
+
+
+def level_column(codes):
+    """Development_Level categorical from LEVELS positions"""
+    return pd.Categorical.from_codes(codes, LEVELS)
+
+
+def attach_dimensions(df, dimension=None):
+    """
+    `df` with Country_Key, WHO_Region and Development_Level looked up from
+    its Country column (and ISO3 column, if any). Countries that are not
+    member states get -1, 'Global' and 'Mixed'.
+    """
+    dimension = dimension or country_dimension()
+    keys = dimension.lookup(df['Country'], df['ISO3'] if 'ISO3' in df.columns else None)
+    return df.assign(
+        Country_Key=key_column(keys),
+        WHO_Region=region_column(dimension.region_codes(keys)),
+        Development_Level=level_column(dimension.level_codes(keys)),
+    )
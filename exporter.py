@@ -0,0 +1,206 @@
+# exporter.py
+"""
+CSV, Parquet and Excel exports of the dashboard data.
+
+Rows come in chunks of at most CHUNK_ROWS, either gathered from the
+DatasetIndex (positions of the filter, or the row slice of a whole metric)
+or fetched from a SQLite cursor, and each chunk is written to the output
+file before the next one is read. Memory stays at one chunk plus the
+writer's buffer whatever the size of the export:
+
+- CSV: appended chunk by chunk
+- Parquet: one row group per chunk (pyarrow ParquetWriter)
+- Excel: xlsxwriter in constant-memory mode, a new sheet every
+  XLSX_MAX_ROWS rows. xlsxwriter is optional; without it the format is not
+  offered.
+
+Every export logs its row count, output size and generation time. Export
+files left behind (a crashed run, a closed session) are removed by the next
+export once they are EXPORT_TTL_SECONDS old.
+"""
+
+import glob
+import importlib.util
+import logging
+import os
+import tempfile
+import time
+
+import pyarrow as pa
+
+from sqlite_store import SELECT_COLUMNS
+
+CHUNK_ROWS = 100_000
+
+# Data rows per worksheet (Excel's limit of 1,048,576 rows minus the header)
+XLSX_MAX_ROWS = 1_048_575
+
+# name: (file extension, MIME type)
+FORMATS = {
+    'CSV': ('csv', 'text/csv'),
+    'Parquet': ('parquet', 'application/vnd.apache.parquet'),
+    'Excel': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
+
+# Types of the exported columns, whatever the dtypes of the source
+SCHEMA = pa.schema([
+    ('Country', pa.string()),
+    ('Year', pa.int64()),
+    ('Metric', pa.string()),
+    ('Value', pa.float64()),
+    ('Unit', pa.string()),
+    ('WHO_Region', pa.string()),
+])
+
+EXPORT_DIR = os.environ.get("DASHBOARD_EXPORT_DIR", tempfile.gettempdir())
+
+# Age after which an export file is considered abandoned
+EXPORT_TTL_SECONDS = int(os.environ.get("DASHBOARD_EXPORT_TTL", 3600))
+
+# Largest export handed to the browser; a download is held in server memory until it is served
+MAX_DOWNLOAD_BYTES = int(os.environ.get("DASHBOARD_EXPORT_MAX_MB", 25)) * 1024 * 1024
+
+logger = logging.getLogger("dashboard.exports")
+
+
+def available_formats():
+    """Export formats whose writer is installed"""
+    return [name for name in FORMATS if name != 'Excel' or importlib.util.find_spec('xlsxwriter')]
+
+
+def index_chunks(index, metric, countries=None, year_range=None, region=None, chunk_rows=CHUNK_ROWS):
+    """
+    Rows of a DatasetIndex filter as frames of at most `chunk_rows` rows,
+    in index order; with no countries, years or region, every row of `metric`
+    """
+    columns = [index.df.columns.get_loc(column) for column in SELECT_COLUMNS]
+    if countries is None and year_range is None and region is None:
+        rows = index.metric_slice(metric)
+        for start in range(rows.start, rows.stop, chunk_rows):
+            yield index.df.iloc[start:min(start + chunk_rows, rows.stop), columns]
+        return
+    positions = index.row_positions(metric, index.countries if countries is None else countries,
+                                    year_range, region)
+    for start in range(0, len(positions), chunk_rows):
+        yield index.df.iloc[positions[start:start + chunk_rows], columns]
+
+
+def sql_chunks(store, metric, countries=None, year_range=None, region=None, chunk_rows=CHUNK_ROWS):
+    """Rows of a SQLiteStore filter as frames of at most `chunk_rows` rows"""
+    return store.select_chunks(metric, countries, year_range, region, chunk_rows=chunk_rows)
+
+
+def _write_csv(chunks, path):
+    rows = 0
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        for chunk in chunks:
+            chunk.to_csv(f, index=False, header=rows == 0)
+            rows += len(chunk)
+        if rows == 0:
+            f.write(','.join(SCHEMA.names) + '\n')
+    return rows
+
+
+def _write_parquet(chunks, path):
+    rows = 0
+    import pyarrow.parquet as pq
+
+    with pq.ParquetWriter(path, SCHEMA) as writer:
+        for chunk in chunks:
+            writer.write_table(pa.Table.from_pandas(chunk, schema=SCHEMA, preserve_index=False))
+            rows += len(chunk)
+    return rows
+
+
+def _write_xlsx(chunks, path):
+    import xlsxwriter
+
+    rows = 0
+    with xlsxwriter.Workbook(path, {'constant_memory': True}) as workbook:
+        sheet, sheet_row = None, XLSX_MAX_ROWS
+        for chunk in chunks:
+            start = 0
+            while start < len(chunk):
+                if sheet_row == XLSX_MAX_ROWS:
+                    sheet = workbook.add_worksheet(f"Data {len(workbook.worksheets()) + 1}")
+                    sheet.write_row(0, 0, SCHEMA.names)
+                    sheet_row = 0
+                part = chunk.iloc[start:start + XLSX_MAX_ROWS - sheet_row]
+                # Converted a column at a time, written a row at a time: constant-memory mode
+                # flushes each row as soon as the next one starts. None is left as an empty cell.
+                columns = [part[name].astype(object).where(part[name].notna(), None).tolist()
+                           for name in SCHEMA.names]
+                for values in zip(*columns):
+                    sheet_row += 1
+                    sheet.write_row(sheet_row, 0, values)
+                start += len(part)
+            rows += len(chunk)
+        if sheet is None:
+            workbook.add_worksheet("Data 1").write_row(0, 0, SCHEMA.names)
+    return rows
+
+
+WRITERS = {'CSV': _write_csv, 'Parquet': _write_parquet, 'Excel': _write_xlsx}
+
+
+def write_export(chunks, fmt, path):
+    """
+    Write the frames of `chunks` to `path` in format `fmt` (a FORMATS name)
+    and log the export. Returns {'rows', 'bytes', 'seconds'}.
+    """
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    start = time.perf_counter()
+    rows = WRITERS[fmt](chunks, path)
+    result = {
+        'rows': rows,
+        'bytes': os.path.getsize(path),
+        'seconds': time.perf_counter() - start,
+    }
+    logger.info("export %s: %d rows, %d bytes in %.3f s -> %s",
+                fmt, result['rows'], result['bytes'], result['seconds'], path)
+    return result
+
+
+def prune_exports(name, export_dir=EXPORT_DIR, max_age=EXPORT_TTL_SECONDS):
+    """Remove the files of `name` exports older than `max_age` seconds; returns how many"""
+    removed = 0
+    cutoff = time.time() - max_age
+    for path in glob.glob(os.path.join(glob.escape(export_dir), f"{glob.escape(name)}-*")):
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            pass  # removed by another process meanwhile
+    if removed:
+        logger.info("removed %d stale %s exports from %s", removed, name, export_dir)
+    return removed
+
+
+def export_file(chunks, fmt, name, export_dir=EXPORT_DIR):
+    """
+    Write `chunks` to a new file in `export_dir` whose name starts with
+    `name`; returns (path, result of `write_export`). The caller removes
+    the file when done with it; files of earlier `name` exports older than
+    EXPORT_TTL_SECONDS are removed first.
+    """
+    extension = FORMATS[fmt][0]
+    os.makedirs(export_dir, exist_ok=True)
+    prune_exports(name, export_dir)
+    fd, path = tempfile.mkstemp(prefix=f"{name}-", suffix=f".{extension}", dir=export_dir)
+    os.close(fd)
+    try:
+        return path, write_export(chunks, fmt, path)
+    except BaseException:
+        os.remove(path)
+        raise
+
+
+def file_name(metric, fmt, year_range=None):
+    """Download name of an export of `metric`"""
+    stem = ''.join(c if c.isalnum() else '_' for c in metric).strip('_').lower()
+    stem = '_'.join(filter(None, stem.split('_')))
+    if year_range is not None:
+        stem += f"_{year_range[0]}-{year_range[1]}"
+    return f"{stem}.{FORMATS[fmt][0]}"
@@ -0,0 +1,191 @@
+# generate_dataset.py
+"""
+Deterministic synthetic dataset generator for load testing.
+
+Streams a dataset in the dashboard schema of any size (countries x
+sub-national areas x indicators x years) to CSV, Parquet or a SQLite
+database such as health_data.db. Every (country, area) block is drawn from
+its own generator seeded by (seed, country, area), so the output does not
+depend on the chunk size and peak memory follows the chunk size rather
+than the dataset size.
+
+Usage:
+    python generate_dataset.py data/processed/load_test.parquet --countries 250 --metrics 200 --years 60
+    python generate_dataset.py load_test.csv --countries 50 --subnational 20 --missing 0.1
+    python generate_dataset.py load_test.db --countries 250 --metrics 100 --years 40 --replace
+"""
+
+import argparse
+import itertools
+import os
+import string
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_loader import OUTPUT_COLUMNS, write_chunks
+from data_processor import LEVEL_MULTIPLIERS, METRICS_CONFIG
+from dimensions import LEVELS, NO_COUNTRY, REGIONS, UNKNOWN_LEVEL, UNKNOWN_REGION
+from sqlite_store import LOAD_BATCH_ROWS, load_frames, open_store
+
+DEFAULT_CHUNK_ROWS = 500_000
+DEFAULT_SEED = 42
+LAST_YEAR = 2023
+
+# Synthetic countries cycle through the known regions and income levels (the
+# "unknown" member is the last entry of both vocabularies)
+COUNTRY_REGIONS = REGIONS[:UNKNOWN_REGION]
+COUNTRY_LEVELS = LEVELS[:UNKNOWN_LEVEL]
+
+# ISO 3166 reserves XAA-XZZ for user-assigned codes, so synthetic codes never
+# match a real country; XKX is skipped as it is in common use for Kosovo
+SYNTHETIC_ISO3 = ['X' + a + b for a, b in itertools.product(string.digits + string.ascii_uppercase, repeat=2)
+                  if a + b != 'KX']
+
+
+def country_names(n_countries):
+    """(name, ISO3-style code) of every synthetic country"""
+    if n_countries > len(SYNTHETIC_ISO3):
+        raise ValueError(f"At most {len(SYNTHETIC_ISO3)} synthetic countries are supported")
+    return [(f"Country {i + 1:04d}", SYNTHETIC_ISO3[i]) for i in range(n_countries)]
+
+
+def indicator_specs(n_metrics):
+    """(name, unit, (min, max), trend) of every synthetic indicator, cycling METRICS_CONFIG"""
+    configs = list(METRICS_CONFIG.items())
+    specs = []
+    for i in range(n_metrics):
+        name, config = configs[i % len(configs)]
+        if i >= len(configs):
+            name = f"{name} (variant {i // len(configs)})"
+        specs.append((name, config['unit'], config['range'], config['trend']))
+    return specs
+
+
+def planned_rows(n_countries, n_metrics, n_years, subnational=0):
+    """Rows before missing observations are dropped"""
+    return n_countries * (1 + subnational) * n_metrics * n_years
+
+
+def _block(seed, c, a, level, specs, years, missing):
+    """Indicator positions, years and values of one (country, area) block"""
+    rng = np.random.RandomState([seed, c, a])
+    n_metrics, n_years = len(specs), len(years)
+    low = np.array([spec[2][0] for spec in specs], dtype=float)
+    high = np.array([spec[2][1] for spec in specs], dtype=float)
+    trend = np.array([spec[3] for spec in specs], dtype=float)
+
+    base = low + (high - low) * LEVEL_MULTIPLIERS[level] * rng.uniform(0.8, 1.2, n_metrics)
+    values = base[:, None] + trend[:, None] * (years - years[0])[None, :] \
+        + rng.normal(0, 1, (n_metrics, n_years)) * (high * 0.02)[:, None]
+    values = np.clip(values, (low * 0.8)[:, None], (high * 1.1)[:, None]).round(2)
+    keep = (rng.random_sample((n_metrics, n_years)) >= missing).ravel()
+
+    metric = np.repeat(np.arange(n_metrics, dtype=np.int32), n_years)[keep]
+    return metric, np.tile(years, n_metrics)[keep].astype(np.int16), values.ravel()[keep]
+
+
+def _frame(blocks, specs):
+    """
+    One chunk from (location, iso3, region, level, block) tuples. Text
+    columns are built as categoricals from codes, never as object arrays.
+    """
+    counts = [len(block[0]) for *_, block in blocks]
+    block_codes = np.repeat(np.arange(len(blocks)), counts)
+    metric = np.concatenate([block[0] for *_, block in blocks])
+
+    def per_block(position):
+        values = [entry[position] for entry in blocks]
+        categories, codes = np.unique(values, return_inverse=True)
+        return pd.Categorical.from_codes(codes[block_codes], categories)
+
+    unit_names, unit_codes = np.unique([spec[1] for spec in specs], return_inverse=True)
+    n = len(metric)
+    return pd.DataFrame({
+        'Country': per_block(0),
+        'ISO3': per_block(1),
+        'Country_Key': np.full(n, NO_COUNTRY, dtype=np.int16),
+        'Year': np.concatenate([block[1] for *_, block in blocks]),
+        'Metric': pd.Categorical.from_codes(metric, [spec[0] for spec in specs]),
+        'Value': np.concatenate([block[2] for *_, block in blocks]),
+        'Unit': pd.Categorical.from_codes(unit_codes[metric], unit_names),
+        'WHO_Region': per_block(2),
+        'Development_Level': per_block(3),
+        'Data_Quality': pd.Categorical.from_codes(np.zeros(n, dtype=np.int8), ['Synthetic']),
+        'Source': pd.Categorical.from_codes(np.zeros(n, dtype=np.int8), ['Synthetic']),
+    }, columns=OUTPUT_COLUMNS)
+
+
+def generate_chunks(n_countries, n_metrics, n_years, subnational=0, missing=0.0,
+                    seed=DEFAULT_SEED, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Iterate over dashboard-schema chunks of about `chunk_rows` rows.
+
+    Each country has a national series plus `subnational` areas named
+    "<country> - Area NN", every one with `n_metrics` indicators over the
+    last `n_years` years up to LAST_YEAR. A fraction `missing` of the
+    observations is dropped at random.
+    """
+    specs = indicator_specs(n_metrics)
+    years = np.arange(LAST_YEAR - n_years + 1, LAST_YEAR + 1)
+    blocks, rows = [], 0
+    for c, (country, iso3) in enumerate(country_names(n_countries)):
+        region, level = COUNTRY_REGIONS[c % len(COUNTRY_REGIONS)], COUNTRY_LEVELS[c % len(COUNTRY_LEVELS)]
+        for a in range(subnational + 1):
+            location = country if a == 0 else f"{country} - Area {a:02d}"
+            block = _block(seed, c, a, level, specs, years, missing)
+            blocks.append((location, iso3, region, level, block))
+            rows += len(block[0])
+            if rows >= chunk_rows:
+                yield _frame(blocks, specs)
+                blocks, rows = [], 0
+    if blocks:
+        yield _frame(blocks, specs)
+
+
+def generate_dataset(out_path, n_countries, n_metrics, n_years, subnational=0, missing=0.0,
+                     seed=DEFAULT_SEED, chunk_rows=DEFAULT_CHUNK_ROWS, replace=False):
+    """
+    Write a synthetic dataset to `out_path`: .csv or .parquet files, or a
+    SQLite database for any other extension (.db, .sqlite).
+    Returns the number of rows written.
+    """
+    chunks = generate_chunks(n_countries, n_metrics, n_years, subnational, missing, seed, chunk_rows)
+    if os.path.splitext(out_path)[1].lower() in ('.csv', '.parquet'):
+        return write_chunks(chunks, out_path)
+
+    version = f"synthetic:{seed}:{n_countries}x{subnational + 1}x{n_metrics}x{n_years}:{missing}"
+    conn = open_store(out_path).connect()
+    return load_frames(conn, chunks, replace=replace, version=version,
+                       batch_rows=min(chunk_rows, LOAD_BATCH_ROWS))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a reproducible synthetic health dataset")
+    parser.add_argument("output", help="Output .csv, .parquet or SQLite database (.db)")
+    parser.add_argument("--countries", type=int, default=250)
+    parser.add_argument("--metrics", type=int, default=50, help="Indicators per country")
+    parser.add_argument("--years", type=int, default=30, help=f"Years up to {LAST_YEAR}")
+    parser.add_argument("--subnational", type=int, default=0, help="Sub-national areas per country")
+    parser.add_argument("--missing", type=float, default=0.0, help="Fraction of observations left out")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNK_ROWS,
+                        help=f"Rows per chunk (default: {DEFAULT_CHUNK_ROWS})")
+    parser.add_argument("--replace", action="store_true",
+                        help="Replace the contents of a SQLite output instead of upserting into them")
+    args = parser.parse_args()
+
+    planned = planned_rows(args.countries, args.metrics, args.years, args.subnational)
+    print(f"🧪 Generating up to {planned:,} rows into {args.output}")
+    start = time.perf_counter()
+    rows = generate_dataset(args.output, args.countries, args.metrics, args.years, args.subnational,
+                            args.missing, args.seed, args.chunksize, args.replace)
+    elapsed = time.perf_counter() - start
+
+    print(f"✅ Wrote {rows:,} rows in {elapsed:.2f}s ({rows / max(elapsed, 1e-9):,.0f} rows/s)")
+    print(f"💾 File size: {os.path.getsize(args.output):,} bytes")
+
+
+if __name__ == "__main__":
+    main()
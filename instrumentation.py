@@ -0,0 +1,170 @@
+# instrumentation.py
+"""
+Per-stage timing of dashboard reruns.
+
+Every rerun creates a `RunTimer` and wraps each stage (data load, filter,
+KPI math, figure building, chart and table serialization) in
+`timer.stage(name)`. When the run finishes, the time spent in every stage
+feeds one or more `StageHistograms`, one per session and one for the
+whole process. Each keeps Prometheus histogram buckets plus a window of
+recent samples for p50/p95/p99.
+
+Finished runs can be logged as one JSON object per line and the process
+histograms exported in the Prometheus text format for a file-based
+scraper (node_exporter textfile collector or similar).
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+# Upper bounds (seconds) of the Prometheus histogram buckets
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Recent samples kept per stage for the percentiles
+WINDOW = 2048
+
+METRIC_NAME = "dashboard_stage_seconds"
+
+logger = logging.getLogger("dashboard.timings")
+
+
+class _Histogram:
+    def __init__(self):
+        self.bucket_counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=WINDOW)
+
+    def observe(self, seconds):
+        self.count += 1
+        self.sum += seconds
+        self.recent.append(seconds)
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.bucket_counts[i] += 1
+                break
+
+
+class StageHistograms:
+    """Thread-safe duration histograms keyed by stage name"""
+
+    def __init__(self):
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            histogram = self._stages.get(stage)
+            if histogram is None:
+                histogram = self._stages[stage] = _Histogram()
+            histogram.observe(seconds)
+
+    def summary(self):
+        """One row per stage: count, mean and p50/p95/p99 in milliseconds"""
+        with self._lock:
+            rows = []
+            for stage, histogram in self._stages.items():
+                p50, p95, p99 = np.percentile(np.fromiter(histogram.recent, dtype=float), [50, 95, 99]) * 1000
+                rows.append({
+                    'Stage': stage,
+                    'Count': histogram.count,
+                    'Mean (ms)': histogram.sum / histogram.count * 1000,
+                    'p50 (ms)': p50,
+                    'p95 (ms)': p95,
+                    'p99 (ms)': p99,
+                })
+            return rows
+
+    def to_prometheus(self, name=METRIC_NAME):
+        """The histograms in the Prometheus text exposition format"""
+        lines = [
+            f"# HELP {name} Time spent in each stage of a dashboard rerun",
+            f"# TYPE {name} histogram",
+        ]
+        with self._lock:
+            for stage, histogram in sorted(self._stages.items()):
+                label = stage.replace('\\', '\\\\').replace('"', '\\"')
+                cumulative = 0
+                for bound, count in zip(BUCKETS, histogram.bucket_counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{stage="{label}",le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{stage="{label}",le="+Inf"}} {histogram.count}')
+                lines.append(f'{name}_sum{{stage="{label}"}} {histogram.sum:.6f}')
+                lines.append(f'{name}_count{{stage="{label}"}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+
+class RunTimer:
+    """
+    Timing spans of one rerun. Spans of the same stage add up; each stage is
+    recorded once into every given set of histograms when the run finishes.
+    """
+
+    def __init__(self, *histograms, session=None):
+        self.histograms = histograms
+        self.session = session
+        self.stages = {}
+        self.started = time.time()
+        self._start = time.perf_counter()
+        self._finished = False
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def finish(self):
+        """Record the stages and the total time of the run and return it as a log record"""
+        if not self._finished:
+            self._finished = True
+            self.stages['total'] = time.perf_counter() - self._start
+            for histograms in self.histograms:
+                for name, seconds in self.stages.items():
+                    histograms.observe(name, seconds)
+        return {
+            'ts': self.started,
+            'session': self.session,
+            'stages': {name: round(seconds * 1000, 3) for name, seconds in self.stages.items()},
+        }
+
+
+def configure_json_log(path):
+    """Send run records to `path`, one JSON object per line"""
+    if any(getattr(h, 'baseFilename', None) == os.path.abspath(path) for h in logger.handlers):
+        return
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    handler = logging.FileHandler(path, encoding='utf-8')
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def log_run(record):
+    logger.info(json.dumps(record))
+
+
+def write_prometheus(histograms, path):
+    """Atomically replace the text file at `path` with the current histograms"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(histograms.to_prometheus())
+    os.replace(tmp_path, path)
@@ -0,0 +1,44 @@
+# kpis.py
+"""
+KPI tile values for the dashboard, computed from a filtered frame.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def compute_kpis(filtered_df, year_range):
+    """
+    Values for the KPI tiles: average, country with the highest value and
+    the mean change of the selected series from their first to their last
+    observation in the range (see DatasetIndex.mean_change). None when no
+    row has a value.
+    """
+    # float32 storage is fine for values but not for differences of means
+    values = filtered_df['Value'].astype(np.float64)
+    if not values.notna().any():
+        return None
+    improvement = series_change(filtered_df['Country'], filtered_df['Year'], values)
+    return {
+        'average': float(values.mean()),
+        'unit': str(filtered_df['Unit'].iloc[0]),
+        'top_country': str(filtered_df.loc[values.idxmax(), 'Country']),
+        'improvement': float(improvement),
+    }
+
+
+def series_change(countries, years, values):
+    """
+    Mean change from the first to the last observation of every country's
+    series. Gaps are skipped rather than compared against a missing year,
+    so series observed on different year grids all count; series with
+    fewer than two observations are left out.
+    """
+    frame = pd.DataFrame({'Country': countries, 'Year': years, 'Value': values})
+    frame = frame[frame['Value'].notna()].sort_values(['Country', 'Year'], kind='stable')
+    ends = frame.groupby('Country', sort=False, observed=True).agg(
+        first_year=('Year', 'first'), last_year=('Year', 'last'),
+        first_value=('Value', 'first'), last_value=('Value', 'last'),
+    )
+    ends = ends[ends['last_year'] > ends['first_year']]
+    return float((ends['last_value'] - ends['first_value']).mean()) if len(ends) else float('nan')
@@ -0,0 +1,124 @@
+# profile_startup.py
+"""
+Startup and rerun profile of the dashboard.
+
+Runs app.py headlessly with Streamlit's AppTest, each scenario in a fresh
+Python process, and reports:
+
+- first run: a cold process importing everything and building the page
+  (the closest headless measure of time to first paint)
+- rerun: the same page again in the warm process
+- empty rerun: the page with no country selected
+- the modules imported by the first run that took longest to import
+
+Usage:
+    python profile_startup.py
+    python profile_startup.py --runs 5 --json startup.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+APP_FILE = "app.py"
+HEAVY_MODULES = ['plotly', 'plotly.express', 'plotly.graph_objects', 'pyarrow', 'pandas', 'numpy']
+
+
+def _profile_once(reruns):
+    """Profile one fresh process; returns a dict of timings in seconds"""
+    from streamlit.testing.v1 import AppTest
+
+    before = set(sys.modules)
+    app = AppTest.from_file(APP_FILE, default_timeout=120)
+    start = time.perf_counter()
+    app.run()
+    first_run = time.perf_counter() - start
+    if app.exception:
+        raise RuntimeError(app.exception[0].message)
+    loaded = sorted(m for m in HEAVY_MODULES if m in sys.modules and m not in before)
+
+    rerun = []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        app.run()
+        rerun.append(time.perf_counter() - start)
+
+    app.sidebar.multiselect[0].set_value([])
+    empty = []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        app.run()
+        empty.append(time.perf_counter() - start)
+    return {
+        'first_run': first_run,
+        'rerun': min(rerun),
+        'empty_rerun': min(empty),
+        'heavy_modules_loaded': loaded,
+    }
+
+
+def _import_profile():
+    """Import time of the app's heavy modules in a fresh process"""
+    code = (
+        "import time, json, importlib\n"
+        f"modules = {HEAVY_MODULES!r}\n"
+        "result = {}\n"
+        "for m in ['streamlit'] + modules:\n"
+        "    t = time.perf_counter(); importlib.import_module(m); result[m] = time.perf_counter() - t\n"
+        "print(json.dumps(result))\n"
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def profile(runs=3, reruns=5):
+    """Median of `runs` fresh-process profiles, plus module import times"""
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", str(reruns)],
+            capture_output=True, text=True, check=True
+        )
+        samples.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    def median(key):
+        return sorted(sample[key] for sample in samples)[len(samples) // 2]
+
+    return {
+        'first_run': median('first_run'),
+        'rerun': median('rerun'),
+        'empty_rerun': median('empty_rerun'),
+        'heavy_modules_loaded': samples[0]['heavy_modules_loaded'],
+        'import_seconds': _import_profile(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile dashboard startup and reruns")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh processes to profile (median is kept)")
+    parser.add_argument("--reruns", type=int, default=5, help="Reruns per process (best is kept)")
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        print(json.dumps(_profile_once(args.child)))
+        return
+
+    result = profile(args.runs, args.reruns)
+    print(f"🚀 First run (cold process): {result['first_run'] * 1000:8.1f} ms")
+    print(f"🔁 Rerun:                    {result['rerun'] * 1000:8.1f} ms")
+    print(f"🫙 Rerun, no countries:      {result['empty_rerun'] * 1000:8.1f} ms")
+    print(f"📦 Heavy modules loaded by the first run: {', '.join(result['heavy_modules_loaded']) or 'none'}")
+    for module, seconds in result['import_seconds'].items():
+        print(f"   import {module:<22} {seconds * 1000:8.1f} ms")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# rollups.py
+"""
+Pre-aggregated rollup tables for the KPI tiles.
+
+Two small tables are computed once per dataset version:
+
+- per (Metric, Year): count, sum, min, max and the country holding the max
+- per (Metric, Country): count, sum, min, max and the first/last year and
+  value of the series
+
+The improvement tile is the mean change of the series from their first to
+their last observation in the range. When the range cuts series short it
+comes from as-of lookups on the dataset index.
+
+`Rollups.kpis` assembles the KPI tiles from them whenever they give
+the exact answer for the current filter: either the year range covers every
+selected series end to end (per-country table), or every country with
+data for the metric is selected (per-year table). For any other filter it
+returns None and the caller aggregates the filtered rows.
+"""
+
+import numpy as np
+import pandas as pd
+
+from data_index import DatasetIndex, sort_for_index
+
+
+def _per_metric(frame):
+    """Split a (Metric, key)-indexed table into {metric: table indexed by key}"""
+    return {metric: group.droplevel(0) for metric, group in frame.groupby(level=0, sort=False, observed=True)}
+
+
+class Rollups:
+    """Per (metric, year) and per (metric, country) aggregates of a dataset"""
+
+    def __init__(self, df, index=None):
+        # As-of lookups for the improvement tile when the range cuts series short
+        self.index = index if index is not None else DatasetIndex(df)
+        df = sort_for_index(df[df['Value'].notna()])
+        values = df['Value'].astype(np.float64)
+        frame = pd.DataFrame({
+            'Metric': df['Metric'].astype(object),
+            'Country': df['Country'].astype(object),
+            'Year': df['Year'].astype(np.int64),
+            'Value': values,
+        })
+        self.units = frame.assign(Unit=df['Unit'].astype(object).to_numpy()).groupby(
+            'Metric', sort=False)['Unit'].first().to_dict()
+
+        # Rows are sorted by year inside each (Metric, Country), so first/last follow time
+        by_country = frame.groupby(['Metric', 'Country'], sort=False)
+        metric_country = by_country['Value'].agg(['count', 'sum', 'min', 'max'])
+        metric_country['first_year'] = by_country['Year'].first()
+        metric_country['first_value'] = by_country['Value'].first()
+        metric_country['last_year'] = by_country['Year'].last()
+        metric_country['last_value'] = by_country['Value'].last()
+
+        by_year = frame.groupby(['Metric', 'Year'], sort=True)
+        metric_year = by_year['Value'].agg(['count', 'sum', 'min', 'max'])
+        metric_year['argmax_country'] = frame['Country'].to_numpy()[by_year['Value'].idxmax().to_numpy()]
+
+        self.metric_country = _per_metric(metric_country)
+        self.metric_year = _per_metric(metric_year)
+
+    def kpis(self, metric, countries, year_range):
+        """
+        KPI tile values in the format of kpis.compute_kpis, or None when the
+        rollups cannot answer this filter exactly
+        """
+        per_country = self.metric_country.get(metric)
+        if per_country is None:
+            return None
+        y0, y1 = int(year_range[0]), int(year_range[1])
+        selected = per_country.reindex(sorted(set(countries))).dropna(subset=['count'])
+        if selected.empty:
+            return None
+
+        # Every selected series lies inside the range: use the per-country table
+        if (selected['first_year'] >= y0).all() and (selected['last_year'] <= y1).all():
+            changed = selected[selected['last_year'] > selected['first_year']]
+            improvement = (changed['last_value'] - changed['first_value']).mean()
+            return {
+                'average': float(selected['sum'].sum() / selected['count'].sum()),
+                'unit': self.units[metric],
+                'top_country': str(selected['max'].idxmax()),
+                'improvement': float(improvement),
+            }
+
+        # Every country with data is selected: use the per-year table
+        if len(selected) == len(per_country):
+            per_year = self.metric_year[metric]
+            in_range = per_year.loc[y0:y1]
+            if in_range.empty:
+                return None
+            # The first and last observation in the range come from the index
+            improvement = self.index.mean_change(metric, selected.index, year_range)
+            return {
+                'average': float(in_range['sum'].sum() / in_range['count'].sum()),
+                'unit': self.units[metric],
+                'top_country': str(in_range.loc[in_range['max'].idxmax(), 'argmax_country']),
+                'improvement': float(improvement),
+            }
+
+        return None
@@ -0,0 +1,195 @@
+# snapshot_cache.py
+"""
+On-disk snapshots of prepared datasets.
+
+A snapshot is an uncompressed Arrow IPC file plus a small JSON manifest
+recording the fingerprint of every source file (size, mtime and SHA-256)
+and the version of the code that produced it. A snapshot is reused as
+long as the sources and the code are unchanged; touching a file without
+changing its content only costs a re-hash, not a rebuild.
+
+Snapshots are memory-mapped read-only and converted to pandas without
+copying, so every process serving the same snapshot shares one copy of
+the data through the OS page cache.
+"""
+
+import hashlib
+import json
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+SNAPSHOT_DIR = "data/processed"
+
+# Bump to invalidate every snapshot, e.g. after a change in snapshot layout
+SNAPSHOT_FORMAT_VERSION = 2
+
+
+def file_sha256(path, block_size=1 << 20):
+    """SHA-256 hex digest of a file, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def file_fingerprint(path):
+    """Size, mtime and content hash of a source file"""
+    stat = os.stat(path)
+    return {
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha256': file_sha256(path),
+    }
+
+
+def code_version(modules):
+    """Hash of the source files of the modules that build a dataset"""
+    digest = hashlib.sha256(str(SNAPSHOT_FORMAT_VERSION).encode())
+    for module in modules:
+        with open(module.__file__, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def dataset_fingerprint(sources, code):
+    """Single key for a dataset built by `code` from the given source fingerprints"""
+    payload = json.dumps(
+        {'code': code, 'sources': {path: fp['sha256'] for path, fp in sorted(sources.items())}},
+        sort_keys=True
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _arrow_column(series):
+    """
+    Arrow array for one column. Numeric NaN stays a value instead of
+    becoming a null, so the column maps back to pandas without a copy.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        return pa.DictionaryArray.from_arrays(
+            pa.array(codes, mask=codes < 0),
+            pa.array(series.cat.categories.to_numpy(dtype=object)),
+            ordered=series.cat.ordered,
+        )
+    if series.dtype.kind in 'biuf':
+        return pa.array(series.to_numpy(), from_pandas=False)
+    return pa.array(series, from_pandas=True)
+
+
+def write_arrow(df, path):
+    """Write `df` as an uncompressed Arrow IPC file, atomically"""
+    table = pa.Table.from_arrays([_arrow_column(df[c]) for c in df.columns], names=[str(c) for c in df.columns])
+
+    def write(tmp_path):
+        with pa.OSFile(tmp_path, 'wb') as sink, ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    _write_atomic(path, write)
+
+
+def read_arrow(path):
+    """
+    Memory-map an Arrow IPC file read-only as a DataFrame. Numeric and
+    categorical columns are views of the mapped file, so the data is only
+    paged in once per machine however many processes open it.
+    """
+    with pa.memory_map(path, 'r') as source:
+        table = ipc.open_file(source).read_all()
+    return table.to_pandas(split_blocks=True)
+
+
+def _paths(name, snapshot_dir):
+    base = os.path.join(snapshot_dir, name)
+    return base + '.arrow', base + '.json'
+
+
+def _read_manifest(manifest_path):
+    try:
+        with open(manifest_path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_atomic(path, write):
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _current_sources(paths, recorded):
+    """
+    Fingerprint the source files, reusing the recorded hash when size and
+    mtime are unchanged so a warm check never reads the files
+    """
+    sources = {}
+    for path in paths:
+        stat = os.stat(path)
+        known = recorded.get(path)
+        if known and known['size'] == stat.st_size and known['mtime_ns'] == stat.st_mtime_ns:
+            sources[path] = known
+        else:
+            sources[path] = file_fingerprint(path)
+    return sources
+
+
+def _write_manifest(manifest_path, manifest):
+    def write(path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+    _write_atomic(manifest_path, write)
+
+
+def save_snapshot(df, name, sources, code, snapshot_dir=SNAPSHOT_DIR):
+    """Write a dataset snapshot and its manifest"""
+    os.makedirs(snapshot_dir, exist_ok=True)
+    data_path, manifest_path = _paths(name, snapshot_dir)
+    fingerprint = dataset_fingerprint(sources, code)
+
+    write_arrow(df.reset_index(drop=True), data_path)
+    _write_manifest(manifest_path, {'fingerprint': fingerprint, 'code': code, 'sources': sources})
+    return fingerprint
+
+
+def load_or_build(name, source_paths, builder, code_modules, snapshot_dir=SNAPSHOT_DIR):
+    """
+    Return (df, fingerprint, from_snapshot) for a dataset.
+
+    The snapshot called `name` is used when its manifest matches the current
+    source files and code version; otherwise `builder()` is called and its
+    result is written as the new snapshot.
+    """
+    data_path, manifest_path = _paths(name, snapshot_dir)
+    code = code_version(code_modules)
+    manifest = _read_manifest(manifest_path) or {}
+    sources = _current_sources(source_paths, manifest.get('sources', {}))
+    fingerprint = dataset_fingerprint(sources, code)
+
+    if manifest.get('fingerprint') == fingerprint and os.path.exists(data_path):
+        try:
+            df = read_arrow(data_path)
+        except Exception:
+            df = None
+        if df is not None:
+            if sources != manifest['sources']:
+                # Files were touched but not changed - remember the new mtimes
+                _write_manifest(manifest_path, {'fingerprint': fingerprint, 'code': code, 'sources': sources})
+            return df, fingerprint, True
+
+    df = builder()
+    try:
+        save_snapshot(df, name, sources, code, snapshot_dir)
+        # Serve the mapped snapshot and let the freshly built copy go
+        df = read_arrow(data_path)
+    except OSError:
+        # A read-only deployment still works, it just rebuilds on cold start
+        pass
+    return df, fingerprint, False
@@ -0,0 +1,422 @@
+# sqlite_store.py
+"""
+SQLite storage engine for the dashboard.
+
+Observations are stored in long format with small integer keys:
+
+    metrics(metric_id, name, unit)
+    countries(country_id, name, who_region, development_level)
+    observations(metric_id, country_id, year, value)
+
+`observations` is a WITHOUT ROWID table whose primary key is
+(metric_id, country_id, year), so the table itself is the covering
+composite index: a dashboard filter is a set of range scans on it and the
+value is read from the same B-tree page. The database runs in WAL mode so
+readers are never blocked by a reload.
+"""
+
+import os
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+DB_FILE = "health_data.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS metrics (
+    metric_id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    unit TEXT
+);
+
+CREATE TABLE IF NOT EXISTS countries (
+    country_id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    who_region TEXT,
+    development_level TEXT
+);
+
+CREATE TABLE IF NOT EXISTS dataset_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+OBSERVATIONS_TABLE = """
+CREATE TABLE IF NOT EXISTS {table} (
+    metric_id INTEGER NOT NULL REFERENCES metrics(metric_id),
+    country_id INTEGER NOT NULL REFERENCES countries(country_id),
+    year INTEGER NOT NULL,
+    value REAL,
+    PRIMARY KEY (metric_id, country_id, year)
+) WITHOUT ROWID
+"""
+
+# A replacement is loaded here and renamed to observations once complete
+STAGING_TABLE = "observations_staging"
+
+# Secondary indexes, dropped during bulk upserts and rebuilt afterwards
+INDEXES = {
+    'idx_countries_region': "CREATE INDEX IF NOT EXISTS idx_countries_region ON countries(who_region, country_id)",
+    'idx_observations_country_year': (
+        "CREATE INDEX IF NOT EXISTS idx_observations_country_year ON observations(country_id, year, metric_id)"
+    ),
+}
+
+LOAD_BATCH_ROWS = 250_000
+
+# Columns of the frames returned by the series queries
+SELECT_COLUMNS = ['Country', 'Year', 'Metric', 'Value', 'Unit', 'WHO_Region']
+
+
+def _first_per_group(keys, values):
+    """First non-null value of `values` for every distinct key, as a dict"""
+    frame = pd.DataFrame({'key': np.asarray(keys, dtype=object), 'value': np.asarray(values, dtype=object)})
+    first = frame.dropna().drop_duplicates('key').set_index('key')['value'].to_dict()
+    return {key: first.get(key) for key in pd.unique(frame['key'])}
+
+
+def _column(df, column):
+    """`column` as an object Series, or all-null if the frame does not have it"""
+    if column in df.columns:
+        return df[column].astype(object)
+    return pd.Series(None, index=df.index, dtype=object)
+
+
+def _upsert_dimension(conn, table, key_column, rows, update_columns):
+    """Insert or update dimension rows and return {name: id}"""
+    columns = ['name'] + update_columns
+    updates = ', '.join(f"{c} = COALESCE(excluded.{c}, {c})" for c in update_columns)
+    conn.executemany(
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+        f"ON CONFLICT(name) DO UPDATE SET {updates}",
+        rows
+    )
+    names = [row[0] for row in rows]
+    ids = {}
+    for start in range(0, len(names), 500):
+        batch = names[start:start + 500]
+        ids.update(conn.execute(
+            f"SELECT name, {key_column} FROM {table} WHERE name IN ({', '.join('?' * len(batch))})", batch
+        ).fetchall())
+    return ids
+
+
+def upsert_frame(conn, df, table='observations'):
+    """
+    Upsert one dashboard-schema frame (Country, Year, Metric, Value and
+    optionally Unit, WHO_Region, Development_Level) into `table` inside the
+    caller's transaction. Observations are keyed on (metric, country, year),
+    so loading the same data twice leaves the database unchanged.
+    Returns the number of observation rows written.
+    """
+    df = df[df['Country'].notna() & df['Metric'].notna() & df['Year'].notna()]
+    if df.empty:
+        return 0
+
+    units = _first_per_group(df['Metric'].astype(object), _column(df, 'Unit'))
+    regions = _first_per_group(df['Country'].astype(object), _column(df, 'WHO_Region'))
+    levels = _first_per_group(df['Country'].astype(object), _column(df, 'Development_Level'))
+
+    metric_ids = _upsert_dimension(conn, 'metrics', 'metric_id', list(units.items()), ['unit'])
+    country_ids = _upsert_dimension(
+        conn, 'countries', 'country_id',
+        [(name, regions[name], levels[name]) for name in regions], ['who_region', 'development_level']
+    )
+
+    keys = pd.DataFrame({
+        'metric_id': df['Metric'].astype(object).map(metric_ids).to_numpy(dtype=np.int64),
+        'country_id': df['Country'].astype(object).map(country_ids).to_numpy(dtype=np.int64),
+        'year': df['Year'].to_numpy(dtype=np.int64),
+        'value': df['Value'].to_numpy(dtype=np.float64),
+    })
+    # Insert in primary key order so the B-tree grows at its right edge
+    keys = keys.sort_values(['metric_id', 'country_id', 'year'], kind='stable')
+    values = keys['value'].to_numpy()
+    conn.executemany(
+        f"INSERT INTO {table} (metric_id, country_id, year, value) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT(metric_id, country_id, year) DO UPDATE SET value = excluded.value",
+        zip(
+            keys['metric_id'].tolist(),
+            keys['country_id'].tolist(),
+            keys['year'].tolist(),
+            np.where(np.isnan(values), None, values).tolist(),
+        )
+    )
+    return len(keys)
+
+
+def _set_pragma(conn, pragma, value):
+    """Set a PRAGMA, ignoring modes SQLite refuses while other connections are open"""
+    try:
+        conn.execute(f"PRAGMA {pragma}={value}")
+    except sqlite3.OperationalError:
+        pass
+
+
+def _drop_unreferenced_dimensions(conn):
+    """Delete the metrics and countries without observations, inside the caller's transaction"""
+    conn.execute("DELETE FROM metrics WHERE metric_id NOT IN (SELECT DISTINCT metric_id FROM observations)")
+    conn.execute("DELETE FROM countries WHERE country_id NOT IN (SELECT DISTINCT country_id FROM observations)")
+
+
+def load_frames(conn, frames, replace=False, version=None, batch_rows=LOAD_BATCH_ROWS, loaded_by='bulk'):
+    """
+    Bulk-load an iterable of dashboard-schema frames.
+
+    The load keeps the WAL journal with synchronous=NORMAL (a crash loses at
+    most the last batch, never the database), uses a large page cache and
+    writes each batch of up to `batch_rows` rows in its own transaction.
+
+    Without `replace` rows are upserted on (metric, country, year) with the
+    secondary indexes dropped, and the indexes are rebuilt afterwards. With
+    `replace` the batches go to a staging table; once it is complete, one
+    short transaction swaps it in for observations and removes the metrics
+    and countries nothing refers to any more. Readers see the old contents
+    or the new ones, and an interrupted load leaves the old ones in place.
+    ANALYZE is run at the end. `loaded_by` records which tool wrote the
+    database last (see SQLiteStore.write_dataset).
+    Returns the number of observation rows written.
+    """
+    _set_pragma(conn, 'journal_mode', 'WAL')
+    _set_pragma(conn, 'synchronous', 'NORMAL')
+    _set_pragma(conn, 'cache_size', -256 * 1024)
+    _set_pragma(conn, 'temp_store', 'MEMORY')
+
+    table = STAGING_TABLE if replace else 'observations'
+    with conn:
+        if replace:
+            conn.execute(f"DROP TABLE IF EXISTS {STAGING_TABLE}")
+            conn.execute(OBSERVATIONS_TABLE.format(table=STAGING_TABLE))
+        else:
+            for name in INDEXES:
+                conn.execute(f"DROP INDEX IF EXISTS {name}")
+
+    rows = 0
+    try:
+        for frame in frames:
+            for start in range(0, len(frame), batch_rows):
+                with conn:
+                    rows += upsert_frame(conn, frame.iloc[start:start + batch_rows], table)
+    except BaseException:
+        if replace:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute(f"DROP TABLE IF EXISTS {STAGING_TABLE}")
+                _drop_unreferenced_dimensions(conn)
+        raise
+
+    with conn:
+        # DDL does not open a transaction by itself; the swap must be one
+        conn.execute("BEGIN IMMEDIATE")
+        if replace:
+            conn.execute("DROP TABLE observations")
+            conn.execute(f"ALTER TABLE {STAGING_TABLE} RENAME TO observations")
+            _drop_unreferenced_dimensions(conn)
+        for sql in INDEXES.values():
+            conn.execute(sql)
+        if version is not None:
+            conn.execute("INSERT OR REPLACE INTO dataset_meta (key, value) VALUES ('version', ?)", (version,))
+        conn.execute("INSERT OR REPLACE INTO dataset_meta (key, value) VALUES ('loaded_by', ?)", (loaded_by,))
+    conn.execute("ANALYZE")
+    return rows
+
+
+class SQLiteStore:
+    """Dashboard queries pushed down to a SQLite database"""
+
+    def __init__(self, path=DB_FILE):
+        self.path = path
+        self._local = threading.local()
+        with self.connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            conn.execute(OBSERVATIONS_TABLE.format(table='observations'))
+            for sql in INDEXES.values():
+                conn.execute(sql)
+
+    def connect(self):
+        """Connection for the current thread (Streamlit runs sessions in threads)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path)
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    # ------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------
+
+    def _meta(self, key):
+        row = self.connect().execute("SELECT value FROM dataset_meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def version(self):
+        """Version string of the dataset currently stored, or None"""
+        return self._meta('version')
+
+    def loaded_by(self):
+        """'dashboard' when the app wrote the stored dataset, 'bulk' for bulk_load and generate_dataset"""
+        return self._meta('loaded_by')
+
+    def write_dataset(self, df, version):
+        """
+        Replace the stored observations with `df` unless `version` is already
+        loaded. A database filled by bulk_load or generate_dataset is left as
+        it is: the dashboard only ever replaces data it wrote itself.
+        """
+        stored = self.version()
+        if stored == version:
+            return False
+        if stored is not None and self.loaded_by() != 'dashboard':
+            return False
+
+        load_frames(self.connect(), [df], replace=True, version=version, loaded_by='dashboard')
+        return True
+
+    # ------------------------------------------------------------
+    # Dimensions
+    # ------------------------------------------------------------
+
+    def metrics(self):
+        return [row[0] for row in self.connect().execute("SELECT name FROM metrics ORDER BY metric_id")]
+
+    def countries(self):
+        return [row[0] for row in self.connect().execute("SELECT name FROM countries ORDER BY name")]
+
+    def regions(self):
+        return [row[0] for row in self.connect().execute(
+            "SELECT DISTINCT who_region FROM countries WHERE who_region IS NOT NULL ORDER BY who_region"
+        )]
+
+    def year_bounds(self):
+        return self.connect().execute("SELECT MIN(year), MAX(year) FROM observations").fetchone()
+
+    def observation_count(self):
+        return self.connect().execute("SELECT COUNT(*) FROM observations").fetchone()[0]
+
+    def metric_years(self, metric):
+        """Sorted years in which `metric` has at least one observation"""
+        return [row[0] for row in self.connect().execute(
+            "SELECT DISTINCT year FROM observations "
+            "WHERE metric_id = (SELECT metric_id FROM metrics WHERE name = ?) ORDER BY year", (metric,)
+        )]
+
+    # ------------------------------------------------------------
+    # Filtered queries
+    # ------------------------------------------------------------
+
+    def _where(self, metric, countries, year_range, region):
+        """
+        WHERE clause and parameters shared by the series and KPI queries;
+        `metric`, `countries` and `year_range` of None do not filter
+        """
+        clauses, params = [], []
+        if metric is not None:
+            clauses.append("o.metric_id = (SELECT metric_id FROM metrics WHERE name = ?)")
+            params.append(metric)
+        if countries is not None:
+            placeholders = ', '.join('?' * len(countries))
+            clauses.append(f"o.country_id IN (SELECT country_id FROM countries WHERE name IN ({placeholders}))")
+            params.extend(countries)
+        if year_range is not None:
+            clauses.append("o.year BETWEEN ? AND ?")
+            params.extend([int(year_range[0]), int(year_range[1])])
+        if region and region != 'All':
+            clauses.append("o.country_id IN (SELECT country_id FROM countries WHERE who_region = ?)")
+            params.append(region)
+        return ' AND '.join(clauses) or '1', params
+
+    def _select(self, metric, countries, year_range, region):
+        where, params = self._where(metric, countries, year_range, region)
+        return self.connect().execute(f"""
+            SELECT c.name, o.year, m.name, o.value, m.unit, c.who_region
+            FROM observations o
+            JOIN countries c ON c.country_id = o.country_id
+            JOIN metrics m ON m.metric_id = o.metric_id
+            WHERE {where}
+            ORDER BY o.metric_id, c.name, o.year
+        """, params)
+
+    def select(self, metric, countries, year_range, region=None):
+        """
+        Rows for one metric, a set of countries, a year range and a region;
+        None selects every metric, country or year
+        """
+        if countries is not None:
+            countries = list(countries)
+            if not countries:
+                return pd.DataFrame(columns=SELECT_COLUMNS)
+        rows = self._select(metric, countries, year_range, region).fetchall()
+        return pd.DataFrame(rows, columns=SELECT_COLUMNS)
+
+    def select_chunks(self, metric, countries=None, year_range=None, region=None, chunk_rows=LOAD_BATCH_ROWS):
+        """
+        Rows of `select` as frames of at most `chunk_rows` rows, fetched from
+        the cursor as they are consumed; every country and year by default
+        """
+        if countries is not None:
+            countries = list(countries)
+            if not countries:
+                return
+        cursor = self._select(metric, countries, year_range, region)
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                return
+            yield pd.DataFrame(rows, columns=SELECT_COLUMNS)
+
+    def kpis(self, metric, countries, year_range, region=None):
+        """
+        KPI tile values computed in SQL, in the format of kpis.compute_kpis;
+        None when no selected observation has a value
+        """
+        if not countries:
+            return None
+        where, params = self._where(metric, list(countries), year_range, region)
+        # With a single max() aggregate SQLite takes the bare c.name from the max row
+        row = self.connect().execute(f"""
+            SELECT AVG(o.value),
+                   MAX(o.value),
+                   c.name,
+                   COUNT(o.value),
+                   (SELECT unit FROM metrics WHERE name = ?)
+            FROM observations o
+            JOIN countries c ON c.country_id = o.country_id
+            WHERE {where}
+        """, [metric, *params]).fetchone()
+        average, _, top_country, count, unit = row
+        if not count:
+            return None
+        # Mean change from the first to the last observation of every series
+        # with at least two observations in the range
+        improvement = self.connect().execute(f"""
+            WITH ranked AS (
+                SELECT o.country_id, o.year, o.value,
+                       ROW_NUMBER() OVER (PARTITION BY o.country_id ORDER BY o.year) AS from_start,
+                       ROW_NUMBER() OVER (PARTITION BY o.country_id ORDER BY o.year DESC) AS from_end
+                FROM observations o
+                WHERE {where} AND o.value IS NOT NULL
+            )
+            SELECT AVG(last.value - first.value)
+            FROM ranked first
+            JOIN ranked last ON last.country_id = first.country_id AND last.from_end = 1
+            WHERE first.from_start = 1 AND last.year > first.year
+        """, params).fetchone()[0]
+        return {
+            'average': average,
+            'unit': unit,
+            'top_country': top_country,
+            'improvement': float('nan') if improvement is None else improvement,
+        }
+
+
+def open_store(path=DB_FILE):
+    """Open (creating if needed) the dashboard store at `path`"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    return SQLiteStore(path)
@@ -0,0 +1,57 @@
+# test_analytics.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics import SeriesAnalytics
+from data_index import DatasetIndex
+from data_processor import build_who_dataset
+
+WHO_FILE = "data/raw/who_life_expectancy.csv"
+
+
+def _reference(series, measure, window=5):
+    """Per-series loop over the observations of one series (sorted by year)"""
+    years, values = series['Year'].to_numpy(), series['Value'].to_numpy(dtype=float)
+    out = []
+    for i, (year, value) in enumerate(zip(years, values)):
+        in_window = (years > year - window) & (years <= year)
+        if measure == 'Rolling mean':
+            out.append(values[in_window].mean())
+        elif measure == 'YoY change':
+            out.append(np.nan if i == 0 else (value - values[i - 1]) / (year - years[i - 1]))
+        elif measure == 'CAGR (%)':
+            elapsed = year - years[0]
+            out.append(np.nan if elapsed == 0 else ((value / values[0]) ** (1 / elapsed) - 1) * 100)
+        elif measure == 'Trend slope':
+            out.append(np.polyfit(years[in_window], values[in_window], 1)[0] if in_window.sum() >= 2 else np.nan)
+    return out
+
+
+@pytest.mark.parametrize('measure', ['Rolling mean', 'YoY change', 'CAGR (%)', 'Trend slope'])
+def test_measures_match_per_series_loop(measure):
+    index = DatasetIndex(build_who_dataset(WHO_FILE))
+    analytics = SeriesAnalytics(index)
+    df = index.df.assign(Value=index.df['Value'].astype(np.float64))
+    expected = np.concatenate([
+        _reference(group, measure) for _, group in df.groupby(['Metric', 'Country'], sort=False, observed=True)
+    ])
+    np.testing.assert_allclose(analytics.measure(measure), expected, rtol=1e-9, atol=1e-9)
+
+
+def test_measure_at_positions_and_gaps():
+    df = pd.DataFrame({
+        'Country': ['A', 'A', 'A', 'B', 'B'],
+        'Year': [2000, 2002, 2010, 2001, 2002],
+        'Metric': ['M'] * 5,
+        'Value': [10.0, 14.0, np.nan, 5.0, 6.0],
+        'WHO_Region': ['AFRO'] * 5,
+    })
+    index = DatasetIndex(df)
+    analytics = SeriesAnalytics(index, window=3)
+    np.testing.assert_allclose(analytics.measure('YoY change'), [np.nan, 2.0, np.nan, np.nan, 1.0])
+    np.testing.assert_allclose(analytics.measure('Rolling mean'), [10.0, 12.0, np.nan, 5.0, 5.5])
+    positions = index.row_positions('M', ['B'], (2002, 2002))
+    np.testing.assert_allclose(analytics.measure('Rolling mean', positions), [5.5])
+    with pytest.raises(ValueError):
+        analytics.measure('Median')
@@ -0,0 +1,135 @@
+# test_api.py
+import gzip
+import http.client
+import json
+import shutil
+import threading
+from urllib.parse import quote
+
+import pytest
+
+from api import DashboardAPI, make_server
+from data_index import DatasetIndex
+from dataset_refresh import DatasetManager
+from kpis import compute_kpis
+
+METRIC = 'Adult Obesity Rate'
+QUERY = f"metric={quote(METRIC)}&countries=Japan,Brazil&start=2004&end=2016"
+
+
+@pytest.fixture(scope='module')
+def api(tmp_path_factory):
+    raw = tmp_path_factory.mktemp('raw')
+    shutil.copy("data/raw/who_life_expectancy.csv", raw)
+    manager = DatasetManager(str(raw), str(tmp_path_factory.mktemp('processed')), refresh_interval=0)
+    return DashboardAPI(manager)
+
+
+def _get(api, target, headers=None):
+    status, response_headers, body = api.handle('GET', target, headers or {})
+    response_headers = dict(response_headers)
+    if response_headers.get('Content-Encoding') == 'gzip':
+        body = gzip.decompress(body)
+    return status, response_headers, json.loads(body) if body else None
+
+
+def test_metrics(api):
+    status, _, body = _get(api, '/metrics')
+    assert status == 200
+    index = DatasetIndex(api.manager.current.df)
+    assert [m['name'] for m in body['metrics']] == index.metrics
+    assert body['countries'] == list(index.countries)
+    assert body['version'] == api.manager.current.version
+
+
+def test_series_and_kpis_match_dashboard_filter(api):
+    index = DatasetIndex(api.manager.current.df)
+    expected = index.select(METRIC, ['Japan', 'Brazil'], (2004, 2016))
+
+    _, _, body = _get(api, f'/series?{QUERY}')
+    assert [row[:2] for row in body['rows']] == [[str(c), int(y)] for c, y in zip(expected['Country'], expected['Year'])]
+    assert [row[2] for row in body['rows']] == pytest.approx(expected['Value'].astype(float).tolist(), abs=1e-4)
+
+    _, _, body = _get(api, f'/kpis?{QUERY}')
+    kpi = compute_kpis(expected, (2004, 2016))
+    assert body['kpis']['top_country'] == kpi['top_country']
+    assert body['kpis']['average'] == pytest.approx(kpi['average'])
+
+
+def test_latest_values(api):
+    index = DatasetIndex(api.manager.current.df)
+    _, _, body = _get(api, f'/latest?metric={quote(METRIC)}&year=2015&since=2005')
+    countries, values, years = index.latest_values(METRIC, index.countries, 2015, since=2005)
+    expected = {c: (v, y) for c, v, y in zip(countries, values, years) if y >= 0}
+    assert {v['country']: (pytest.approx(v['value'], abs=1e-4), v['year']) for v in body['values']} == expected
+
+    _, _, body = _get(api, f'/latest?metric={quote(METRIC)}&year=2015&mode=interpolated')
+    assert all(v['year'] == 2015 for v in body['values'])
+
+
+def test_etag_and_gzip(api):
+    status, headers, body = _get(api, '/metrics', {'Accept-Encoding': 'gzip, deflate'})
+    assert status == 200 and headers['Content-Encoding'] == 'gzip'
+    assert _get(api, '/metrics', {'If-None-Match': headers['ETag']})[0] == 304
+    assert _get(api, '/metrics', {'If-None-Match': '"stale"'})[0] == 200
+    assert _get(api, '/metrics', {'If-None-Match': '*'})[0] == 304
+    # Failing queries are answered as errors whatever the client has cached
+    assert _get(api, '/kpis?metric=Nope', {'If-None-Match': '*'})[0] == 404
+    assert _get(api, '/kpis', {'If-None-Match': '*'})[0] == 400
+    # Same query in another parameter order: same cached response
+    _, first, _ = _get(api, f'/series?{QUERY}')
+    _, second, _ = _get(api, '/series?start=2004&end=2016&countries=Japan,Brazil&metric=' + quote(METRIC))
+    assert first['ETag'] == second['ETag']
+
+
+def test_errors(api):
+    assert _get(api, '/kpis')[0] == 400
+    assert _get(api, '/kpis?metric=Nope')[0] == 404
+    assert _get(api, f'/kpis?metric={quote(METRIC)}&start=soon')[0] == 400
+    assert _get(api, '/unknown')[0] == 404
+    assert api.handle('POST', '/metrics', {})[0] == 405
+
+
+def test_local_client(api):
+    server = make_server(api, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        conn = http.client.HTTPConnection(*server.server_address, timeout=5)
+        for _ in range(2):
+            conn.request('GET', f'/kpis?{QUERY}')
+            response = conn.getresponse()
+            assert response.status == 200
+            assert json.loads(response.read())['metric'] == METRIC
+        conn.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_local_client_bodies_and_failures(api, monkeypatch):
+    server = make_server(api, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        # The unread body is not taken for the next request: the server closes the connection
+        conn = http.client.HTTPConnection(*server.server_address, timeout=5)
+        conn.request('POST', '/metrics', body=b'GET /metrics HTTP/1.1\r\n\r\n')
+        response = conn.getresponse()
+        assert response.status == 405 and response.getheader('Connection') == 'close'
+        response.read()
+        conn.close()
+
+        def fail(*args):
+            raise RuntimeError("boom")
+
+        monkeypatch.setattr(api, 'handle', fail)
+        conn = http.client.HTTPConnection(*server.server_address, timeout=5)
+        conn.request('GET', '/metrics')
+        response = conn.getresponse()
+        assert response.status == 500
+        assert json.loads(response.read()) == {'error': 'Internal server error'}
+        conn.close()
+    finally:
+        server.shutdown()
+        server.server_close()
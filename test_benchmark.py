@@ -0,0 +1,38 @@
+# test_benchmark.py
+from benchmark import compare, run_benchmarks, scale_benchmarks, synthetic_dataset
+
+
+def test_synthetic_dataset_shape():
+    df = synthetic_dataset(6, 10, 12)
+    assert len(df) == 6 * 10 * 12
+    assert df.groupby(['Metric', 'Country']).size().eq(12).all()
+
+
+def test_small_scale_runs_every_benchmark():
+    results = run_benchmarks(['small'], repeat=1, log=lambda line: None)
+    assert {'filter', 'kpis_rollups', 'trends_figure', 'value_indexed'} <= set(results['small'])
+    for result in results['small'].values():
+        assert result['seconds'] >= 0 and result['peak_mb'] >= 0
+
+
+def test_only_builds_the_fixtures_it_needs(tmp_path):
+    benchmarks = scale_benchmarks(6, 10, 12, str(tmp_path), only=['prepare_dataset'])
+    assert list(benchmarks) == ['prepare_dataset']
+    fixtures = benchmarks['prepare_dataset'].args[0]
+    benchmarks['prepare_dataset']()
+    assert {'raw'} == set(vars(fixtures)) - {'size', 'work_dir', 'year_range'}
+
+
+def test_custom_scale():
+    results = run_benchmarks([(3, 2, 5)], repeat=1, only=['filter'], log=lambda line: None)
+    assert list(results) == ['3x2x5'] and list(results['3x2x5']) == ['filter']
+
+
+def test_compare_flags_regressions_beyond_threshold():
+    baseline = {'small': {'filter': {'seconds': 0.10, 'peak_mb': 10.0}}}
+    assert compare({'small': {'filter': {'seconds': 0.12, 'peak_mb': 10.5}}}, baseline, 0.25) == []
+    regressions = compare({'small': {'filter': {'seconds': 0.20, 'peak_mb': 20.0}}}, baseline, 0.25)
+    assert len(regressions) == 2 and regressions[0].startswith('small/filter: seconds')
+    # Tiny absolute differences are noise
+    tiny = {'small': {'filter': {'seconds': 0.001, 'peak_mb': 0.1}}}
+    assert compare({'small': {'filter': {'seconds': 0.002, 'peak_mb': 0.2}}}, tiny, 0.25) == []
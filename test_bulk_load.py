@@ -0,0 +1,56 @@
+# test_bulk_load.py
+import pandas as pd
+
+from bulk_load import bulk_load, detect_format
+from sqlite_store import open_store
+
+GHO_FILE = "vaccination.csv"
+WHO_FILE = "data/raw/who_life_expectancy.csv"
+
+
+def _count(db_path):
+    return open_store(db_path).connect().execute("SELECT COUNT(*) FROM observations").fetchone()[0]
+
+
+def test_detect_format(tmp_path):
+    assert detect_format(GHO_FILE) == 'gho'
+    assert detect_format(WHO_FILE) == 'who'
+    assert detect_format(str(tmp_path / "x.parquet")) == 'parquet'
+
+
+def test_reloading_is_idempotent(tmp_path):
+    db = str(tmp_path / "health.db")
+    assert bulk_load([GHO_FILE, WHO_FILE], db) == 144
+    assert bulk_load([GHO_FILE, WHO_FILE], db) == 144
+    assert _count(db) == 144
+
+    store = open_store(db)
+    assert 'Japan' in store.countries()
+    assert 'Life expectancy at birth (years)' in store.metrics()
+    indexes = {row[0] for row in store.connect().execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {'idx_countries_region', 'idx_observations_country_year'} <= indexes
+
+
+def test_upsert_updates_values_on_natural_key(tmp_path):
+    db = str(tmp_path / "health.db")
+    first = tmp_path / "first.parquet"
+    second = tmp_path / "second.csv"
+    pd.DataFrame({
+        'Country': ['Japan', 'Japan'], 'Year': [2000, 2001],
+        'Metric': ['LE', 'LE'], 'Value': [81.0, 81.2], 'Unit': ['years', 'years'],
+    }).to_parquet(first, index=False)
+    pd.DataFrame({
+        'Country': ['Japan', 'India'], 'Year': [2001, 2001],
+        'Metric': ['LE', 'LE'], 'Value': [81.5, 63.0],
+    }).to_csv(second, index=False)
+
+    bulk_load([str(first)], db)
+    bulk_load([str(second)], db, chunksize=1)
+
+    store = open_store(db)
+    rows = store.select('LE', ['Japan', 'India'], (2000, 2001))
+    assert rows[['Country', 'Year', 'Value']].values.tolist() == [
+        ['India', 2001, 63.0], ['Japan', 2000, 81.0], ['Japan', 2001, 81.5]
+    ]
+    # The unit from the first load survives a source that has none
+    assert rows['Unit'].tolist() == ['years'] * 3
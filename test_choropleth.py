@@ -0,0 +1,73 @@
+# test_choropleth.py
+import json
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+import choropleth
+from choropleth import MapFrames
+from data_processor import build_who_dataset
+
+WHO_FILE = "data/raw/who_life_expectancy.csv"
+
+
+def test_frames_match_groupby():
+    df = build_who_dataset(WHO_FILE)
+    maps = MapFrames(df)
+    for metric, group in df[df['Value'].notna()].groupby('Metric', observed=True):
+        years = sorted(group['Year'].unique())
+        assert maps.years(metric) == years
+        for year in years:
+            data = json.loads(maps.frame_json(metric, year))['data'][0]
+            rows = group[group['Year'] == year].sort_values('Country')
+            assert data['text'] == rows['Country'].astype(str).tolist()
+            np.testing.assert_allclose(data['z'], rows['Value'].astype(float), atol=1e-4)
+        low, high, _ = maps.ranges[metric]
+        assert (low, high) == (group['Value'].min(), group['Value'].max())
+
+
+def test_iso3_from_names_and_source_codes():
+    df = pd.DataFrame({
+        'Country': ["Côte d'Ivoire", 'occupied Palestinian territory', 'Atlantis'],
+        'ISO3': [None, 'PSE', None],
+        'Year': [2020] * 3,
+        'Metric': ['M'] * 3,
+        'Value': [1.0, 2.0, 3.0],
+        'Unit': ['%'] * 3,
+    })
+    data = json.loads(MapFrames(df).frame_json('M', 2020))['data'][0]
+    assert data['locations'] == ['CIV', 'PSE']
+
+
+def test_figure_starts_at_end_year():
+    df = pd.DataFrame({
+        'Country': ['France'] * 3 + ['Japan'] * 2,
+        'Year': [2000, 2005, 2010, 2000, 2010],
+        'Metric': ['M'] * 5,
+        'Value': [1.0, 2.0, 3.0, 4.0, np.nan],
+        'Unit': ['%'] * 5,
+    })
+    maps = MapFrames(df)
+    assert maps.initial_year('M', 2007) == 2005
+    assert maps.initial_year('M', 1990) == 2000
+    assert maps.figure_json('Other', 2010) is None
+
+    figure = json.loads(maps.figure_json('M', 2007))
+    assert figure['layout']['sliders'][0]['active'] == 1
+    assert [frame['name'] for frame in figure['frames']] == ['2000', '2005', '2010']
+    assert figure['data'][0]['locations'] == ['FRA']
+    # Colour scale fixed over all years
+    assert (figure['data'][0]['zmin'], figure['data'][0]['zmax']) == (1.0, 4.0)
+    assert len(go.Figure(figure).frames) == 3
+    assert maps.figure_json('M', 2007) == maps.figure_json('M', 2008)
+
+
+def test_skeletons_are_bounded(monkeypatch):
+    monkeypatch.setattr(choropleth, 'SKELETON_CACHE_SIZE', 2)
+    df = pd.DataFrame({'Country': ['France'] * 3, 'Year': [2000, 2005, 2010], 'Metric': ['M'] * 3,
+                       'Value': [1.0, 2.0, 3.0], 'Unit': ['%'] * 3})
+    maps = MapFrames(df)
+    for year in (2000, 2005, 2010, 2005):
+        assert json.loads(maps.figure_json('M', year))['layout']['sliders'][0]['active'] == [2000, 2005, 2010].index(year)
+    assert list(maps._skeletons) == [('M', 2010, None), ('M', 2005, None)]
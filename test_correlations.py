@@ -0,0 +1,52 @@
+# test_correlations.py
+import numpy as np
+import pandas as pd
+
+from correlations import MetricMatrix, pairwise_corr, strongest_pairs
+from data_index import DatasetIndex
+from data_processor import build_who_dataset
+
+WHO_FILE = "data/raw/who_life_expectancy.csv"
+
+
+def test_pairwise_corr_matches_pandas():
+    rng = np.random.RandomState(0)
+    values = rng.normal(size=(200, 6)) + 1e6
+    values[:, 1] += 3 * values[:, 0]
+    values[rng.uniform(size=values.shape) < 0.3] = np.nan
+    values[:, 5] = np.nan
+    values[:2, 5] = 1.0
+    corr, counts = pairwise_corr(values, min_periods=3)
+    expected = pd.DataFrame(values).corr(min_periods=3)
+    np.testing.assert_allclose(corr, expected.to_numpy(), atol=1e-9)
+    assert counts[0, 1] == (~np.isnan(values[:, 0]) & ~np.isnan(values[:, 1])).sum()
+
+
+def test_matrix_matches_pivot():
+    index = DatasetIndex(build_who_dataset(WHO_FILE))
+    matrix = MetricMatrix(index)
+    countries = ['Japan', 'Brazil', 'India', 'Germany']
+    rows = matrix.rows(countries + ['Atlantis'], (2005, 2020))
+
+    selected = index.df[index.df['Country'].isin(countries) & index.df['Year'].between(2005, 2020)]
+    wide = selected.pivot_table(index=['Country', 'Year'], columns='Metric', values='Value',
+                                observed=True, aggfunc='first').astype(np.float64)
+    assert len(rows) == len(wide)
+    corr, _ = matrix.correlations(rows)
+    expected = wide.corr(min_periods=3).reindex(index=corr.index, columns=corr.columns)
+    np.testing.assert_allclose(corr.to_numpy(), expected.to_numpy(), atol=1e-9)
+
+    x, y = 'Adult Obesity Rate', 'Smoking Prevalence'
+    pairs = matrix.pairs(rows, x, y)
+    both = wide[[x, y]].dropna()
+    assert len(pairs) == len(both)
+    np.testing.assert_allclose(pairs['x'], both[x].to_numpy())
+    assert sorted(pairs['Country'].unique()) == sorted(both.index.get_level_values(0).unique())
+
+
+def test_strongest_pairs():
+    corr = pd.DataFrame([[1.0, -0.9, 0.2, np.nan], [-0.9, 1.0, 0.1, np.nan],
+                         [0.2, 0.1, 1.0, np.nan], [np.nan] * 4],
+                        index=list('abcd'), columns=list('abcd'))
+    assert strongest_pairs(corr, 'a').index.tolist() == ['b', 'c']
+    assert strongest_pairs(corr, 'a', top=1).tolist() == [-0.9]
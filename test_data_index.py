@@ -0,0 +1,100 @@
+# test_data_index.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_index import DatasetIndex
+from data_processor import build_who_dataset, create_fallback_data
+from kpis import compute_kpis
+
+WHO_FILE = "data/raw/who_life_expectancy.csv"
+
+
+def _mask_filter(df, metric, countries, year_range):
+    return df[
+        (df['Country'].isin(countries)) &
+        (df['Year'].between(year_range[0], year_range[1])) &
+        (df['Metric'] == metric)
+    ].sort_values(['Country', 'Year'], kind='stable')
+
+
+def test_select_matches_boolean_masks():
+    df = build_who_dataset(WHO_FILE)
+    index = DatasetIndex(df)
+    cases = [
+        ('Life expectancy at birth (years)', ['Japan', 'India'], (2005, 2019)),
+        ('Adult Obesity Rate', ['Brazil', 'Afghanistan', 'Germany'], (2000, 2023)),
+        ('Smoking Prevalence', ['Germany'], (2003, 2003)),
+        ('Smoking Prevalence', ['Atlantis', 'Japan'], (1990, 2100)),
+    ]
+    for metric, countries, year_range in cases:
+        expected = _mask_filter(index.df, metric, countries, year_range)
+        result = index.select(metric, countries, year_range)
+        pd.testing.assert_frame_equal(result, expected)
+
+
+def test_unknown_or_empty_selection():
+    index = DatasetIndex(create_fallback_data())
+    assert index.select('No Such Metric', ['Japan'], (2000, 2023)).empty
+    assert index.select('Life Expectancy', [], (2000, 2023)).empty
+    assert index.select('Life Expectancy', ['Japan'], (2030, 2040)).empty
+
+
+def test_index_sorts_unsorted_input():
+    df = create_fallback_data().sample(frac=1, random_state=0)
+    index = DatasetIndex(df)
+    assert sorted(index.metrics) == ['Life Expectancy', 'Under-5 Mortality Rate']
+    assert index.countries == sorted(df['Country'].unique())
+    japan = index.df.iloc[index.series_slice('Life Expectancy', 'Japan')]
+    assert japan['Year'].tolist() == list(range(2000, 2024))
+    np.testing.assert_array_equal(index.metric_years('Under-5 Mortality Rate'), np.arange(2000, 2024))
+
+
+def _sparse_frame():
+    rng = np.random.RandomState(1)
+    rows = []
+    for country, step in [('A', 1), ('B', 2), ('C', 10), ('D', 3)]:
+        for year in range(2000, 2024, step):
+            if rng.rand() > 0.2:
+                rows.append((country, year, 'M', np.nan if rng.rand() < 0.1 else rng.uniform(0, 100)))
+    return pd.DataFrame(rows, columns=['Country', 'Year', 'Metric', 'Value']).assign(Unit='%', WHO_Region='AFRO')
+
+
+@pytest.mark.parametrize('direction', ['backward', 'forward'])
+def test_asof_positions_match_merge_asof(direction):
+    index = DatasetIndex(_sparse_frame())
+    observed = index.df[index.df['Value'].notna()]
+    observed = observed.assign(Row=observed.index, Year=observed['Year'].astype(int)).sort_values('Year')
+    for year in range(1995, 2030):
+        countries, positions = index.asof_positions('M', ['D', 'A', 'B', 'C', 'Z'], year, direction)
+        targets = pd.DataFrame({'Year': year, 'Country': countries})
+        expected = pd.merge_asof(targets, observed[['Year', 'Country', 'Row']], on='Year', by='Country',
+                                 direction=direction)
+        assert countries == ['A', 'B', 'C', 'D']
+        np.testing.assert_array_equal(positions, expected['Row'].fillna(-1).astype(int))
+
+
+def test_latest_values_interpolation_and_mean_change():
+    index = DatasetIndex(_sparse_frame())
+    observed = index.df[index.df['Value'].notna()]
+    countries, values, years = index.latest_values('M', ['A', 'B', 'C', 'D'], 2015, since=2012)
+    for country, value, year in zip(countries, values, years):
+        series = observed[(observed['Country'] == country) & observed['Year'].between(2012, 2015)]
+        if series.empty:
+            assert year == -1 and np.isnan(value)
+        else:
+            assert year == series['Year'].iloc[-1] and value == series['Value'].iloc[-1]
+
+    countries, values = index.interpolated_values('M', ['A', 'B', 'C', 'D'], 2015)
+    for country, value in zip(countries, values):
+        series = observed[observed['Country'] == country]
+        expected = np.interp(2015, series['Year'], series['Value'].astype(float), left=np.nan, right=np.nan)
+        np.testing.assert_allclose(value, expected)
+
+    for year_range in [(2000, 2023), (2003, 2011), (2021, 2023), (2030, 2040)]:
+        expected = compute_kpis(index.select('M', ['A', 'B', 'C', 'D'], year_range), year_range)
+        result = index.mean_change('M', ['A', 'B', 'C', 'D'], year_range)
+        if expected is None or np.isnan(expected['improvement']):
+            assert np.isnan(result)
+        else:
+            assert result == pytest.approx(expected['improvement'])
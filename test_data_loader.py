@@ -0,0 +1,52 @@
+# test_data_loader.py
+import pandas as pd
+
+from data_loader import load_gho_export, stream_gho_export
+
+GHO_FILE = "vaccination.csv"
+
+
+def test_chunk_size_does_not_change_output(tmp_path):
+    small = tmp_path / "small.csv"
+    large = tmp_path / "large.csv"
+    assert stream_gho_export(GHO_FILE, str(small), chunksize=7) == 126
+    assert stream_gho_export(GHO_FILE, str(large), chunksize=100_000) == 126
+    assert small.read_text(encoding='utf-8') == large.read_text(encoding='utf-8')
+
+
+def test_parquet_output_matches_in_memory_load(tmp_path):
+    out = tmp_path / "vaccination.parquet"
+    stream_gho_export(GHO_FILE, str(out), chunksize=20)
+    written = pd.read_parquet(out)
+    loaded = load_gho_export(GHO_FILE, chunksize=20)
+
+    assert list(written.columns) == list(loaded.columns)
+    assert written['Value'].tolist() == loaded['Value'].astype(float).tolist()
+    assert written['Country'].astype(str).tolist() == loaded['Country'].astype(str).tolist()
+
+    mexico = loaded[loaded['ISO3'] == 'MEX'].iloc[0]
+    assert mexico['Country'] == 'Mexico'
+    assert mexico['Year'] == 2020
+    assert mexico['WHO_Region'] == 'AMRO'
+    assert mexico['Unit'] == '%'
+    assert mexico['Metric'] == 'Proportion of vaccination cards seen (%)'
+
+
+def test_aggregates_dimensions_and_ranges(tmp_path):
+    source = tmp_path / "gho.csv"
+    pd.DataFrame({
+        'IndicatorCode': ['X', 'X', 'X', 'X'],
+        'Indicator': ['Obesity (%)'] * 4,
+        'ParentLocationCode': ['EUR', 'EUR', 'EUR', None],
+        'Location type': ['Country', 'Country', 'Country', 'WHO region'],
+        'SpatialDimValueCode': ['DEU', 'DEU', 'DEU', 'EUR'],
+        'Location': ['Germany', 'Germany', 'Germany', 'Europe'],
+        'Period': ['2016', '2016', '2015-2016', '2016'],
+        'Dim1': ['Male', 'Female', 'Male', None],
+        'FactValueNumeric': [22.1, 20.4, 21.0, 21.3],
+        'Language': ['EN'] * 4,
+    }).to_csv(source, index=False)
+
+    df = load_gho_export(str(source))
+    assert df['Metric'].astype(str).tolist() == ['Obesity (%) - Male', 'Obesity (%) - Female']
+    assert df['Country'].astype(str).unique().tolist() == ['Germany']
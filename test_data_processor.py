@@ -0,0 +1,133 @@
+# test_data_processor.py
+import numpy as np
+import pandas as pd
+
+from data_processor import (
+    compact_dtypes,
+    create_fallback_data,
+    create_other_metrics,
+    get_development_level,
+    get_who_region,
+    memory_report,
+)
+from dimensions import country_dimension
+
+WHO_COUNTRIES = ['Afghanistan', 'Japan', 'United States of America', 'Germany', 'Brazil', 'India']
+
+
+def _loop_create_other_metrics(countries):
+    """The original per-row implementation, kept as the reference output"""
+    np.random.seed(42)
+    metrics_config = {
+        'Life Expectancy': {'unit': 'years', 'range': (50, 85), 'trend': 0.15},
+        'Under-5 Mortality Rate': {'unit': 'per 1000', 'range': (2, 150), 'trend': -0.8},
+        'Maternal Mortality Ratio': {'unit': 'per 100000', 'range': (5, 500), 'trend': -2.5},
+        'Vaccination Coverage (DTP3)': {'unit': '%', 'range': (40, 99), 'trend': 0.3},
+        'Hospital Beds per 1000': {'unit': 'beds', 'range': (0.5, 15), 'trend': 0.05},
+        'Physicians per 10000': {'unit': 'doctors', 'range': (1, 40), 'trend': 0.2},
+        'Health Expenditure (% of GDP)': {'unit': '%', 'range': (2, 12), 'trend': 0.1},
+        'Adult Obesity Rate': {'unit': '%', 'range': (5, 40), 'trend': 0.1},
+        'Smoking Prevalence': {'unit': '%', 'range': (10, 50), 'trend': -0.2},
+        'Access to Clean Water': {'unit': '%', 'range': (50, 100), 'trend': 0.25}
+    }
+    records = []
+    for country in countries:
+        dev_level = get_development_level(country)
+        for metric_name, config in metrics_config.items():
+            if metric_name == 'Life Expectancy':
+                continue
+            level_multiplier = {
+                'High': 0.9, 'Upper-Middle': 0.7, 'Lower-Middle': 0.5, 'Low': 0.3
+            }.get(dev_level, 0.5)
+            min_val, max_val = config['range']
+            base_value = min_val + (max_val - min_val) * level_multiplier
+            for year in range(2000, 2024, 2):
+                trend_value = config['trend'] * (year - 2000)
+                random_factor = np.random.normal(0, max_val * 0.02)
+                value = base_value + trend_value + random_factor
+                value = max(min_val * 0.8, min(max_val * 1.1, value))
+                records.append({
+                    'Country': country,
+                    'Year': year,
+                    'Metric': metric_name,
+                    'Value': round(value, 2),
+                    'Unit': config['unit'],
+                    'WHO_Region': get_who_region(country),
+                    'Development_Level': dev_level,
+                    'Data_Quality': 'High' if dev_level in ['High', 'Upper-Middle'] else 'Medium'
+                })
+    return pd.DataFrame(records)
+
+
+def _loop_create_fallback_data():
+    """The original per-row fallback generator, kept as the reference output"""
+    np.random.seed(42)
+    data = []
+    for country in ['United States', 'Japan', 'Germany', 'Brazil', 'India', 'China']:
+        base_life = np.random.uniform(70, 85)
+        base_mortality = np.random.uniform(5, 50)
+        for year in range(2000, 2024):
+            year_factor = (year - 2000) * 0.15
+            life_value = base_life + year_factor + np.random.normal(0, 0.5)
+            life_value = max(65, min(90, life_value))
+            mortality_value = base_mortality - year_factor * 0.3 + np.random.normal(0, 1)
+            mortality_value = max(2, min(100, mortality_value))
+            common = {'Country': country, 'Year': year, 'WHO_Region': 'Global',
+                      'Development_Level': 'Mixed', 'Data_Quality': 'Synthetic'}
+            data.extend([
+                {**common, 'Metric': 'Life Expectancy', 'Value': round(life_value, 1), 'Unit': 'years'},
+                {**common, 'Metric': 'Under-5 Mortality Rate', 'Value': round(mortality_value, 1), 'Unit': 'per 1000'},
+            ])
+    return pd.DataFrame(data)
+
+
+def test_create_other_metrics_matches_loop_output():
+    expected = _loop_create_other_metrics(WHO_COUNTRIES)
+    result = create_other_metrics(np.array(WHO_COUNTRIES, dtype=object))
+    pd.testing.assert_frame_equal(result[expected.columns], expected, check_exact=True)
+    # Every synthetic row carries the surrogate key of its member state
+    keys = country_dimension().keys(WHO_COUNTRIES)
+    assert (keys >= 0).all()
+    assert result['Country_Key'].dtype == np.int16
+    assert result.groupby('Country')['Country_Key'].first()[WHO_COUNTRIES].tolist() == keys.tolist()
+
+
+def test_create_fallback_data_matches_loop_output():
+    expected = _loop_create_fallback_data()
+    result = create_fallback_data()
+    pd.testing.assert_frame_equal(result[expected.columns], expected, check_exact=True)
+
+
+def test_generators_do_not_touch_global_random_state():
+    np.random.seed(7)
+    before = np.random.random()
+    np.random.seed(7)
+    create_other_metrics(WHO_COUNTRIES)
+    create_fallback_data()
+    assert np.random.random() == before
+
+
+def test_compact_dtypes_preserves_values():
+    df = create_fallback_data()
+    compact = compact_dtypes(df)
+    assert compact['Year'].dtype == np.int16
+    assert compact['Value'].dtype == np.float32
+    assert isinstance(compact['WHO_Region'].dtype, pd.CategoricalDtype)
+    assert list(compact['Data_Quality'].cat.categories) == ['High', 'Medium', 'Synthetic']
+    np.testing.assert_array_equal(np.round(compact['Value'].astype(float), 1), df['Value'])
+    pd.testing.assert_series_equal(compact['Country'].astype(object), df['Country'])
+
+    report = memory_report(compact)
+    total = report.iloc[-1]
+    assert total['After (bytes)'] < total['Before (bytes)']
+
+
+def test_compact_dtypes_keeps_float64_when_precision_would_be_lost():
+    df = pd.DataFrame({'Value': [1234567.89, 1.5]})
+    assert compact_dtypes(df)['Value'].dtype == np.float64
+
+
+def test_compacted_frames_concatenate_as_categories():
+    a = compact_dtypes(create_fallback_data().iloc[:10])
+    b = compact_dtypes(create_fallback_data().iloc[10:20])
+    assert isinstance(pd.concat([a, b])['Unit'].dtype, pd.CategoricalDtype)
@@ -0,0 +1,63 @@
+# test_data_table.py
+import numpy as np
+import pandas as pd
+
+from data_table import page_order, table_page
+
+
+def _frame():
+    rng = np.random.RandomState(1)
+    countries = ['Japan', 'India', 'Brazil', 'Germany', 'Nigeria']
+    df = pd.DataFrame({
+        'Country': pd.Categorical(np.repeat(countries, 30), categories=countries),
+        'Year': np.tile(np.arange(1990, 2020), 5).astype(np.int16),
+        'Metric': 'Life expectancy',
+        'Value': rng.normal(70, 5, 150).round(0).astype(np.float32),
+        'Unit': 'years',
+        'WHO_Region': pd.Categorical(np.repeat(['WPRO', 'SEARO', 'AMRO', 'EURO', 'AFRO'], 30)),
+    })
+    df.loc[[3, 77], 'Value'] = np.nan
+    return df
+
+
+def test_pages_match_a_full_stable_sort():
+    df = _frame()
+    for column in ['Value', 'Country', 'Year']:
+        for ascending in [True, False]:
+            # Missing values go last in both directions, ties keep the row order
+            expected = df.sort_values(column, ascending=ascending, kind='stable', na_position='last',
+                                      key=lambda s: s.astype(str) if s.name == 'Country' else s)
+            pages = [table_page(df, page, 20, column, ascending)[0] for page in range(1, 9)]
+            pd.testing.assert_frame_equal(pd.concat(pages), expected)
+
+
+def test_default_order_and_page_size():
+    df = _frame()
+    rows, total = table_page(df, page=2, page_size=20)
+    assert total == 150
+    pd.testing.assert_frame_equal(rows, df.iloc[20:40])
+
+    rows, _ = table_page(df, page=1, page_size=20, ascending=False)
+    pd.testing.assert_frame_equal(rows, df.iloc[::-1].iloc[:20])
+
+    # A page past the end shows the last page
+    rows, _ = table_page(df, page=99, page_size=20)
+    pd.testing.assert_frame_equal(rows, df.iloc[140:])
+
+
+def test_search_is_case_insensitive_across_columns():
+    df = _frame()
+    rows, total = table_page(df, page_size=100, search='euro')
+    assert total == 30 and set(rows['Country']) == {'Germany'}
+
+    _, total = table_page(df, search='1995')
+    assert total == 5
+
+    rows, total = table_page(df, search='no such text')
+    assert total == 0 and rows.empty
+
+
+def test_page_order_breaks_ties_on_position():
+    key = np.array([2.0, 1.0, 2.0, 1.0, np.nan, 2.0])
+    assert page_order(key, 0, 3).tolist() == [1, 3, 0]
+    assert page_order(key, 0, 6, ascending=False).tolist() == [0, 2, 5, 1, 3, 4]
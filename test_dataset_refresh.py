@@ -0,0 +1,157 @@
+# test_dataset_refresh.py
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+import dataset_refresh
+from analytics import MEASURES, SeriesAnalytics
+from data_index import DatasetIndex
+from dataset_refresh import DatasetManager, discover_sources, publish_analytics, publish_dataset
+
+WHO_FILE = "data/raw/who_life_expectancy.csv"
+GHO_FILE = "vaccination.csv"
+
+
+def _raw_dir(tmp_path):
+    raw = tmp_path / "raw"
+    raw.mkdir()
+    shutil.copy(WHO_FILE, raw / "who_life_expectancy.csv")
+    shutil.copy(GHO_FILE, raw / "vaccination.csv")
+    pd.DataFrame({'Country': ['X'], 'Year': [2000]}).to_csv(raw / "notes.csv", index=False)
+    return raw
+
+
+def _manager(tmp_path, raw):
+    return DatasetManager(str(raw), str(tmp_path / "processed"), refresh_interval=0)
+
+
+def test_discovers_who_file_and_gho_exports(tmp_path):
+    raw = _raw_dir(tmp_path)
+    assert sorted(discover_sources(str(raw))) == ['gho:vaccination.csv', 'who']
+
+
+def test_only_changed_partition_is_reingested(tmp_path):
+    raw = _raw_dir(tmp_path)
+    manager = _manager(tmp_path, raw)
+    first = manager.current
+    who_frame = manager._partitions['who'].frame
+    assert len(first.df) == sum(first.partition_rows.values())
+    assert 'Mexico' in set(first.df['Country'].astype(str))
+
+    # Touching a file without changing it keeps the current dataset
+    os.utime(raw / "vaccination.csv", ns=(1, 1))
+    assert manager.refresh() == []
+    assert manager.current is first
+
+    gho = pd.read_csv(raw / "vaccination.csv")
+    gho.loc[gho['SpatialDimValueCode'] == 'MEX', 'FactValueNumeric'] = 1.5
+    gho.to_csv(raw / "vaccination.csv", index=False)
+
+    assert manager.refresh() == ['gho:vaccination.csv']
+    assert manager._partitions['who'].frame is who_frame
+    second = manager.current
+    assert second.version != first.version
+    mexico = second.df[second.df['Country'] == 'Mexico']
+    assert (mexico['Value'] == 1.5).all()
+    # The previous version is left intact for runs still holding it
+    assert not (first.df.loc[first.df['Country'] == 'Mexico', 'Value'] == 1.5).any()
+
+
+def test_removed_source_and_restart_from_snapshots(tmp_path):
+    raw = _raw_dir(tmp_path)
+    manager = _manager(tmp_path, raw)
+    full_version = manager.current.version
+
+    os.remove(raw / "vaccination.csv")
+    assert manager.refresh() == ['gho:vaccination.csv']
+    assert list(manager.current.partition_rows) == ['who']
+
+    restarted = _manager(tmp_path, raw)
+    assert restarted.current.loaded_from_snapshot == {'who': True}
+    assert restarted.current.version == manager.current.version != full_version
+
+
+def test_falls_back_without_sources(tmp_path):
+    raw = tmp_path / "raw"
+    raw.mkdir()
+    dataset = _manager(tmp_path, raw).current
+    assert dataset.version == 'fallback'
+    assert len(dataset.df) > 0
+
+
+def test_replicas_share_the_published_dataset(tmp_path):
+    raw = _raw_dir(tmp_path)
+    first = _manager(tmp_path, raw).current
+    second = _manager(tmp_path, raw).current
+
+    assert first.shared_path is not None and first.shared_path == second.shared_path
+    assert first.shared_path.endswith(f"dataset-{first.version[:16]}.arrow")
+    assert not second.df['Value'].to_numpy().flags.writeable
+    pd.testing.assert_frame_equal(first.df, second.df)
+
+
+def test_load_errors_are_reported_when_nothing_else_changed(tmp_path, monkeypatch):
+    raw = _raw_dir(tmp_path)
+    manager = _manager(tmp_path, raw)
+    first = manager.current
+    load_partition = manager._load_partition
+
+    def failing(name, path):
+        if name == 'gho:vaccination.csv':
+            raise ValueError("unreadable export")
+        return load_partition(name, path)
+
+    monkeypatch.setattr(manager, '_load_partition', failing)
+    os.utime(raw / "vaccination.csv", ns=(1, 1))
+    assert manager.refresh() == []
+    assert manager.current.errors == {'gho:vaccination.csv': 'unreadable export'}
+    # Same data, still served from the partitions loaded before
+    assert manager.current.version == first.version and manager.current.df is first.df
+
+    monkeypatch.setattr(manager, '_load_partition', load_partition)
+    os.utime(raw / "vaccination.csv", ns=(2, 2))
+    assert manager.refresh() == []
+    assert manager.current.errors == {}
+
+
+def test_published_file_removed_after_the_check_is_republished(tmp_path, monkeypatch):
+    df = pd.DataFrame({'Country': ['Japan'], 'Year': [2000], 'Value': [81.0]})
+    publish_dataset(lambda: df, 'abc123', str(tmp_path))
+    read_arrow, reads = dataset_refresh.read_arrow, []
+
+    def pruned_once(path):
+        # The file is seen by the existence check, then pruned by another process before it is read
+        reads.append(path)
+        if len(reads) == 1:
+            os.remove(path)
+        return read_arrow(path)
+
+    monkeypatch.setattr(dataset_refresh, 'read_arrow', pruned_once)
+    published, path = publish_dataset(lambda: df, 'abc123', str(tmp_path))
+    assert len(reads) == 2
+    assert path is not None and os.path.basename(path) == 'dataset-abc123.arrow'
+    pd.testing.assert_frame_equal(published, df)
+
+
+def test_analytics_are_computed_once_per_version(tmp_path):
+    raw = _raw_dir(tmp_path)
+    dataset = _manager(tmp_path, raw).current
+    index = DatasetIndex(dataset.df)
+    directory = str(tmp_path / "processed")
+
+    first = publish_analytics(index, dataset.version, directory)
+    assert len(list((tmp_path / "processed").glob("analytics-*.arrow"))) == 1
+    # Another process maps the published measures instead of computing them
+    second = publish_analytics(DatasetIndex(dataset.df), dataset.version, directory)
+    expected = SeriesAnalytics(index)
+    for measure in MEASURES:
+        assert not second.dense(measure).flags.writeable
+        np.testing.assert_array_equal(second.measure(measure), expected.measure(measure))
+        np.testing.assert_array_equal(first.measure(measure), expected.measure(measure))
+
+    # A file that does not fit the index is computed again
+    small = DatasetIndex(dataset.df[dataset.df['Country'] == 'Japan'])
+    rebuilt = publish_analytics(small, dataset.version, directory)
+    np.testing.assert_array_equal(rebuilt.measure('Trend slope'), SeriesAnalytics(small).measure('Trend slope'))
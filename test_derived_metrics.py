@@ -0,0 +1,54 @@
+# test_derived_metrics.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_processor import create_fallback_data
+from derived_metrics import add_derived_columns, derived_values
+
+
+def _frame():
+    return pd.DataFrame({
+        'Country': ['Japan', 'Japan', 'Japan', 'India', 'India', 'India'],
+        'Metric': ['LE'] * 6,
+        'Year': [2000, 2010, 2019, 2000, 2010, 2019],
+        'Value': [80.0, 84.0, 88.0, 60.0, 66.0, 72.0],
+    })
+
+
+def test_indexed_matches_groupby_transform():
+    df = create_fallback_data()
+    expected = df.groupby(['Country', 'Metric'])['Value'].transform(
+        lambda x: (x / x.iloc[0] * 100) if len(x) > 0 and x.iloc[0] != 0 else 100
+    )
+    np.testing.assert_allclose(df['Value_Indexed'], expected, rtol=0, atol=1e-12)
+
+
+def test_row_order_does_not_matter():
+    df = _frame()
+    shuffled = df.sample(frac=1, random_state=3)
+    result = add_derived_columns(shuffled).sort_index()
+    expected = add_derived_columns(df)
+    pd.testing.assert_frame_equal(result, expected)
+    assert result.loc[0, 'Value_Indexed'] == 100.0
+    assert result.loc[2, 'Value_Indexed'] == pytest.approx(110.0)
+
+
+def test_base_year_and_change():
+    derived = derived_values(_frame(), base_year=2010)
+    np.testing.assert_allclose(derived['Value_Indexed'], [80 / 84 * 100, 100, 88 / 84 * 100, 60 / 66 * 100, 100, 72 / 66 * 100])
+    np.testing.assert_array_equal(derived['Value_Change'], [np.nan, 4.0, 4.0, np.nan, 6.0, 6.0])
+
+    missing = derived_values(_frame(), base_year=2005)
+    assert np.isnan(missing['Value_Indexed']).all()
+
+
+def test_metric_normalisation():
+    df = pd.concat([_frame(), _frame().assign(Metric='Flat', Value=5.0)], ignore_index=True)
+    derived = derived_values(df)
+    le = slice(0, 6)
+    values = df['Value'].to_numpy()[le]
+    np.testing.assert_allclose(derived['Value_ZScore'][le], (values - values.mean()) / values.std())
+    np.testing.assert_allclose(derived['Value_MinMax'][le], (values - 60) / 28)
+    assert (derived['Value_ZScore'][6:] == 0).all()
+    assert (derived['Value_MinMax'][6:] == 0).all()
@@ -0,0 +1,71 @@
+# test_dimensions.py
+import numpy as np
+import pandas as pd
+
+from data_index import DatasetIndex
+from data_loader import load_gho_export
+from data_processor import build_who_dataset
+from dimensions import LEVELS, NO_COUNTRY, REGIONS, attach_dimensions, country_dimension
+
+WHO_FILE = "data/raw/who_life_expectancy.csv"
+
+
+def test_reference_table_covers_every_member_state():
+    dimension = country_dimension()
+    assert len(dimension) == 194
+    counts = np.bincount(dimension.region_keys, minlength=len(REGIONS))
+    assert dict(zip(REGIONS, counts.tolist())) == {
+        'AFRO': 47, 'AMRO': 35, 'EMRO': 21, 'EURO': 53, 'SEARO': 10, 'WPRO': 28, 'Global': 0,
+    }
+    assert (dimension.population > 0).all()
+
+
+def test_lookup_by_name_alias_and_iso3():
+    dimension = country_dimension()
+    names = pd.Series(['Japan', 'united states', 'Viet Nam', 'Vietnam', 'Atlantis', None, 'Japan'])
+    keys = dimension.keys(names)
+    assert keys[0] == keys[6] == dimension.keys(['JPN'])[0]
+    assert dimension.iso3_of(keys).tolist() == ['JPN', 'USA', 'VNM', 'VNM', None, None, 'JPN']
+    np.testing.assert_array_equal(dimension.keys(names.astype('category')), keys)
+
+    # A known ISO3 code wins over the name
+    assert dimension.lookup(['Somewhere'], ['DEU']).tolist() == dimension.keys(['Germany']).tolist()
+
+    regions = np.array(REGIONS)[dimension.region_codes(keys)]
+    levels = np.array(LEVELS)[dimension.level_codes(keys)]
+    assert regions.tolist() == ['WPRO', 'AMRO', 'WPRO', 'WPRO', 'Global', 'Global', 'WPRO']
+    assert levels[:3].tolist() == ['High', 'High', 'Lower-Middle']
+    assert levels[4] == 'Mixed'
+
+
+def test_attach_dimensions_returns_keyed_categoricals():
+    df = attach_dimensions(pd.DataFrame({'Country': ['India', 'Narnia'], 'ISO3': ['IND', None]}))
+    assert list(df['WHO_Region'].cat.categories) == REGIONS
+    assert df['WHO_Region'].tolist() == ['SEARO', 'Global']
+    assert df['Development_Level'].tolist() == ['Lower-Middle', 'Mixed']
+    assert df['Country_Key'].dtype == np.int16
+    assert country_dimension().iso3[df['Country_Key'].iloc[0]] == 'IND'
+    assert df['Country_Key'].iloc[1] == NO_COUNTRY
+
+
+def test_gho_locations_outside_the_member_states_keep_their_parent_region():
+    df = load_gho_export("vaccination.csv").drop_duplicates('ISO3')
+    by_iso3 = df.set_index(df['ISO3'].astype(str))
+    assert by_iso3.loc['MEX', 'Development_Level'] == 'Upper-Middle'
+    assert by_iso3.loc['PSE', 'WHO_Region'] == 'EMRO'
+    assert by_iso3.loc['PSE', 'Development_Level'] == 'Mixed'
+    assert by_iso3.loc['XKX', 'WHO_Region'] == 'Global'
+    assert by_iso3.loc['XKX', 'Country_Key'] == NO_COUNTRY
+    assert country_dimension().iso3[by_iso3.loc['MEX', 'Country_Key']] == 'MEX'
+
+
+def test_region_filter_matches_string_comparison():
+    index = DatasetIndex(build_who_dataset(WHO_FILE))
+    assert index.regions == ['AMRO', 'EMRO', 'EURO', 'SEARO', 'WPRO']
+    assert index.countries_in_region('AMRO') == ['Brazil', 'United States of America']
+    metric = index.metrics[0]
+    for region in index.regions + ['Atlantis']:
+        result = index.select(metric, index.countries, (2000, 2023), region)
+        expected = index.select(metric, index.countries, (2000, 2023))
+        expected = expected[expected['WHO_Region'].astype(str) == region]
+        pd.testing.assert_frame_equal(result, expected)
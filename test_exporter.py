@@ -0,0 +1,97 @@
+# test_exporter.py
+import os
+import time
+import zipfile
+
+import pandas as pd
+import pytest
+
+import exporter
+from data_index import DatasetIndex
+from data_processor import build_who_dataset
+from exporter import export_file, file_name, index_chunks, prune_exports, sql_chunks
+from sqlite_store import SELECT_COLUMNS, open_store
+
+WHO_FILE = "data/raw/who_life_expectancy.csv"
+METRIC = 'Life expectancy at birth (years)'
+SELECTION = (['Japan', 'India', 'Brazil'], (2000, 2019), 'All')
+
+
+@pytest.fixture(scope='module')
+def dataset(tmp_path_factory):
+    df = build_who_dataset(WHO_FILE)
+    store = open_store(str(tmp_path_factory.mktemp('db') / 'health.db'))
+    store.write_dataset(df, 'v1')
+    return DatasetIndex(df), store
+
+
+def _read(path):
+    return pd.read_parquet(path) if path.endswith('.parquet') else pd.read_csv(path)
+
+
+def _as_plain(df):
+    return df[SELECT_COLUMNS].astype({'Country': str, 'Metric': str, 'Unit': str, 'WHO_Region': str,
+                                      'Year': 'int64', 'Value': 'float64'}).reset_index(drop=True)
+
+
+@pytest.mark.parametrize('fmt', ['CSV', 'Parquet'])
+def test_exports_match_selection(dataset, tmp_path, fmt):
+    index, store = dataset
+    expected = _as_plain(index.select(METRIC, *SELECTION))
+    for chunks in (index_chunks(index, METRIC, *SELECTION, chunk_rows=7),
+                   sql_chunks(store, METRIC, *SELECTION, chunk_rows=7)):
+        path, result = export_file(chunks, fmt, 'test', export_dir=str(tmp_path))
+        assert result['rows'] == len(expected)
+        assert result['bytes'] == os.path.getsize(path)
+        pd.testing.assert_frame_equal(_as_plain(_read(path)), expected, rtol=1e-6)
+
+
+def test_whole_metric_in_chunks(dataset):
+    index, store = dataset
+    rows = index.df.iloc[index.metric_slice(METRIC)]
+    chunks = list(index_chunks(index, METRIC, chunk_rows=1000))
+    assert [len(chunk) for chunk in chunks[:-1]] == [1000] * (len(chunks) - 1)
+    assert sum(len(chunk) for chunk in chunks) == len(rows)
+    assert sum(len(chunk) for chunk in sql_chunks(store, METRIC, chunk_rows=1000)) == len(rows)
+
+
+def test_empty_export_has_header(tmp_path):
+    path, result = export_file(iter([]), 'CSV', 'empty', export_dir=str(tmp_path))
+    assert result['rows'] == 0
+    assert list(pd.read_csv(path).columns) == SELECT_COLUMNS
+
+
+def test_stale_exports_are_pruned(tmp_path):
+    stale = tmp_path / 'dashboard-export-old.csv'
+    fresh = tmp_path / 'dashboard-export-new.csv'
+    other = tmp_path / 'report-old.csv'
+    for path in (stale, fresh, other):
+        path.write_text('x')
+    old = time.time() - 7200
+    os.utime(stale, (old, old))
+    os.utime(other, (old, old))
+    assert prune_exports('dashboard-export', str(tmp_path), max_age=3600) == 1
+    assert not stale.exists() and fresh.exists() and other.exists()
+
+
+def test_xlsx_export(dataset, tmp_path, monkeypatch):
+    pytest.importorskip('xlsxwriter')
+    index, _ = dataset
+    path, result = export_file(index_chunks(index, METRIC, *SELECTION), 'Excel', 'test', export_dir=str(tmp_path))
+    assert result['rows'] == len(index.select(METRIC, *SELECTION))
+    assert path.endswith('.xlsx')
+
+    # Sheets fill up in the middle of a chunk
+    monkeypatch.setattr(exporter, 'XLSX_MAX_ROWS', 25)
+    rows = len(index.df.iloc[index.metric_slice(METRIC)])
+    path, result = export_file(index_chunks(index, METRIC, chunk_rows=10), 'Excel', 'test', export_dir=str(tmp_path))
+    assert result['rows'] == rows
+    with zipfile.ZipFile(path) as xlsx:
+        sheets = [xlsx.read(f'xl/worksheets/sheet{n}.xml').decode() for n in range(1, -(-rows // 25) + 1)]
+        assert f'xl/worksheets/sheet{len(sheets) + 1}.xml' not in xlsx.namelist()
+    assert [sheet.count('<row ') - 1 for sheet in sheets] == [25] * (len(sheets) - 1) + [rows - 25 * (len(sheets) - 1)]
+
+
+def test_file_name():
+    assert file_name('Health Expenditure (% of GDP)', 'Parquet') == 'health_expenditure_of_gdp.parquet'
+    assert file_name('Adult Obesity Rate', 'CSV', (2000, 2010)) == 'adult_obesity_rate_2000-2010.csv'
@@ -0,0 +1,62 @@
+# test_generate_dataset.py
+import pandas as pd
+
+from bulk_load import iter_source_chunks
+from dimensions import LEVELS, REGIONS, country_dimension
+from generate_dataset import generate_chunks, generate_dataset, planned_rows
+from sqlite_store import open_store
+
+
+def _collect(*args, **kwargs):
+    """All chunks as one frame; chunk vocabularies differ, so compare text as str"""
+    df = pd.concat(generate_chunks(*args, **kwargs), ignore_index=True)
+    return df.astype({c: str for c in df.columns if c not in ('Year', 'Value')})
+
+
+def test_output_does_not_depend_on_chunk_size():
+    small = _collect(5, 12, 8, subnational=2, missing=0.2, chunk_rows=50)
+    large = _collect(5, 12, 8, subnational=2, missing=0.2, chunk_rows=10**6)
+    pd.testing.assert_frame_equal(small, large)
+
+    other_seed = _collect(5, 12, 8, subnational=2, missing=0.2, seed=1)
+    assert not other_seed['Value'].equals(small['Value'].iloc[:len(other_seed)])
+
+
+def test_shape_subnational_areas_and_missingness():
+    chunks = list(generate_chunks(20, 15, 10, subnational=3, missing=0.25, chunk_rows=1000))
+    assert all(len(chunk) < 1000 + 15 * 10 for chunk in chunks)
+    df = pd.concat(chunks, ignore_index=True).astype({'Country': str, 'Metric': str})
+
+    planned = planned_rows(20, 15, 10, subnational=3)
+    assert 0.7 < len(df) / planned < 0.8
+    assert df['Country'].nunique() == 20 * 4
+    assert df['Metric'].nunique() == 15
+    assert df['Year'].min() == 2014 and df['Year'].max() == 2023
+    assert 'Country 0001 - Area 03' in set(df['Country'])
+    assert df.duplicated(['Country', 'Metric', 'Year']).sum() == 0
+
+
+def test_synthetic_countries_never_take_a_member_state_code():
+    df = pd.concat(generate_chunks(300, 2, 2), ignore_index=True)
+    codes = set(df['ISO3'].astype(str))
+    assert len(codes) == 300 and all(code.startswith('X') for code in codes)
+    assert not codes & set(country_dimension().iso3) and 'XKX' not in codes
+    assert (df['Country_Key'] == -1).all()
+    assert set(df['WHO_Region'].astype(str)) == set(REGIONS) - {'Global'}
+    assert set(df['Development_Level'].astype(str)) == set(LEVELS) - {'Mixed'}
+
+
+def test_writes_csv_parquet_and_sqlite(tmp_path):
+    expected = planned_rows(4, 3, 5, subnational=1)
+    for name in ['gen.csv', 'gen.parquet']:
+        path = str(tmp_path / name)
+        assert generate_dataset(path, 4, 3, 5, subnational=1, chunk_rows=7) == expected
+        assert sum(len(chunk) for chunk in iter_source_chunks(path)) == expected
+
+    db = str(tmp_path / "gen.db")
+    assert generate_dataset(db, 4, 3, 5, subnational=1, chunk_rows=7) == expected
+    # Loading the same dataset again upserts onto the same rows
+    generate_dataset(db, 4, 3, 5, subnational=1, chunk_rows=7)
+    store = open_store(db)
+    assert store.connect().execute("SELECT COUNT(*) FROM observations").fetchone()[0] == expected
+    assert len(store.countries()) == 8
@@ -0,0 +1,64 @@
+# test_instrumentation.py
+import json
+
+from instrumentation import RunTimer, StageHistograms, configure_json_log, log_run, logger, write_prometheus
+
+
+def test_percentiles_per_stage():
+    histograms = StageHistograms()
+    for ms in range(1, 101):
+        histograms.observe('filter', ms / 1000)
+    histograms.observe('kpis', 0.002)
+
+    rows = {row['Stage']: row for row in histograms.summary()}
+    assert rows['filter']['Count'] == 100
+    assert abs(rows['filter']['p50 (ms)'] - 50.5) < 1e-6
+    assert abs(rows['filter']['p99 (ms)'] - 99.01) < 1e-6
+    assert rows['kpis']['p95 (ms)'] == 2.0
+
+
+def test_run_timer_records_into_session_and_process():
+    process, session = StageHistograms(), StageHistograms()
+    timer = RunTimer(process, session, session='abc')
+    with timer.stage('filter'):
+        pass
+    with timer.stage('table'):
+        pass
+    timer.add('table', 0.5)
+    assert process.summary() == []
+    record = timer.finish()
+
+    assert record['session'] == 'abc'
+    assert list(record['stages']) == ['filter', 'table', 'total']
+    assert record['stages']['table'] >= 500
+    for histograms in (process, session):
+        rows = {row['Stage']: row for row in histograms.summary()}
+        assert set(rows) == {'filter', 'table', 'total'}
+        assert rows['table']['Count'] == 1
+
+
+def test_prometheus_text_and_json_log(tmp_path):
+    histograms = StageHistograms()
+    histograms.observe('filter', 0.003)
+    histograms.observe('filter', 0.2)
+    path = tmp_path / "metrics.prom"
+    write_prometheus(histograms, str(path))
+
+    text = path.read_text(encoding='utf-8')
+    assert '# TYPE dashboard_stage_seconds histogram' in text
+    assert 'dashboard_stage_seconds_bucket{stage="filter",le="0.005"} 1' in text
+    assert 'dashboard_stage_seconds_bucket{stage="filter",le="0.25"} 2' in text
+    assert 'dashboard_stage_seconds_bucket{stage="filter",le="+Inf"} 2' in text
+    assert 'dashboard_stage_seconds_count{stage="filter"} 2' in text
+
+    log = tmp_path / "timings.jsonl"
+    configure_json_log(str(log))
+    try:
+        log_run({'session': 'abc', 'stages': {'filter': 1.5}})
+        log_run({'session': 'abc', 'stages': {'filter': 2.5}})
+    finally:
+        for handler in list(logger.handlers):
+            handler.close()
+            logger.removeHandler(handler)
+    lines = log.read_text(encoding='utf-8').splitlines()
+    assert [json.loads(line)['stages']['filter'] for line in lines] == [1.5, 2.5]
@@ -0,0 +1,50 @@
+# test_rollups.py
+import math
+
+import numpy as np
+import pytest
+
+from data_index import DatasetIndex
+from data_processor import build_who_dataset
+from kpis import compute_kpis
+from rollups import Rollups
+
+WHO_FILE = "data/raw/who_life_expectancy.csv"
+
+
+def _assert_same(result, expected):
+    assert result['average'] == pytest.approx(expected['average'], rel=1e-6)
+    assert result['top_country'] == expected['top_country']
+    assert result['unit'] == expected['unit']
+    if math.isnan(expected['improvement']):
+        assert math.isnan(result['improvement'])
+    else:
+        assert result['improvement'] == pytest.approx(expected['improvement'], rel=1e-5, abs=1e-6)
+
+
+def test_rollup_kpis_match_filtered_rows():
+    index = DatasetIndex(build_who_dataset(WHO_FILE))
+    rollups = Rollups(index.df)
+    rng = np.random.RandomState(0)
+    answered = 0
+    for _ in range(300):
+        metric = index.metrics[rng.randint(len(index.metrics))]
+        countries = list(rng.choice(index.countries, rng.randint(1, len(index.countries) + 1), replace=False))
+        y0 = rng.randint(1995, 2024)
+        year_range = (y0, rng.randint(y0, 2026))
+        result = rollups.kpis(metric, countries, year_range)
+        if result is None:
+            continue
+        answered += 1
+        _assert_same(result, compute_kpis(index.select(metric, countries, year_range), year_range))
+    assert answered > 50
+
+
+def test_full_range_and_all_countries_are_answered():
+    index = DatasetIndex(build_who_dataset(WHO_FILE))
+    rollups = Rollups(index.df)
+    metric = 'Adult Obesity Rate'
+    assert rollups.kpis(metric, ['Japan', 'India'], (2000, 2022)) is not None
+    assert rollups.kpis(metric, index.countries, (2004, 2010)) is not None
+    assert rollups.kpis(metric, ['Japan', 'India'], (2004, 2010)) is None
+    assert rollups.kpis('No Such Metric', ['Japan'], (2000, 2022)) is None
@@ -0,0 +1,73 @@
+# test_snapshot_cache.py
+import os
+import sys
+
+import pandas as pd
+
+import snapshot_cache
+from snapshot_cache import load_or_build
+
+CODE_MODULES = [sys.modules[__name__]]
+
+
+def _builder(calls):
+    def build():
+        calls.append(1)
+        return pd.DataFrame({'Country': ['Japan', 'India'], 'Value': [84.6, 70.8]})
+    return build
+
+
+def test_snapshot_reused_until_source_changes(tmp_path):
+    source = tmp_path / "source.csv"
+    source.write_text("a,b\n1,2\n")
+    calls = []
+
+    df, fingerprint, hit = load_or_build("ds", [str(source)], _builder(calls), CODE_MODULES, str(tmp_path))
+    assert not hit and len(calls) == 1
+
+    df2, fingerprint2, hit = load_or_build("ds", [str(source)], _builder(calls), CODE_MODULES, str(tmp_path))
+    assert hit and len(calls) == 1
+    assert fingerprint2 == fingerprint
+    pd.testing.assert_frame_equal(df, df2)
+
+    source.write_text("a,b\n1,3\n")
+    _, fingerprint3, hit = load_or_build("ds", [str(source)], _builder(calls), CODE_MODULES, str(tmp_path))
+    assert not hit and len(calls) == 2
+    assert fingerprint3 != fingerprint
+
+
+def test_touched_source_does_not_rebuild(tmp_path):
+    source = tmp_path / "source.csv"
+    source.write_text("a,b\n1,2\n")
+    calls = []
+
+    load_or_build("ds", [str(source)], _builder(calls), CODE_MODULES, str(tmp_path))
+    stat = os.stat(source)
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    _, _, hit = load_or_build("ds", [str(source)], _builder(calls), CODE_MODULES, str(tmp_path))
+    assert hit and len(calls) == 1
+
+
+def test_code_version_changes_with_format_version(monkeypatch):
+    before = snapshot_cache.code_version(CODE_MODULES)
+    monkeypatch.setattr(snapshot_cache, 'SNAPSHOT_FORMAT_VERSION', snapshot_cache.SNAPSHOT_FORMAT_VERSION + 1)
+    assert snapshot_cache.code_version(CODE_MODULES) != before
+
+
+def test_snapshot_is_memory_mapped_without_copies(tmp_path):
+    source = tmp_path / "source.csv"
+    source.write_text("a,b\n1,2\n")
+    built = pd.DataFrame({
+        'Country': pd.Categorical(['Japan', 'India', None]),
+        'Year': pd.array([2019, 2020, 2021], dtype='int16'),
+        'Value': pd.array([84.6, float('nan'), 70.8], dtype='float32'),
+    })
+
+    for _ in range(2):
+        df, _, _ = load_or_build("ds", [str(source)], lambda: built, CODE_MODULES, str(tmp_path))
+        pd.testing.assert_frame_equal(df, built)
+        # Read-only arrays are views of the mapped file, not private copies
+        assert not df['Value'].to_numpy().flags.writeable
+        assert not df['Year'].to_numpy().flags.writeable
+        assert not df['Country'].cat.codes.to_numpy().flags.writeable
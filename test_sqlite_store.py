@@ -0,0 +1,130 @@
+# test_sqlite_store.py
+import math
+
+import pandas as pd
+import pytest
+
+from data_index import DatasetIndex
+from data_processor import build_who_dataset
+from kpis import compute_kpis
+from sqlite_store import load_frames, open_store
+
+WHO_FILE = "data/raw/who_life_expectancy.csv"
+
+CASES = [
+    ('Life expectancy at birth (years)', ['Japan', 'India', 'Brazil'], (2000, 2019), 'All'),
+    ('Adult Obesity Rate', ['Brazil', 'Afghanistan', 'Germany'], (2004, 2016), 'All'),
+    ('Smoking Prevalence', ['Brazil', 'Japan', 'United States of America'], (2000, 2022), 'AMRO'),
+]
+
+
+@pytest.fixture(scope='module')
+def dataset(tmp_path_factory):
+    df = build_who_dataset(WHO_FILE)
+    store = open_store(str(tmp_path_factory.mktemp('db') / 'health.db'))
+    store.write_dataset(df, 'v1')
+    return DatasetIndex(df), store
+
+
+def test_select_matches_index(dataset):
+    index, store = dataset
+    for metric, countries, year_range, region in CASES:
+        expected = index.select(metric, countries, year_range, region)
+        result = store.select(metric, countries, year_range, region)
+        assert result['Country'].tolist() == expected['Country'].astype(str).tolist()
+        assert result['Year'].tolist() == expected['Year'].tolist()
+        assert result['Value'].tolist() == pytest.approx(expected['Value'].astype(float).tolist())
+
+
+def test_dimensions_and_unfiltered_select_match_index(dataset):
+    index, store = dataset
+    assert store.metrics() == index.metrics
+    assert store.countries() == [str(c) for c in index.countries]
+    assert store.regions() == index.regions
+    assert tuple(store.year_bounds()) == (index.min_year, index.max_year)
+    assert store.observation_count() == len(index)
+    metric = CASES[1][0]
+    assert store.metric_years(metric) == [int(y) for y in index.metric_years(metric)]
+
+    # Every metric of the selected countries, as the correlations load them
+    expected = index.df[index.df['Country'].isin(['Japan', 'Brazil']) & index.df['Year'].between(2004, 2016)]
+    result = store.select(None, ['Japan', 'Brazil'], (2004, 2016))
+    assert len(result) == len(expected)
+    assert set(result['Metric']) == set(expected['Metric'].astype(str))
+
+
+def test_kpis_match_frame_computation(dataset):
+    index, store = dataset
+    for metric, countries, year_range, region in CASES:
+        expected = compute_kpis(index.select(metric, countries, year_range, region), year_range)
+        result = store.kpis(metric, countries, year_range, region)
+        assert result['average'] == pytest.approx(expected['average'], rel=1e-6)
+        assert result['top_country'] == expected['top_country']
+        assert result['unit'] == expected['unit']
+        if math.isnan(expected['improvement']):
+            assert math.isnan(result['improvement'])
+        else:
+            assert result['improvement'] == pytest.approx(expected['improvement'], rel=1e-5)
+
+
+def test_write_is_skipped_for_loaded_version(dataset):
+    _, store = dataset
+    assert store.write_dataset(pd.DataFrame(), 'v1') is False
+    assert store.version() == 'v1'
+    assert store.connect().execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+
+
+def test_filter_uses_covering_primary_key(dataset):
+    _, store = dataset
+    where, params = store._where('Adult Obesity Rate', ['Japan'], (2000, 2010), None)
+    plan = store.connect().execute(
+        f"EXPLAIN QUERY PLAN SELECT o.value FROM observations o WHERE {where}", params
+    ).fetchall()
+    details = ' '.join(row[-1] for row in plan)
+    assert 'USING PRIMARY KEY' in details
+
+
+def test_bulk_loaded_database_is_not_overwritten(tmp_path):
+    store = open_store(str(tmp_path / 'health.db'))
+    bulk = pd.DataFrame({'Country': ['Japan'], 'Year': [2000], 'Metric': ['LE'], 'Value': [81.0]})
+    load_frames(store.connect(), [bulk], replace=True, version='bulk:1')
+    assert store.write_dataset(build_who_dataset(WHO_FILE), 'v2') is False
+    assert store.version() == 'bulk:1'
+    assert store.metrics() == ['LE']
+
+
+def test_replace_swaps_contents_and_survives_a_failed_load(tmp_path):
+    store = open_store(str(tmp_path / 'health.db'))
+    first = pd.DataFrame({'Country': ['Japan', 'Peru'], 'Year': [2000, 2000], 'Metric': ['LE', 'IMR'],
+                          'Value': [81.0, 20.0]})
+    load_frames(store.connect(), [first], version='bulk:1')
+
+    def failing_frames():
+        yield pd.DataFrame({'Country': ['Chad'], 'Year': [2001], 'Metric': ['LE'], 'Value': [52.0]})
+        raise OSError("source disappeared")
+
+    with pytest.raises(OSError):
+        load_frames(store.connect(), failing_frames(), replace=True, version='bulk:2')
+    assert store.version() == 'bulk:1'
+    assert store.select('LE', None, None)['Country'].tolist() == ['Japan']
+    assert store.countries() == ['Japan', 'Peru']
+
+    second = pd.DataFrame({'Country': ['Chad'], 'Year': [2001], 'Metric': ['LE'], 'Value': [52.0]})
+    assert load_frames(store.connect(), [second], replace=True, version='bulk:3') == 1
+    assert store.version() == 'bulk:3'
+    assert store.metrics() == ['LE']
+    assert store.countries() == ['Chad']
+    assert store.select('LE', None, None)['Value'].tolist() == [52.0]
+    tables = {row[0] for row in store.connect().execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert 'observations_staging' not in tables
+    assert store.connect().execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+
+
+def test_no_kpis_when_every_value_is_missing(tmp_path):
+    store = open_store(str(tmp_path / 'health.db'))
+    frame = pd.DataFrame({'Country': ['Japan', 'Peru', 'Japan'], 'Year': [2000, 2000, 2001],
+                          'Metric': ['LE', 'LE', 'IMR'], 'Value': [None, None, 3.0], 'Unit': ['years'] * 3})
+    load_frames(store.connect(), [frame], version='bulk:1')
+    assert store.kpis('LE', ['Japan', 'Peru'], (2000, 2001)) is None
+    assert compute_kpis(frame[frame['Metric'] == 'LE'], (2000, 2001)) is None
+    assert store.kpis('IMR', ['Japan', 'Peru'], (2000, 2001))['average'] == 3.0
@@ -0,0 +1,39 @@
+# test_view_cache.py
+from view_cache import ViewCache, approx_size, view_key
+
+
+def test_key_ignores_country_order_and_types():
+    a = view_key('v1', 'Obesity', ['Japan', 'India'], (2000, 2020), None, False)
+    b = view_key('v1', 'Obesity', ('India', 'Japan', 'India'), [2000.0, 2020.0], 'All', False)
+    assert a == b
+    assert a != view_key('v2', 'Obesity', ['Japan', 'India'], (2000, 2020), None, False)
+
+
+def test_counts_hits_and_builds_once():
+    cache = ViewCache()
+    calls = []
+    build = lambda: calls.append(1) or {'trends': '{}'}
+    assert cache.get_or_build('a', build) == {'trends': '{}'}
+    assert cache.get_or_build('a', build) == {'trends': '{}'}
+    assert len(calls) == 1
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (1, 1, 1)
+    assert stats['bytes'] == approx_size({'trends': '{}'})
+
+
+def test_evicts_least_recently_used_within_budget():
+    view = {'trends': 'x' * 1000}
+    cache = ViewCache(max_bytes=approx_size(view) * 2)
+    cache.put('a', view)
+    cache.put('b', view)
+    cache.get('a')
+    cache.put('c', view)
+
+    assert cache.get('b') is None
+    assert cache.get('a') is not None and cache.get('c') is not None
+    assert cache.stats()['evictions'] == 1
+    assert cache.bytes <= cache.max_bytes
+
+    # A view larger than the whole budget is not stored
+    cache.put('huge', {'trends': 'x' * 10_000})
+    assert cache.get('huge') is None and len(cache) == 2
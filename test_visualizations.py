@@ -0,0 +1,77 @@
+# test_visualizations.py
+import numpy as np
+import pandas as pd
+
+from visualizations import comparison_figure, correlation_heatmap, lttb_indices, scatter_figure, trends_figure
+
+
+def test_lttb_keeps_endpoints_and_extrema():
+    x = np.arange(1000)
+    y = np.sin(x / 50.0)
+    y[123] = 5.0
+    y[777] = -5.0
+
+    keep = lttb_indices(x, y, 50)
+    assert keep[0] == 0 and keep[-1] == 999
+    assert 123 in keep and 777 in keep
+    assert len(keep) <= 52
+    assert np.all(np.diff(keep) > 0)
+
+
+def test_lttb_returns_everything_when_series_is_short():
+    assert lttb_indices([1, 2, 3], [1.0, 2.0, 3.0], 10).tolist() == [0, 1, 2]
+
+
+def _frame(countries, years):
+    rng = np.random.RandomState(0)
+    return pd.DataFrame({
+        'Country': np.repeat([f"C{i:03d}" for i in range(countries)], years),
+        'Year': np.tile(np.arange(years), countries),
+        'Value': rng.normal(size=countries * years),
+    })
+
+
+def test_small_selection_keeps_svg_markers():
+    fig, info = trends_figure(_frame(3, 10), 'Year', 'Value', 'Country', 'Trends', {}, threshold=100)
+    assert not info['webgl'] and info['points'] == 30
+    assert {trace.type for trace in fig.data} == {'scatter'}
+    assert all('markers' in trace.mode for trace in fig.data)
+
+
+def test_large_selection_switches_to_downsampled_webgl():
+    df = _frame(60, 500)
+    fig, info = trends_figure(df, 'Year', 'Value', 'Country', 'Trends', {}, threshold=1_000, max_points=3_000)
+    assert info['webgl'] and info['total'] == 30_000
+    assert len(fig.data) == 60
+    assert {trace.type for trace in fig.data} == {'scattergl'}
+    assert {trace.mode for trace in fig.data} == {'lines'}
+    assert info['points'] == sum(len(trace.x) for trace in fig.data) < 3_000 + 2 * 60
+
+    first = df[df['Country'] == 'C000']
+    assert fig.data[0].y.max() == first['Value'].max()
+    assert fig.data[0].y.min() == first['Value'].min()
+
+
+def test_comparison_bars_are_ordered_by_value():
+    latest = pd.DataFrame({
+        'Country': ['Japan', 'India', 'Brazil'],
+        'Value': [84.5, 70.1, 75.9],
+        'WHO_Region': ['WPRO', 'SEARO', 'AMRO'],
+    })
+    fig = comparison_figure(latest, 'Latest')
+    assert [trace.name for trace in fig.data] == ['WPRO', 'AMRO', 'SEARO']
+    assert list(fig.layout.xaxis.categoryarray) == ['Japan', 'Brazil', 'India']
+
+
+def test_correlation_figures():
+    labels = ['A', 'B']
+    corr = pd.DataFrame([[1.0, -0.5], [-0.5, 1.0]], index=labels, columns=labels)
+    counts = pd.DataFrame([[10, 8], [8, 9]], index=labels, columns=labels)
+    heatmap = correlation_heatmap(corr, counts, 'r')
+    assert heatmap.data[0].zmin == -1 and list(heatmap.data[0].x) == labels
+
+    pairs = pd.DataFrame({'Country': ['C1', 'C2', 'C3'], 'Year': [2000, 2000, 2001],
+                          'x': [1.0, 2.0, 3.0], 'y': [2.0, 4.0, 6.0]})
+    scatter = scatter_figure(pairs, 'X', 'Y', 'title')
+    assert [trace.type for trace in scatter.data] == ['scatter', 'scatter']
+    np.testing.assert_allclose(scatter.data[1].y, [2.0, 6.0])
@@ -0,0 +1,105 @@
+# view_cache.py
+"""
+Bounded LRU cache of computed dashboard views.
+
+A view holds everything derived from one filter state: the KPI values,
+the serialized Plotly figures and the side panel lines. Views are keyed
+on the normalized filter (dataset version, metric, sorted countries, year
+range, region and display options), so switching back to a filter seen
+before by any session skips the aggregation and the figure building.
+
+The cache is bounded by the approximate size of the stored values and
+evicts the least recently used views first.
+"""
+
+import threading
+from collections import OrderedDict
+
+# Default memory budget for cached views
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def view_key(data_version, metric, countries, year_range, region, *options):
+    """Normalized cache key: country order and container types do not matter"""
+    return (
+        data_version,
+        metric,
+        tuple(sorted(set(countries))),
+        (int(year_range[0]), int(year_range[1])),
+        region or 'All',
+    ) + tuple(options)
+
+
+def approx_size(value):
+    """Approximate memory held by a view, dominated by the figure JSON strings"""
+    if isinstance(value, (str, bytes)):
+        return len(value) + 50
+    if isinstance(value, dict):
+        return 64 + sum(approx_size(k) + approx_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return 56 + sum(approx_size(v) for v in value)
+    return 32
+
+
+class ViewCache:
+    """Thread-safe LRU cache with a memory budget and hit/miss counters"""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Cached view for `key`, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        """Store a view, evicting least recently used views beyond the budget"""
+        size = approx_size(value)
+        with self._lock:
+            if key in self._entries:
+                self.bytes -= self._entries.pop(key)[1]
+            if size > self.max_bytes:
+                # Larger than the whole budget: not worth evicting everything else
+                return
+            self._entries[key] = (value, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+
+    def get_or_build(self, key, build):
+        """Cached view for `key`, building and storing it on a miss"""
+        value = self.get(key)
+        if value is None:
+            value = build()
+            self.put(key, value)
+        return value
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
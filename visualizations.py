@@ -0,0 +1,177 @@
+# visualizations.py
+"""
+Figure builders for the dashboard charts.
+
+The trends chart switches to a WebGL render mode when the selection holds
+more points than the browser renders comfortably as SVG: every series is
+downsampled with Largest-Triangle-Three-Buckets (keeping its minimum and
+maximum), drawn as a `Scattergl` trace and markers are dropped.
+
+The figures are built with plotly.graph_objects, imported inside the
+builders: plotly.express alone takes about half a second to import, and a
+page without any chart should not pay for plotly at all.
+"""
+
+import numpy as np
+
+# Points above which the trends chart is downsampled and drawn with WebGL
+WEBGL_POINT_THRESHOLD = 2_000
+
+# Points sent to the browser in WebGL mode, shared between the series
+WEBGL_MAX_POINTS = 5_000
+
+# Never downsample a series below this many points
+MIN_POINTS_PER_SERIES = 20
+
+# Plotly's default qualitative colour sequence
+PALETTE = ['#636EFA', '#EF553B', '#00CC96', '#AB63FA', '#FFA15A',
+           '#19D3F3', '#FF6692', '#B6E880', '#FF97FF', '#FECB52']
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Positions of the points kept by Largest-Triangle-Three-Buckets when
+    reducing (x, y) to about `n_out` points. The first and last points and
+    the minimum and maximum of `y` are always kept.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # n_out - 2 buckets between the fixed first and last points
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_x = x[end:edges[i + 2]].mean()
+            next_y = y[end:edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[n - 1], y[n - 1]
+        area = np.abs((x[a] - next_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (next_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    selected[-1] = n - 1
+
+    return np.union1d(selected, [int(np.argmin(y)), int(np.argmax(y))])
+
+
+def _downsample_series(x, y, n_out):
+    finite = np.isfinite(y)
+    x, y = x[finite], y[finite]
+    keep = lttb_indices(x, y, n_out)
+    return x[keep], y[keep]
+
+
+def _series_trace(go, webgl, name, color, xs, ys, labels, x, y, color_column):
+    trace = go.Scattergl if webgl else go.Scatter
+    return trace(
+        x=xs, y=ys, name=str(name), legendgroup=str(name),
+        mode='lines' if webgl else 'lines+markers',
+        line=dict(color=color),
+        hovertemplate=(
+            f"{labels.get(color_column, color_column)}={name}<br>"
+            f"{labels.get(x, x)}=%{{x}}<br>{labels.get(y, y)}=%{{y}}<extra></extra>"
+        ),
+    )
+
+
+def trends_figure(df, x, y, color, title, labels, threshold=WEBGL_POINT_THRESHOLD, max_points=WEBGL_MAX_POINTS):
+    """
+    Line chart of `y` over `x` with one trace per `color` value.
+
+    Returns (figure, info) where info holds the points in the selection
+    ('total'), the points sent to the browser ('points') and whether the
+    WebGL mode was used ('webgl').
+    """
+    import plotly.graph_objects as go
+
+    total = len(df)
+    webgl = total > threshold
+    groups = df.groupby(color, sort=False, observed=True)
+    per_series = max(MIN_POINTS_PER_SERIES, max_points // max(groups.ngroups, 1))
+    fig = go.Figure()
+    points = 0
+    for i, (name, series) in enumerate(groups):
+        xs, ys = series[x].to_numpy(), series[y].to_numpy(dtype=np.float64)
+        if webgl:
+            order = np.argsort(xs, kind='stable')
+            xs, ys = _downsample_series(xs[order], ys[order], per_series)
+        points += len(xs)
+        fig.add_trace(_series_trace(go, webgl, name, PALETTE[i % len(PALETTE)], xs, ys, labels, x, y, color))
+    fig.update_layout(
+        title=title,
+        xaxis_title=labels.get(x, x),
+        yaxis_title=labels.get(y, y),
+        legend_title_text=labels.get(color, color),
+    )
+    return fig, {'total': total, 'points': points, 'webgl': webgl}
+
+
+def comparison_figure(latest_data, title):
+    """Bar chart of the latest value per country, highest first, coloured by WHO region"""
+    import plotly.graph_objects as go
+
+    data = latest_data.sort_values('Value', ascending=False)
+    fig = go.Figure()
+    # Countries without a region (databases loaded from files that have none) still get their bar
+    for i, (region, group) in enumerate(data.groupby('WHO_Region', sort=False, observed=True, dropna=False)):
+        region = 'Unknown' if region != region or region is None else region
+        fig.add_trace(go.Bar(
+            x=group['Country'].astype(str), y=group['Value'], name=str(region),
+            marker_color=PALETTE[i % len(PALETTE)],
+            text=group['Value'], texttemplate='%{text:.1f}', textposition='outside',
+            hovertemplate=f"WHO_Region={region}<br>Country=%{{x}}<br>Value=%{{y}}<extra></extra>",
+        ))
+    fig.update_layout(
+        title=title,
+        xaxis=dict(title='Country', categoryorder='array', categoryarray=data['Country'].astype(str).tolist()),
+        yaxis_title='Value',
+        legend_title_text='WHO_Region',
+        barmode='relative',
+    )
+    return fig
+
+
+def correlation_heatmap(corr, counts, title, max_labels=40):
+    """Heatmap of a (metric x metric) correlation frame, with the common observations on hover"""
+    import plotly.graph_objects as go
+
+    labels = [str(metric) for metric in corr.index]
+    fig = go.Figure(go.Heatmap(
+        z=np.round(corr.to_numpy(), 3), x=labels, y=labels, customdata=counts.to_numpy(),
+        zmin=-1, zmax=1, zmid=0, colorscale='RdBu', colorbar_title_text='r',
+        hovertemplate="%{y}<br>%{x}<br>r=%{z}<br>n=%{customdata}<extra></extra>",
+    ))
+    # Past a few dozen indicators the labels overlap: hover tells which cell is which
+    show_labels = len(labels) <= max_labels
+    fig.update_layout(
+        title=title,
+        xaxis=dict(showticklabels=show_labels, tickangle=-45),
+        yaxis=dict(showticklabels=show_labels, autorange='reversed'),
+    )
+    return fig
+
+
+def scatter_figure(pairs, x_label, y_label, title, threshold=WEBGL_POINT_THRESHOLD):
+    """Scatter of the `x` and `y` columns of `pairs` with its least-squares line"""
+    import plotly.graph_objects as go
+
+    xs, ys = pairs['x'].to_numpy(dtype=np.float64), pairs['y'].to_numpy(dtype=np.float64)
+    trace = go.Scattergl if len(pairs) > threshold else go.Scatter
+    fig = go.Figure(trace(
+        x=xs, y=ys, mode='markers', name='Country-years', marker=dict(color=PALETTE[0], opacity=0.7),
+        text=pairs['Country'].astype(str) + ' ' + pairs['Year'].astype(str),
+        hovertemplate=f"%{{text}}<br>{x_label}=%{{x}}<br>{y_label}=%{{y}}<extra></extra>",
+    ))
+    if len(pairs) >= 2 and np.ptp(xs) > 0:
+        slope, intercept = np.polyfit(xs, ys, 1)
+        line_x = np.array([xs.min(), xs.max()])
+        fig.add_trace(go.Scatter(x=line_x, y=slope * line_x + intercept, mode='lines', name='Linear fit',
+                                 line=dict(color=PALETTE[1], dash='dash')))
+    fig.update_layout(title=title, xaxis_title=x_label, yaxis_title=y_label)
+    return fig